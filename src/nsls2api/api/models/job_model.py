@@ -0,0 +1,34 @@
+import datetime
+from typing import Optional
+
+import pydantic
+
+from nsls2api.models.jobs import JobActions, JobProgress, JobSyncParameters
+
+
+class JobStatusDetails(pydantic.BaseModel):
+    job_id: str
+    action: str
+    processing_status: str
+    is_finished: bool
+    created_date: datetime.datetime
+    started_date: Optional[datetime.datetime] = None
+    finished_date: Optional[datetime.datetime] = None
+    resume_count: int = 0
+    progress: Optional[JobProgress] = None
+    log_message: Optional[str] = None
+
+
+class JobStatusList(pydantic.BaseModel):
+    jobs: list[JobStatusDetails] = []
+    not_found: list[str] = []
+
+
+class JobSubmission(pydantic.BaseModel):
+    action: JobActions
+    sync_parameters: Optional[JobSyncParameters] = None
+
+
+class JobSubmissionResult(pydantic.BaseModel):
+    # In the same order as the submissions (duplicates share a job ID)
+    job_ids: list[str]
@@ -163,4 +163,13 @@ class ProposalIdDataSessionList(pydantic.BaseModel):
     proposals: list[ProposalIdDataSession]
     count: int
     page_size: int
-    page: int
\ No newline at end of file
+    page: int
+
+
+class SyntheticDatasetSummary(pydantic.BaseModel):
+    proposals_created: int
+    first_proposal_id: str
+    last_proposal_id: str
+    cycles_created: int
+    beamlines_created: int
+    elapsed_seconds: float
@@ -11,6 +11,7 @@ from nsls2api.api.models.proposal_model import (
     ProposalsToChangeList,
     SingleProposal,
 )
+from nsls2api.devtools.synthetic_ids import FIRST_SYNTHETIC_PROPOSAL_ID
 from nsls2api.infrastructure import config
 from nsls2api.infrastructure.security import (
     generate_api_key,
@@ -22,7 +23,14 @@ from nsls2api.models.apikeys import (
     ApiUserRole,
     ApiUserType,
 )
-from nsls2api.services import beamline_service, facility_service, proposal_service
+from nsls2api.models.jobs import BackgroundJob, JobActions, JobSyncParameters
+from nsls2api.services import (
+    background_service,
+    beamline_service,
+    facility_service,
+    proposal_service,
+    synthetic_data_service,
+)
 
 router = fastapi.APIRouter(
     dependencies=[Depends(validate_admin_role)], include_in_schema=True, tags=["admin"]
@@ -80,6 +88,48 @@ async def generate_fake_proposal(
     return SingleProposal(proposal=proposal)
 
 
+@router.post("/admin/proposal/generate-dataset")
+async def generate_synthetic_dataset(
+    proposals: Annotated[int, Query(ge=1, le=synthetic_data_service.MAX_API_PROPOSALS)],
+    first_proposal_id: Annotated[int, Query(ge=1)] = FIRST_SYNTHETIC_PROPOSAL_ID,
+    seed: Optional[int] = None,
+) -> BackgroundJob:
+    """
+    Queue a background job to bulk-create synthetic proposals (and the cycles and
+    beamlines they use), e.g. to seed a database for load testing.  Only available
+    where the allow_synthetic_data setting is on, which it should never be for a
+    production database.
+
+    :param proposals: The number of proposals to create.
+    :param first_proposal_id: The first of the (consecutive) proposal IDs to use.
+    :param seed: Seed for the random data, to generate the same dataset again.
+    :return: The job generating the dataset.
+    """
+    try:
+        synthetic_data_service.check_synthetic_data_allowed()
+    except synthetic_data_service.SyntheticDatasetError as error:
+        raise HTTPException(
+            status_code=fastapi.status.HTTP_403_FORBIDDEN, detail=str(error)
+        )
+
+    parameters = JobSyncParameters(
+        proposal_count=proposals, first_proposal_id=first_proposal_id, seed=seed
+    )
+    try:
+        # Fail straight away, rather than in the job, if the IDs are already in use
+        await synthetic_data_service.check_synthetic_dataset(
+            synthetic_data_service.synthetic_dataset_spec(parameters)
+        )
+    except synthetic_data_service.SyntheticDatasetError as error:
+        raise HTTPException(
+            status_code=fastapi.status.HTTP_409_CONFLICT, detail=str(error)
+        )
+
+    return await background_service.create_background_job(
+        JobActions.generate_synthetic_dataset, parameters
+    )
+
+
 @router.put("/admin/user/{username}/role/{role}")
 async def update_user_role(username: str, role: ApiUserRole) -> ApiUserResponseModel:
     """
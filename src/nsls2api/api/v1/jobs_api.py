@@ -1,10 +1,20 @@
-from typing import Optional
+import asyncio
+import json
+from typing import AsyncIterator, Optional
 
 import bson
 import fastapi
-from fastapi import Depends, Request
+from fastapi import Body, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from nsls2api.api.models.facility_model import FacilityName
+from nsls2api.api.models.job_model import (
+    JobStatusDetails,
+    JobStatusList,
+    JobSubmission,
+    JobSubmissionResult,
+)
+from nsls2api.infrastructure.config import get_settings
 from nsls2api.infrastructure.security import get_current_user
 from nsls2api.models.jobs import (
     BackgroundJob,
@@ -19,6 +29,72 @@ SYNC_ROUTES_IN_SCHEMA = True
 
 router = fastapi.APIRouter(tags=["jobs"])
 
+settings = get_settings()
+
+# The actions that can be queued with POST /sync/jobs, and the sync parameters each
+# one needs.  Anything else (e.g. generating synthetic data) has its own endpoint.
+BATCH_SYNC_ACTIONS: dict[JobActions, tuple[str, ...]] = {
+    JobActions.synchronize_admins: (),
+    JobActions.synchronize_cycles: ("facility",),
+    JobActions.synchronize_proposal: ("proposal_id", "facility"),
+    JobActions.synchronize_proposals_for_cycle: ("cycle", "facility"),
+    JobActions.synchronize_proposals_incremental: ("facility",),
+    JobActions.synchronize_proposal_types: ("facility",),
+    JobActions.update_cycle_information: ("facility",),
+}
+
+
+def job_status_details_from_job(job: BackgroundJob) -> JobStatusDetails:
+    return JobStatusDetails(
+        job_id=str(job.id),
+        action=job.action,
+        processing_status=job.processing_status,
+        is_finished=job.is_finished,
+        created_date=job.created_date,
+        started_date=job.started_date,
+        finished_date=job.finished_date,
+        resume_count=job.resume_count,
+        progress=job.progress,
+        log_message=job.log_message,
+    )
+
+
+def parse_job_ids(job_ids: list[str]) -> list[bson.ObjectId]:
+    try:
+        return [bson.ObjectId(job_id) for job_id in job_ids]
+    except bson.errors.InvalidId as error:
+        raise HTTPException(
+            status_code=fastapi.status.HTTP_400_BAD_REQUEST, detail=str(error)
+        )
+
+
+def check_batch_size(size: int) -> None:
+    if size > settings.job_batch_max_size:
+        raise HTTPException(
+            status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.job_batch_max_size} jobs can be handled in one request.",
+        )
+
+
+def check_submissions(submissions: list[JobSubmission]) -> None:
+    for index, submission in enumerate(submissions):
+        required = BATCH_SYNC_ACTIONS.get(submission.action)
+        if required is None:
+            raise HTTPException(
+                status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+                detail=f"Submission {index}: {submission.action} jobs can't be queued here.",
+            )
+        missing = [
+            name
+            for name in required
+            if getattr(submission.sync_parameters, name, None) is None
+        ]
+        if missing:
+            raise HTTPException(
+                status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+                detail=f"Submission {index}: {submission.action} jobs need {', '.join(missing)}.",
+            )
+
 
 @router.get("/jobs/check-status/{job_id}")
 async def check_job_status(request: Request, job_id: str):
@@ -29,7 +105,7 @@ async def check_job_status(request: Request, job_id: str):
     :return: The status of the job.
     """
 
-    job = await background_service.job_by_id(bson.ObjectId(job_id))
+    job = await background_service.job_by_id(parse_job_ids([job_id])[0])
     if job is None:
         return fastapi.responses.JSONResponse(
             {"error": f"Job {job_id} not found"},
@@ -39,6 +115,164 @@ async def check_job_status(request: Request, job_id: str):
         return job.processing_status
 
 
+@router.get("/jobs/status/{job_id}", response_model=JobStatusDetails)
+async def job_status_details(request: Request, job_id: str):
+    """
+    Get the status of a background job, along with its progress (items processed,
+    failures, and the throughput of each stage) for jobs that report it.
+
+    :param job_id: The ID of the job to check.
+    :return: The status and progress of the job.
+    """
+
+    job = await background_service.job_by_id(parse_job_ids([job_id])[0])
+    if job is None:
+        return fastapi.responses.JSONResponse(
+            {"error": f"Job {job_id} not found"},
+            status_code=fastapi.status.HTTP_404_NOT_FOUND,
+        )
+
+    return job_status_details_from_job(job)
+
+
+@router.post("/jobs/status", response_model=JobStatusList)
+async def job_status_details_batch(request: Request, job_ids: list[str] = Body(...)):
+    """
+    Get the status (and progress) of many background jobs at once.
+
+    :param job_ids: The IDs of the jobs to check.
+    :return: The status of each job that was found, and the IDs that were not.
+    """
+    check_batch_size(len(job_ids))
+
+    jobs = await background_service.jobs_by_ids(parse_job_ids(job_ids))
+    found = {str(job.id) for job in jobs}
+
+    return JobStatusList(
+        jobs=[job_status_details_from_job(job) for job in jobs],
+        not_found=[job_id for job_id in dict.fromkeys(job_ids) if job_id not in found],
+    )
+
+
+# Send a comment line at least this often so that proxies keep the stream open
+EVENT_STREAM_HEARTBEAT_SECONDS = 15
+
+
+def server_sent_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def job_event_stream(
+    request: Request, job_ids: list[bson.ObjectId], timeout: float
+) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    last_event = loop.time()
+    last_sent: dict[str, tuple] = {}
+    first_pass = True
+    # Only look at the jobs again when one of them may have changed
+    followed = set(job_ids)
+
+    while True:
+        updates = background_service.job_updates.snapshot()
+        jobs = await background_service.jobs_by_ids(job_ids)
+
+        for job in jobs:
+            details = job_status_details_from_job(job)
+            state = (
+                details.processing_status,
+                details.progress.updated_at if details.progress else None,
+            )
+            if last_sent.get(details.job_id) != state:
+                last_sent[details.job_id] = state
+                last_event = loop.time()
+                yield server_sent_event("status", details.model_dump_json())
+
+        if first_pass:
+            found = {str(job.id) for job in jobs}
+            not_found = [str(job_id) for job_id in job_ids if str(job_id) not in found]
+            if not_found:
+                yield server_sent_event("not_found", json.dumps(not_found))
+            first_pass = False
+
+        if all(job.is_finished for job in jobs):
+            yield server_sent_event("done", "{}")
+            return
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            yield server_sent_event("timeout", "{}")
+            return
+        if await request.is_disconnected():
+            return
+
+        wait = min(remaining, EVENT_STREAM_HEARTBEAT_SECONDS)
+        if not background_service.job_updates.listening:
+            wait = min(wait, settings.job_events_poll_interval_seconds)
+        woken = await background_service.job_updates.wait(updates, wait, followed)
+        if not woken and loop.time() - last_event >= EVENT_STREAM_HEARTBEAT_SECONDS:
+            last_event = loop.time()
+            yield ": heartbeat\n\n"
+
+
+@router.get("/jobs/events")
+async def job_events(
+    request: Request,
+    job_id: list[str] = Query(...),
+    timeout: float = Query(settings.job_events_max_seconds, gt=0),
+):
+    """
+    Stream the status and progress of one or more background jobs as Server-Sent
+    Events, instead of polling for them.
+
+    A `status` event (with the same details as /jobs/status/{job_id}) is sent for each
+    job straight away and then whenever its status or progress changes.  Unknown job
+    IDs are listed in a `not_found` event.  Once every job has finished a `done` event
+    is sent and the stream closes (or a `timeout` event, after `timeout` seconds).
+
+    :param job_id: The IDs of the jobs to follow (repeat the parameter for several).
+    :param timeout: The maximum number of seconds to keep the stream open.
+    """
+    check_batch_size(len(job_id))
+    job_ids = parse_job_ids(job_id)
+
+    return StreamingResponse(
+        job_event_stream(
+            request, job_ids, min(timeout, settings.job_events_max_seconds)
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/sync/jobs",
+    dependencies=[Depends(get_current_user)],
+    include_in_schema=SYNC_ROUTES_IN_SCHEMA,
+    tags=["sync"],
+    response_model=JobSubmissionResult,
+)
+async def sync_jobs_batch(request: Request, submissions: list[JobSubmission]):
+    """
+    Queue many synchronization jobs in one request (e.g. to resynchronize a list of
+    proposals).  Requests that duplicate a job that is already waiting or running
+    are given that job's ID.
+
+    Only synchronization actions can be queued, and each submission must have the
+    sync parameters its action needs, otherwise nothing is queued.
+
+    :param submissions: The action and sync parameters for each job.
+    :return: The job ID for each submission, in the same order.
+    """
+    check_batch_size(len(submissions))
+    check_submissions(submissions)
+
+    jobs = await background_service.create_background_jobs(
+        [(submission.action, submission.sync_parameters) for submission in submissions]
+    )
+    return JobSubmissionResult(job_ids=[str(job.id) for job in jobs])
+
+
 @router.get(
     "/sync/dataadmins",
     dependencies=[Depends(get_current_user)],
@@ -134,6 +368,24 @@ async def sync_proposals_for_facility_cycle(
     return job
 
 
+@router.get(
+    "/sync/facility/{facility}/proposals/incremental",
+    dependencies=[Depends(get_current_user)],
+    include_in_schema=SYNC_ROUTES_IN_SCHEMA,
+    tags=["sync"],
+    summary="Synchronize only the proposals whose PASS allocations are new or have changed",
+)
+async def sync_proposals_incremental(
+    request: Request, facility: FacilityName
+) -> BackgroundJob:
+    sync_params = JobSyncParameters(facility=facility)
+    job = await background_service.create_background_job(
+        JobActions.synchronize_proposals_incremental,
+        sync_parameters=sync_params,
+    )
+    return job
+
+
 @router.get(
     "/sync/cycles/{facility}", include_in_schema=SYNC_ROUTES_IN_SCHEMA, tags=["sync"]
 )
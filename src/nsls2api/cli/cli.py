@@ -10,7 +10,17 @@ from rich.table import Table
 from rich.text import Text
 from rich.theme import Theme
 
-from nsls2api.cli import admin, api, auth, beamline, environment, facility, proposal
+from nsls2api.cli import (
+    admin,
+    api,
+    auth,
+    beamline,
+    dev,
+    environment,
+    facility,
+    proposal,
+    worker,
+)
 from nsls2api.version import get_version
 
 # Remove no_args_is_help and add invoke_without_command to allow a version option without subcommand.
@@ -23,9 +33,11 @@ app.add_typer(admin.app, name="admin", help="Administrative commands")
 app.add_typer(api.app, name="api", help="API status and metrics")
 app.add_typer(auth.app, name="auth", help="Authentication management")
 app.add_typer(beamline.app, name="beamline", help="Beamline operations")
+app.add_typer(dev.app, name="dev", help="Development and load testing tools")
 app.add_typer(environment.app, name="env", help="Environment management")
 app.add_typer(facility.app, name="facility", help="Facility operations")
 app.add_typer(proposal.app, name="proposal", help="Proposal management")
+app.command(name="worker", help="Run the background job worker")(worker.run)
 
 console = Console(
     theme=Theme(
@@ -91,7 +103,16 @@ def show_available_commands():
             "facility": "Manage facility operations",
             "proposal": "Manage proposals",
         },
-        "Administration": {"admin": "Administrative commands"},
+        "Administration": {
+            "admin": "Administrative commands",
+            "worker": "Run the background job worker",
+        },
+        "Development": {
+            "dev upstream": "Run a local PASS and BNL People simulator",
+            "dev generate-dataset": "Create synthetic proposals for load testing",
+            "dev benchmark": "Benchmark the service-layer hot paths",
+            "dev loadtest": "Load test a running instance of the API",
+        },
     }
 
     panels = []
@@ -0,0 +1,410 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from nsls2api.cli.utils.cli_helpers import auto_help_if_no_command
+from nsls2api.cli.utils.console import console
+from nsls2api.devtools.synthetic_ids import FIRST_SYNTHETIC_PROPOSAL_ID
+
+app = typer.Typer(invoke_without_command=True)
+
+
+@app.callback()
+@auto_help_if_no_command()
+def dev_callback(ctx: typer.Context):
+    pass  # No need to call anything manually
+
+
+@app.command()
+def upstream(
+    host: str = typer.Option("127.0.0.1", help="Address to listen on"),
+    port: int = typer.Option(8090, help="Port to listen on"),
+    seed: int = typer.Option(0, help="Seed for the generated data"),
+    years: int = typer.Option(5, help="Years of cycles to generate"),
+    proposals_per_cycle: int = typer.Option(200, help="Proposals in each cycle"),
+    experimenters_max: int = typer.Option(12, help="Most experimenters on a proposal"),
+    latency_distribution: str = typer.Option(
+        "none", help="none, fixed, uniform, exponential or lognormal"
+    ),
+    latency_ms: float = typer.Option(0.0, help="Mean (median for lognormal) latency"),
+    latency_spread: float = typer.Option(
+        0.5, help="Spread of the latency (fraction for uniform, sigma for lognormal)"
+    ),
+    error_rate: float = typer.Option(0.0, help="Fraction of requests that fail"),
+    error_status: int = typer.Option(503, help="HTTP status of the failed requests"),
+    fixtures_dir: Optional[Path] = typer.Option(
+        None, help="Directory of recorded responses to serve instead of generated ones"
+    ),
+):
+    """
+    Run a local stand-in for the PASS and BNL People APIs.
+    """
+    import uvicorn
+
+    from nsls2api.devtools.upstream_simulator import SimulatorConfig, create_app
+
+    config = SimulatorConfig(
+        seed=seed,
+        years=years,
+        proposals_per_cycle=proposals_per_cycle,
+        experimenters_max=experimenters_max,
+        latency_distribution=latency_distribution,
+        latency_ms=latency_ms,
+        latency_spread=latency_spread,
+        error_rate=error_rate,
+        error_status=error_status,
+        fixtures_dir=fixtures_dir,
+    )
+
+    console.print(
+        f"[info]Set PASS_API_URL=http://{host}:{port}/passapi and "
+        f"BNLPEOPLE_API_URL=http://{host}:{port}/BNLPeople to use the simulator."
+    )
+    uvicorn.run(create_app(config), host=host, port=port, log_level="warning")
+
+
+@app.command(name="generate-dataset")
+def generate_dataset(
+    proposals: int = typer.Option(..., "--proposals", "-n", help="Proposals to create"),
+    first_proposal_id: int = typer.Option(
+        FIRST_SYNTHETIC_PROPOSAL_ID, help="First proposal ID to use"
+    ),
+    years: int = typer.Option(5, help="Years of cycles to spread the proposals over"),
+    beamlines: int = typer.Option(30, help="Synthetic beamlines to spread them over"),
+    batch_size: int = typer.Option(1000, help="Proposals inserted at a time"),
+    seed: Optional[int] = typer.Option(None, help="Seed, for a repeatable dataset"),
+):
+    """
+    Bulk-create synthetic proposals directly in the configured database (for load
+    testing; never run this against production).
+    """
+    from nsls2api.services.synthetic_data_service import SyntheticDatasetSpec
+
+    spec = SyntheticDatasetSpec(
+        proposals=proposals,
+        first_proposal_id=first_proposal_id,
+        years=years,
+        beamlines=beamlines,
+        batch_size=batch_size,
+        seed=seed,
+    )
+    summary = asyncio.run(_generate_dataset(spec))
+    console.print(
+        f"[success]Created {summary.proposals_created:,} proposals "
+        f"({summary.first_proposal_id}-{summary.last_proposal_id}), "
+        f"{summary.cycles_created} cycles and {summary.beamlines_created} beamlines "
+        f"in {summary.elapsed_seconds:,.2f} seconds."
+    )
+
+
+async def _generate_dataset(spec):
+    # These need the server settings (.env), so only import them when actually needed
+    from nsls2api.infrastructure import mongodb_setup
+    from nsls2api.infrastructure.config import get_settings
+    from nsls2api.services import synthetic_data_service
+
+    await mongodb_setup.init_connection(get_settings().mongodb_dsn)
+    return await synthetic_data_service.generate_synthetic_dataset(spec)
+
+
+@app.command()
+def benchmark(
+    iterations: int = typer.Option(
+        100, "--iterations", "-i", help="Timed runs per operation"
+    ),
+    only: Optional[list[str]] = typer.Option(
+        None, help="Only run the operations whose names contain this (repeatable)"
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Save the results as JSON"
+    ),
+    baseline: Optional[Path] = typer.Option(
+        None, "--compare", help="JSON results (from --output) to compare against"
+    ),
+    threshold: float = typer.Option(
+        10.0, help="Slowdown in p95 latency (%) reported as a regression"
+    ),
+):
+    """
+    Benchmark the service-layer hot paths against the configured (local) database.
+    """
+    from rich.table import Table
+
+    from nsls2api.devtools import benchmarks
+
+    results = Table(title="Benchmark results")
+    for column in [
+        "Operation",
+        "p50 ms",
+        "p90 ms",
+        "p95 ms",
+        "p99 ms",
+        "max ms",
+        "DB round trips",
+        "Errors",
+    ]:
+        results.add_column(column, justify="left" if column == "Operation" else "right")
+
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:,.2f}"
+
+    def show(result: benchmarks.OperationResult):
+        console.print(
+            f"[info]{result.name}: p50 {ms(result.p50_ms)} ms, {result.db_round_trips:,.1f} round trips"
+        )
+        if result.failed:
+            console.print(
+                f"[error]{result.name} raised {result.error} ({result.errors} of {result.iterations} timed runs failed)"
+            )
+        results.add_row(
+            result.name,
+            ms(result.p50_ms),
+            ms(result.p90_ms),
+            ms(result.p95_ms),
+            ms(result.p99_ms),
+            ms(result.max_ms),
+            f"{result.db_round_trips:,.1f}",
+            str(result.errors),
+        )
+
+    run = asyncio.run(_run_benchmarks(iterations, only, show))
+    console.print(results)
+
+    if output is not None:
+        run.save(output)
+        console.print(f"[success]Saved results to {output}")
+
+    if baseline is not None:
+        regressions = _show_comparison(
+            benchmarks.BenchmarkRun.load(baseline), run, threshold
+        )
+        if regressions:
+            raise typer.Exit(code=1)
+
+
+async def _run_benchmarks(iterations, only, on_result):
+    from nsls2api.devtools import benchmarks
+    from nsls2api.infrastructure import mongodb_setup
+    from nsls2api.infrastructure.config import get_settings
+
+    counter = benchmarks.CommandCounter()
+    await mongodb_setup.init_connection(
+        get_settings().mongodb_dsn, event_listeners=[counter]
+    )
+    return await benchmarks.run_benchmarks(counter, iterations, only, on_result)
+
+
+def _show_comparison(baseline, current, threshold: float) -> int:
+    from rich.table import Table
+
+    from nsls2api.devtools import benchmarks
+
+    def change(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:+.1f}%"
+
+    table = Table(title=f"Compared with {baseline.commit or baseline.started}")
+    for column in ["Operation", "p50", "p95", "DB round trips", ""]:
+        table.add_column(column)
+
+    regressions = 0
+    for comparison in benchmarks.compare(baseline, current):
+        round_trips = "-"
+        if comparison.baseline and comparison.current:
+            round_trips = f"{comparison.baseline.db_round_trips:,.1f} -> {comparison.current.db_round_trips:,.1f}"
+        regressed = comparison.is_regression(threshold)
+        regressions += regressed
+        table.add_row(
+            comparison.name,
+            change(comparison.p50_change),
+            change(comparison.p95_change),
+            round_trips,
+            "[error]regression" if regressed else "",
+        )
+    console.print(table)
+    return regressions
+
+
+@app.command()
+def loadtest(
+    base_url: str = typer.Option(
+        "http://localhost:8080", help="The instance of the API to load test"
+    ),
+    rps: float = typer.Option(20.0, help="Requests sent per second"),
+    duration: float = typer.Option(60.0, help="How long to send requests for (s)"),
+    http_file: Optional[list[Path]] = typer.Option(
+        None, help="Integration test .http file to replay (repeatable)"
+    ),
+    environment: Optional[str] = typer.Option(
+        None, help="Environment in http-client.env.json for the .http variables"
+    ),
+    mix: Optional[list[str]] = typer.Option(
+        None,
+        help="Scenario weight, e.g. data-session=5 (repeatable); scenarios are "
+        "data-session, proposal, directories and the .http file names",
+    ),
+    api_key: Optional[str] = typer.Option(
+        None, help="API key sent with every request (default: the 'auth login' one)"
+    ),
+    proposal_id: Optional[list[str]] = typer.Option(
+        None, help="Proposal ID for the built-in scenarios (default: recent ones)"
+    ),
+    username: Optional[str] = typer.Option(
+        None, help="Username for the data session scenario (default: from proposals)"
+    ),
+    max_in_flight: int = typer.Option(500, help="Most requests awaiting a response"),
+    seed: Optional[int] = typer.Option(None, help="Seed, for a repeatable mix"),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Save the report as JSON"
+    ),
+):
+    """
+    Load test a running instance with a weighted mix of the integration test
+    scenarios and the busiest endpoints, sent at a fixed rate.
+    """
+    from rich.table import Table
+
+    from nsls2api.cli.settings import get_token
+    from nsls2api.devtools import loadtest as harness
+
+    if api_key is None:
+        api_key = get_token()
+
+    weights = {}
+    for entry in mix or []:
+        name, _, weight = entry.partition("=")
+        try:
+            weights[name.strip()] = float(weight) if weight else 1.0
+        except ValueError:
+            console.print(f"[error]Invalid scenario weight: {entry}")
+            raise typer.Exit(code=1)
+    if not weights:
+        weights = {"data-session": 1.0, "proposal": 1.0, "directories": 1.0}
+        weights.update({path.stem: 1.0 for path in http_file or []})
+
+    try:
+        report = asyncio.run(
+            _run_load_test(
+                base_url,
+                rps,
+                duration,
+                http_file or [],
+                environment,
+                weights,
+                api_key,
+                proposal_id or [],
+                [username] if username else [],
+                max_in_flight,
+                seed,
+            )
+        )
+    except harness.LoadTestError as error:
+        console.print(f"[error]{error}")
+        raise typer.Exit(code=1)
+
+    results = Table(
+        title=f"Load test of {report.base_url} at {report.target_rps:g} requests/s"
+    )
+    for column in [
+        "Scenario",
+        "Requests",
+        "Requests/s",
+        "Error rate",
+        "p50 ms",
+        "p95 ms",
+        "p99 ms",
+        "max ms",
+    ]:
+        results.add_column(column, justify="left" if column == "Scenario" else "right")
+    for result in report.scenarios + ([report.total] if report.total else []):
+        results.add_row(
+            result.name,
+            f"{result.requests:,}",
+            f"{result.throughput_rps:,.1f}",
+            f"{result.error_rate:.2%}",
+            f"{result.p50_ms:,.1f}",
+            f"{result.p95_ms:,.1f}",
+            f"{result.p99_ms:,.1f}",
+            f"{result.max_ms:,.1f}",
+        )
+    console.print(results)
+
+    if report.total is not None:
+        histogram = Table(title="Latency histogram (all requests)")
+        histogram.add_column("Latency")
+        histogram.add_column("Requests", justify="right")
+        histogram.add_column("")
+        largest = max(report.total.histogram.values()) or 1
+        for bucket, count in report.total.histogram.items():
+            histogram.add_row(bucket, f"{count:,}", "#" * round(40 * count / largest))
+        console.print(histogram)
+        console.print(f"[info]Outcomes: {report.total.outcomes}")
+    if report.dropped:
+        console.print(
+            f"[warning]{report.dropped:,} requests were dropped because "
+            f"{max_in_flight} were already awaiting a response."
+        )
+
+    if output is not None:
+        report.save(output)
+        console.print(f"[success]Saved report to {output}")
+
+
+async def _run_load_test(
+    base_url,
+    rps,
+    duration,
+    http_files,
+    environment,
+    weights,
+    api_key,
+    proposal_ids,
+    usernames,
+    max_in_flight,
+    seed,
+):
+    import httpx
+
+    from nsls2api.devtools import loadtest as harness
+
+    scenarios = []
+    for path in http_files:
+        variables = {}
+        if environment is not None:
+            variables = harness.load_http_environment(
+                path.parent / "http-client.env.json", environment
+            )
+        requests = harness.parse_http_file(path.read_text(), path.stem, variables)
+        if weights.get(path.stem, 0) > 0:
+            scenarios.append(
+                harness.replay_scenario(path.stem, requests, weights[path.stem])
+            )
+
+    headers = {"Authorization": api_key} if api_key else {}
+    limits = httpx.Limits(max_connections=max_in_flight)
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=30.0
+    ) as client:
+        builtin = ("data-session", "proposal", "directories")
+        if any(weights.get(name, 0) > 0 for name in builtin):
+            if not proposal_ids or not usernames:
+                try:
+                    discovered = await harness.discover_inputs(client)
+                except httpx.HTTPError as error:
+                    raise harness.LoadTestError(
+                        f"Unable to find proposals to use on {base_url} ({error}); "
+                        f"pass --api-key, or --proposal-id and --username."
+                    ) from error
+                discovered_ids, discovered_usernames = discovered
+                proposal_ids = proposal_ids or discovered_ids
+                usernames = usernames or discovered_usernames
+            scenarios += harness.builtin_scenarios(proposal_ids, usernames, weights)
+
+        console.print(
+            f"[info]Sending {rps:g} requests/s to {base_url} for {duration:g} s "
+            f"({', '.join(f'{s.name}={s.weight:g}' for s in scenarios)})"
+        )
+        return await harness.run_load_test(
+            client, scenarios, rps, duration, max_in_flight=max_in_flight, seed=seed
+        )
@@ -0,0 +1,61 @@
+import asyncio
+import signal
+from typing import Optional
+
+import typer
+
+
+def run(
+    concurrency: Optional[int] = typer.Option(
+        None,
+        "--concurrency",
+        "-c",
+        help="Number of jobs to run concurrently (defaults to the background_worker_concurrency setting)",
+    ),
+):
+    """
+    Run the background job worker on its own, without serving the API.
+    """
+    asyncio.run(_run_worker(concurrency))
+
+
+async def _run_worker(concurrency: Optional[int]):
+    # These need the server settings (.env), so only import them when actually running a worker
+    from nsls2api.infrastructure import mongodb_setup
+    from nsls2api.infrastructure.config import get_settings
+    from nsls2api.infrastructure.logging import logger
+    from nsls2api.services import background_service, n2sn_service, scheduler_service
+    from nsls2api.services.helpers import httpx_client_wrapper
+    from nsls2api.version import get_version
+
+    settings = get_settings()
+    logger.info(f"NSLS-II API Worker Version: {get_version()}")
+
+    await mongodb_setup.init_connection(settings.mongodb_dsn)
+    httpx_client_wrapper.start()
+
+    async def run_jobs():
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(
+                background_service.worker_function(
+                    concurrency or settings.background_worker_concurrency
+                )
+            )
+            if settings.scheduler_enabled:
+                tasks.create_task(scheduler_service.scheduler_function())
+
+    worker_task = asyncio.create_task(run_jobs())
+
+    # Stop cleanly on Ctrl-C or from systemd/docker; any job interrupted here keeps its
+    # lease and checkpoint, and is resumed by another worker once the lease expires.
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, worker_task.cancel)
+
+    try:
+        await worker_task
+    except asyncio.CancelledError:
+        logger.info("Background worker stopped.")
+    finally:
+        await httpx_client_wrapper.stop()
+        n2sn_service.close_ldap_pool()
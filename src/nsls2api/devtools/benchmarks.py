@@ -0,0 +1,313 @@
+"""
+Benchmarks for the service-layer hot paths, run against a local MongoDB seeded with
+a synthetic dataset (see `synthetic_data_service`).
+
+Each operation is timed over a number of iterations, and the number of database
+commands it sends is counted.  Results can be saved as JSON and compared with the
+results from another commit.
+"""
+
+import datetime
+import json
+import platform
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Counts the commands sent to MongoDB.  Register it when connecting (see
+    `mongodb_setup.init_connection`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        with self._lock:
+            self.count += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+@dataclass
+class Operation:
+    name: str
+    # Called with the iteration number, so it can cycle through its sample inputs
+    run: Callable[[int], Awaitable[object]]
+
+
+@dataclass
+class OperationResult:
+    name: str
+    iterations: int
+    # The timed iterations that raised an exception, which aren't included in the
+    # latencies (these are None if every iteration failed)
+    errors: int
+    mean_ms: Optional[float]
+    min_ms: Optional[float]
+    p50_ms: Optional[float]
+    p90_ms: Optional[float]
+    p95_ms: Optional[float]
+    p99_ms: Optional[float]
+    max_ms: Optional[float]
+    db_round_trips: float
+    # The first exception raised by the operation, including during the warmup
+    error: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+@dataclass
+class BenchmarkRun:
+    started: str
+    commit: Optional[str]
+    python: str
+    iterations: int
+    operations: list[OperationResult] = field(default_factory=list)
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(asdict(self), indent=2))
+
+    @classmethod
+    def load(cls, path: Path) -> "BenchmarkRun":
+        data = json.loads(path.read_text())
+        operations = [OperationResult(**op) for op in data.pop("operations")]
+        return cls(**data, operations=operations)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    The value at `fraction` (0-1) through `sorted_values`, interpolating linearly.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        position - lower
+    )
+
+
+def _current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def measure(
+    operation: Operation, counter: CommandCounter, iterations: int, warmup: int = 3
+) -> OperationResult:
+    first_error = None
+    for iteration in range(warmup):
+        try:
+            await operation.run(iteration)
+        except Exception as e:
+            first_error = first_error or repr(e)
+
+    timings = []
+    errors = 0
+    commands_before = counter.count
+    for iteration in range(iterations):
+        started = time.perf_counter()
+        try:
+            await operation.run(iteration)
+        except Exception as e:
+            # A failure can be much quicker (or slower) than the real thing
+            errors += 1
+            first_error = first_error or repr(e)
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+    commands = counter.count - commands_before
+
+    timings.sort()
+    return OperationResult(
+        name=operation.name,
+        iterations=iterations,
+        errors=errors,
+        mean_ms=sum(timings) / len(timings) if timings else None,
+        min_ms=timings[0] if timings else None,
+        p50_ms=percentile(timings, 0.50) if timings else None,
+        p90_ms=percentile(timings, 0.90) if timings else None,
+        p95_ms=percentile(timings, 0.95) if timings else None,
+        p99_ms=percentile(timings, 0.99) if timings else None,
+        max_ms=timings[-1] if timings else None,
+        db_round_trips=commands / iterations,
+        error=first_error,
+    )
+
+
+async def hot_path_operations(samples: int = 50) -> list[Operation]:
+    """
+    The operations to benchmark, with sample inputs taken from the database.
+    """
+    from nsls2api.api.v1 import stats_api
+    from nsls2api.infrastructure.config import get_settings
+    from nsls2api.infrastructure.security import generate_api_key, get_current_user
+    from nsls2api.models.proposals import Proposal
+    from nsls2api.services import proposal_service
+
+    # Prefer proposals that can have directories (i.e. with beamlines and a cycle)
+    proposals = (
+        await Proposal.find(
+            {"instruments.0": {"$exists": True}, "cycles.0": {"$exists": True}}
+        )
+        .limit(samples)
+        .to_list()
+    )
+    if not proposals:
+        raise Exception(
+            "There are no proposals to benchmark with; generate some first with "
+            "'nsls2api dev generate-dataset'."
+        )
+
+    proposal_ids = [proposal.proposal_id for proposal in proposals]
+    usernames = [
+        user.username
+        for proposal in proposals
+        for user in proposal.users
+        if user.username is not None
+    ] or ["nobody"]
+    beamlines = sorted({b for proposal in proposals for b in proposal.instruments})
+    search_terms = [
+        word
+        for proposal in proposals
+        for word in (proposal.title or "").split()
+        if len(word) > 4
+    ] or [proposal_ids[0]]
+    api_key = (await generate_api_key("benchmark_user"))["key"]
+    settings = get_settings()
+
+    def pick(values: list, iteration: int):
+        return values[iteration % len(values)]
+
+    return [
+        Operation(
+            "proposal_by_id",
+            lambda i: proposal_service.proposal_by_id(pick(proposal_ids, i)),
+        ),
+        Operation(
+            "directories",
+            lambda i: proposal_service.directories(pick(proposal_ids, i)),
+        ),
+        Operation(
+            "fetch_proposals(include_directories=True)",
+            lambda i: proposal_service.fetch_proposals(
+                beamline=[pick(beamlines, i)], page_size=10, include_directories=True
+            ),
+        ),
+        Operation(
+            "search_proposals",
+            lambda i: proposal_service.search_proposals(pick(search_terms, i)),
+        ),
+        Operation(
+            "fetch_data_sessions_for_username",
+            lambda i: proposal_service.fetch_data_sessions_for_username(
+                pick(usernames, i)
+            ),
+        ),
+        Operation(
+            "commissioning_proposals",
+            lambda i: proposal_service.commissioning_proposals(),
+        ),
+        Operation(
+            "get_current_user",
+            lambda i: get_current_user(None, api_key=api_key, settings=settings),
+        ),
+        Operation("/v1/stats", lambda i: stats_api.stats()),
+    ]
+
+
+async def run_benchmarks(
+    counter: CommandCounter,
+    iterations: int = 100,
+    only: Optional[list[str]] = None,
+    on_result: Optional[Callable[[OperationResult], None]] = None,
+) -> BenchmarkRun:
+    """
+    :param counter: The command counter registered on the database connection.
+    :param iterations: How many times each operation is timed.
+    :param only: If given, only the operations whose names contain one of these.
+    :param on_result: Called with each result as soon as it's available.
+    """
+    run = BenchmarkRun(
+        started=datetime.datetime.now().isoformat(timespec="seconds"),
+        commit=_current_commit(),
+        python=platform.python_version(),
+        iterations=iterations,
+    )
+    for operation in await hot_path_operations():
+        if only and not any(name in operation.name for name in only):
+            continue
+        result = await measure(operation, counter, iterations)
+        run.operations.append(result)
+        if on_result is not None:
+            on_result(result)
+    return run
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: Optional[OperationResult]
+    current: Optional[OperationResult]
+
+    @staticmethod
+    def _change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+        if before is None or after is None:
+            return None
+        return (after - before) / before * 100 if before else None
+
+    @property
+    def p50_change(self) -> Optional[float]:
+        if self.baseline is None or self.current is None:
+            return None
+        return self._change(self.baseline.p50_ms, self.current.p50_ms)
+
+    @property
+    def p95_change(self) -> Optional[float]:
+        if self.baseline is None or self.current is None:
+            return None
+        return self._change(self.baseline.p95_ms, self.current.p95_ms)
+
+    def is_regression(self, threshold_percent: float) -> bool:
+        if self.baseline is None or self.current is None:
+            return False
+        # The latencies of an operation that now fails can't be compared
+        if self.current.failed and not self.baseline.failed:
+            return True
+        if self.current.db_round_trips > self.baseline.db_round_trips:
+            return True
+        return (self.p95_change or 0) > threshold_percent
+
+
+def compare(baseline: BenchmarkRun, current: BenchmarkRun) -> list[Comparison]:
+    baseline_results = {op.name: op for op in baseline.operations}
+    current_results = {op.name: op for op in current.operations}
+    names = list(current_results) + [
+        name for name in baseline_results if name not in current_results
+    ]
+    return [
+        Comparison(name, baseline_results.get(name), current_results.get(name))
+        for name in names
+    ]
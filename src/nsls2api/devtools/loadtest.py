@@ -0,0 +1,418 @@
+"""
+HTTP load testing against a running instance of the API.
+
+Requests come from two places: the scenarios in the `integration-tests/*.http` files
+(replayed in order, against the instance under test whatever host they name), and
+a few built-in scenarios for the busiest endpoints (the Tiled data session check,
+proposal reads and directory lookups).  The scenarios are mixed by weight and sent
+at a fixed rate, whether or not the earlier requests have finished, so a slow server
+shows up as growing latencies rather than a lower request rate.
+"""
+
+import asyncio
+import datetime
+import json
+import random
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import httpx
+
+from nsls2api.devtools.benchmarks import _current_commit, percentile
+
+# Upper bounds (in ms) of the latency histogram buckets; the last bucket is unbounded
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_VARIABLE = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+_REQUEST_LINE = re.compile(r"^(GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS)\s+(\S+)")
+_EXPECTED_STATUS = re.compile(r"response\.status\s*===?\s*(\d{3})")
+
+
+class LoadTestError(Exception):
+    pass
+
+
+@dataclass
+class HttpRequest:
+    name: str
+    method: str
+    # Relative to the instance under test, e.g. /v1/beamline/amx
+    path: str
+    headers: dict[str, str] = field(default_factory=dict)
+    body: Optional[str] = None
+    # The status the scenario checks for; otherwise any 2xx counts as a success
+    expected_status: Optional[int] = None
+
+    def succeeded(self, status_code: int) -> bool:
+        if self.expected_status is not None:
+            return status_code == self.expected_status
+        return 200 <= status_code < 300
+
+
+def _relative_path(url: str, substitute: Callable[[str], str]) -> str:
+    # The scenarios name their host through a variable (e.g. http://{{host}}/v1/...),
+    # or occasionally literally; either way the request goes to the instance under
+    # test.  The host is dropped before substituting, as the environments give it
+    # with a scheme and trailing slash.
+    url = substitute(re.sub(r"^(https?://)?\{\{\s*[\w.-]+\s*\}\}/*", "/", url))
+    url = re.sub(r"^https?://[^/]*", "", url)
+    return url if url.startswith("/") else f"/{url}"
+
+
+def parse_http_file(
+    text: str, name: str = "scenario", variables: Optional[dict[str, str]] = None
+) -> list[HttpRequest]:
+    """
+    Parse the requests out of a JetBrains-style `.http` file.
+
+    :param text: The contents of the file.
+    :param name: Used to name requests that don't have a `# @name`.
+    :param variables: Values for the `{{variables}}` in the paths, headers and
+        bodies (e.g. from `http-client.env.json`); `@variable = value` lines in the
+        file itself take precedence.
+    :return: The requests, in the order they appear in the file.
+    """
+    variables = dict(variables or {})
+    requests = []
+
+    def substitute(value: str) -> str:
+        return _VARIABLE.sub(
+            lambda match: variables.get(match.group(1), match.group(0)), value
+        )
+
+    for block in re.split(r"^###.*$", text, flags=re.MULTILINE):
+        request_name = None
+        request = None
+        body_lines = []
+        in_headers = False
+        handler = []
+        in_handler = False
+
+        for line in block.splitlines():
+            stripped = line.strip()
+            if in_handler:
+                handler.append(line)
+                in_handler = "%}" not in stripped
+                continue
+            if stripped.startswith("> {%"):
+                in_handler = "%}" not in stripped
+                handler.append(line)
+                continue
+            if request is None:
+                if match := re.match(r"^@([\w.-]+)\s*=\s*(.*)$", stripped):
+                    variables[match.group(1)] = match.group(2).strip()
+                elif match := re.match(r"^(#|//)\s*@name\s*=?\s*(\S+)", stripped):
+                    request_name = match.group(2)
+                elif match := _REQUEST_LINE.match(stripped):
+                    request = HttpRequest(
+                        name="",
+                        method=match.group(1),
+                        path=match.group(2),
+                    )
+                    in_headers = True
+                continue
+            if in_headers:
+                if not stripped:
+                    in_headers = False
+                elif ":" in stripped and not stripped.startswith("#"):
+                    header, value = stripped.split(":", 1)
+                    request.headers[header.strip()] = value.strip()
+                continue
+            body_lines.append(line)
+
+        if request is None:
+            continue
+
+        request.name = request_name or f"{name}-{len(requests) + 1}"
+        request.path = _relative_path(request.path, substitute)
+        request.headers = {
+            header: substitute(value) for header, value in request.headers.items()
+        }
+        body = "\n".join(body_lines).strip()
+        request.body = substitute(body) if body else None
+        if match := _EXPECTED_STATUS.search("\n".join(handler)):
+            request.expected_status = int(match.group(1))
+        requests.append(request)
+
+    return requests
+
+
+def load_http_environment(path: Path, environment: str) -> dict[str, str]:
+    """
+    The variables for `environment` from an `http-client.env.json` file.
+    """
+    environments = json.loads(path.read_text())
+    if environment not in environments:
+        raise LoadTestError(
+            f"Environment '{environment}' is not defined in {path} "
+            f"(expected one of: {', '.join(environments)})."
+        )
+    return {key: str(value) for key, value in environments[environment].items()}
+
+
+@dataclass
+class Scenario:
+    name: str
+    weight: float
+    # Called with a random number generator to pick the next request to send
+    next_request: Callable[[random.Random], HttpRequest]
+
+
+def replay_scenario(name: str, requests: list[HttpRequest], weight: float = 1.0):
+    """
+    A scenario that sends the given requests in order, starting again at the end.
+    """
+    if not requests:
+        raise LoadTestError(f"The scenario '{name}' has no requests.")
+    position = 0
+
+    def next_request(rng: random.Random) -> HttpRequest:
+        nonlocal position
+        request = requests[position % len(requests)]
+        position += 1
+        return request
+
+    return Scenario(name, weight, next_request)
+
+
+def builtin_scenarios(
+    proposal_ids: list[str], usernames: list[str], weights: dict[str, float]
+) -> list[Scenario]:
+    """
+    The scenarios for the busiest endpoints, with their inputs drawn at random.
+    """
+
+    def data_session(rng: random.Random) -> HttpRequest:
+        return HttpRequest(
+            "data-session", "GET", f"/v1/data-session/{rng.choice(usernames)}"
+        )
+
+    def proposal(rng: random.Random) -> HttpRequest:
+        return HttpRequest(
+            "proposal", "GET", f"/v1/proposal/{rng.choice(proposal_ids)}"
+        )
+
+    def directories(rng: random.Random) -> HttpRequest:
+        return HttpRequest(
+            "directories",
+            "GET",
+            f"/v1/proposal/{rng.choice(proposal_ids)}/directories",
+        )
+
+    scenarios = []
+    for name, next_request, inputs in [
+        ("data-session", data_session, usernames),
+        ("proposal", proposal, proposal_ids),
+        ("directories", directories, proposal_ids),
+    ]:
+        weight = weights.get(name, 0)
+        if weight <= 0:
+            continue
+        if not inputs:
+            raise LoadTestError(
+                f"There are no {'usernames' if inputs is usernames else 'proposal IDs'} "
+                f"for the '{name}' scenario."
+            )
+        scenarios.append(Scenario(name, weight, next_request))
+    return scenarios
+
+
+async def discover_inputs(
+    client: httpx.AsyncClient, count: int = 50
+) -> tuple[list[str], list[str]]:
+    """
+    Proposal IDs and usernames to use in the built-in scenarios, taken from the most
+    recently updated proposals on the instance under test.
+    """
+    response = await client.get(f"/v1/proposals/recent/{count}")
+    response.raise_for_status()
+    proposal_ids = [p["proposal_id"] for p in response.json()["proposals"]]
+
+    usernames = set()
+    for proposal_id in proposal_ids[:10]:
+        response = await client.get(f"/v1/proposal/{proposal_id}/usernames")
+        if response.is_success:
+            usernames.update(response.json().get("usernames", []))
+    return proposal_ids, sorted(usernames)
+
+
+@dataclass
+class LatencyHistogram:
+    bucket_counts: list[int] = field(
+        default_factory=lambda: [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    )
+    values_ms: list[float] = field(default_factory=list)
+
+    def record(self, value_ms: float) -> None:
+        self.values_ms.append(value_ms)
+        for index, upper_bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if value_ms <= upper_bound:
+                self.bucket_counts[index] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def buckets(self) -> dict[str, int]:
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS_MS]
+        labels.append(f">{HISTOGRAM_BUCKETS_MS[-1]}ms")
+        return dict(zip(labels, self.bucket_counts))
+
+    def percentile(self, fraction: float) -> float:
+        return percentile(sorted(self.values_ms), fraction)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    error_rate: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    histogram: dict[str, int]
+    # Count of each status code (or exception type, for failed requests)
+    outcomes: dict[str, int]
+
+
+@dataclass
+class LoadTestReport:
+    started: str
+    commit: Optional[str]
+    base_url: str
+    target_rps: float
+    duration_seconds: float
+    # Requests that couldn't be sent on time because too many were already in flight
+    dropped: int
+    scenarios: list[ScenarioResult] = field(default_factory=list)
+    total: Optional[ScenarioResult] = None
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(asdict(self), indent=2))
+
+
+class _Recorder:
+    def __init__(self):
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.errors: dict[str, int] = {}
+        self.outcomes: dict[str, dict[str, int]] = {}
+
+    def record(self, scenario: str, latency_ms: float, outcome: str, ok: bool):
+        self.histograms.setdefault(scenario, LatencyHistogram()).record(latency_ms)
+        self.errors[scenario] = self.errors.get(scenario, 0) + (not ok)
+        outcomes = self.outcomes.setdefault(scenario, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def result(self, name: str, scenarios: list[str], elapsed: float) -> ScenarioResult:
+        histogram = LatencyHistogram()
+        outcomes = {}
+        errors = 0
+        for scenario in scenarios:
+            for value in self.histograms[scenario].values_ms:
+                histogram.record(value)
+            for outcome, count in self.outcomes[scenario].items():
+                outcomes[outcome] = outcomes.get(outcome, 0) + count
+            errors += self.errors[scenario]
+        requests = len(histogram.values_ms)
+        return ScenarioResult(
+            name=name,
+            requests=requests,
+            errors=errors,
+            error_rate=errors / requests if requests else 0.0,
+            throughput_rps=requests / elapsed if elapsed else 0.0,
+            p50_ms=histogram.percentile(0.50),
+            p95_ms=histogram.percentile(0.95),
+            p99_ms=histogram.percentile(0.99),
+            max_ms=max(histogram.values_ms, default=0.0),
+            histogram=histogram.buckets(),
+            outcomes=dict(sorted(outcomes.items())),
+        )
+
+
+async def run_load_test(
+    client: httpx.AsyncClient,
+    scenarios: list[Scenario],
+    rps: float,
+    duration_seconds: float,
+    max_in_flight: int = 500,
+    seed: Optional[int] = None,
+) -> LoadTestReport:
+    """
+    Send requests from the weighted mix of `scenarios` at `rps` requests per second
+    for `duration_seconds`, and report how the instance coped.
+
+    :param client: The client to send requests with; its `base_url` is the instance
+        under test.
+    :param max_in_flight: The most requests waiting for a response at once.  When
+        the server falls this far behind, further requests are dropped (and counted)
+        rather than queued, so the test can't overwhelm the machine running it.
+    """
+    if rps <= 0 or duration_seconds <= 0:
+        raise LoadTestError("The request rate and duration must be positive.")
+    if not scenarios:
+        raise LoadTestError("There are no scenarios to run.")
+
+    rng = random.Random(seed)
+    weights = [scenario.weight for scenario in scenarios]
+    recorder = _Recorder()
+    in_flight: set[asyncio.Task] = set()
+    dropped = 0
+
+    async def send(scenario: Scenario, request: HttpRequest):
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                request.method,
+                request.path,
+                headers=request.headers,
+                content=request.body,
+            )
+            outcome = str(response.status_code)
+            ok = request.succeeded(response.status_code)
+        except httpx.HTTPError as error:
+            outcome = type(error).__name__
+            ok = False
+        recorder.record(
+            scenario.name, (time.perf_counter() - started) * 1000, outcome, ok
+        )
+
+    report = LoadTestReport(
+        started=datetime.datetime.now().isoformat(timespec="seconds"),
+        commit=_current_commit(),
+        base_url=str(client.base_url),
+        target_rps=rps,
+        duration_seconds=duration_seconds,
+        dropped=0,
+    )
+
+    total_requests = int(rps * duration_seconds)
+    start = time.perf_counter()
+    for index in range(total_requests):
+        # Open loop: each request has a fixed send time, however the earlier ones went
+        delay = start + index / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+            continue
+        scenario = rng.choices(scenarios, weights=weights)[0]
+        task = asyncio.create_task(send(scenario, scenario.next_request(rng)))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    elapsed = time.perf_counter() - start
+
+    names = [
+        scenario.name for scenario in scenarios if scenario.name in recorder.histograms
+    ]
+    report.dropped = dropped
+    report.scenarios = [recorder.result(name, [name], elapsed) for name in names]
+    if names:
+        report.total = recorder.result("total", names, elapsed)
+    return report
@@ -0,0 +1,20 @@
+"""
+The IDs given to synthetic data, shared by the synthetic dataset generator (see
+`synthetic_data_service`) and the upstream simulator, so that what is synchronized
+from the simulator lines up with a generated dataset (e.g. its proposals are on the
+generated beamlines).
+"""
+
+# Names of the synthetic beamlines, e.g. SYN01
+SYNTHETIC_BEAMLINE_PREFIX = "SYN"
+FIRST_SYNTHETIC_BEAMLINE_PASS_ID = 800000
+
+FIRST_SYNTHETIC_PROPOSAL_ID = 8000000
+
+
+def synthetic_beamline_name(index: int) -> str:
+    return f"{SYNTHETIC_BEAMLINE_PREFIX}{index + 1:02d}"
+
+
+def synthetic_beamline_pass_id(index: int) -> int:
+    return FIRST_SYNTHETIC_BEAMLINE_PASS_ID + index
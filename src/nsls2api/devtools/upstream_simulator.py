@@ -0,0 +1,541 @@
+"""
+A local stand-in for the PASS and BNL People web services, for load testing and
+benchmarking synchronization without touching the production services.
+
+It serves the same URL shapes that `pass_service` and `bnlpeople_service` call, under
+`/passapi` and `/BNLPeople`, so pointing the `pass_api_url` and `bnlpeople_api_url`
+settings at it (e.g. `http://localhost:8090/passapi`) is all that's needed.
+
+Responses come from recorded fixtures when there is one for the request, otherwise
+they are generated.  Generated data is deterministic for a given seed, so runs can be
+repeated and compared.  Latency, errors and payload sizes are configurable.
+
+The generated beamlines and proposal IDs are those of a synthetic dataset (see
+`synthetic_ids`), so synchronizing from the simulator into a database seeded with one
+updates its proposals on its beamlines.
+"""
+
+import asyncio
+import datetime
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from nsls2api.devtools.synthetic_ids import (
+    FIRST_SYNTHETIC_PROPOSAL_ID,
+    synthetic_beamline_name,
+    synthetic_beamline_pass_id,
+)
+from nsls2api.models.pass_models import (
+    PassAllocation,
+    PassCycle,
+    PassExperimenter,
+    PassPerson,
+    PassProposal,
+    PassProposalType,
+    PassResource,
+    PassSaf,
+)
+
+LATENCY_DISTRIBUTIONS = ("none", "fixed", "uniform", "exponential", "lognormal")
+
+# Proposal types, as returned by PASS for NSLS-II
+PROPOSAL_TYPES = [
+    (300001, "GU", "General User"),
+    (300003, "PU", "Partner User"),
+    (300004, "RA", "Rapid Access"),
+    (300005, "BC", "Beamline Commissioning (beamline staff only)"),
+    (300006, "BDT", "Block Allocation Group"),
+]
+COMMISSIONING_TYPE_ID = 300005
+
+_FIRST_CYCLE_ID = 100000
+# The same proposal IDs and beamlines as a generated synthetic dataset
+_FIRST_PROPOSAL_ID = FIRST_SYNTHETIC_PROPOSAL_ID
+_FIRST_EMPLOYEE_NUMBER = 1000000
+_DEPARTMENT_CODES = ["PS", "CFN", "CHEM", "ITD"]
+
+
+@dataclass
+class SimulatorConfig:
+    """
+    :param seed: Seed for the generated data (and for the injected latency and errors).
+    :param facility: The PASS facility ID the generated data belongs to.
+    :param first_year: The first year to generate cycles for.
+    :param years: The number of years of cycles (three cycles per year).
+    :param proposals_per_cycle: The number of proposals allocated in each cycle.
+    :param commissioning_share: The fraction of proposals that are commissioning proposals.
+    :param people: The number of distinct people experimenters are chosen from.
+    :param experimenters_min: The fewest experimenters on a proposal.
+    :param experimenters_max: The most experimenters on a proposal.
+    :param safs_max: The most SAFs on a proposal.
+    :param beamlines: The number of beamline resources.
+    :param latency_distribution: One of `LATENCY_DISTRIBUTIONS`.
+    :param latency_ms: The latency (the median, for lognormal; the mean, otherwise).
+    :param latency_spread: The spread of the latency (a fraction of `latency_ms`
+        either side, for uniform; sigma, for lognormal).
+    :param error_rate: The fraction of requests that fail with `error_status`.
+    :param error_status: The HTTP status of the injected errors.
+    :param fixtures_dir: A directory of recorded responses (see `fixture_path`).
+    """
+
+    seed: int = 0
+    facility: str = "NSLS-II"
+    first_year: int = 2020
+    years: int = 5
+    proposals_per_cycle: int = 200
+    commissioning_share: float = 0.1
+    people: int = 5000
+    experimenters_min: int = 1
+    experimenters_max: int = 12
+    safs_max: int = 3
+    beamlines: int = 30
+    latency_distribution: str = "none"
+    latency_ms: float = 0.0
+    latency_spread: float = 0.5
+    error_rate: float = 0.0
+    error_status: int = 503
+    fixtures_dir: Optional[Path] = None
+
+    def __post_init__(self):
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution '{self.latency_distribution}', "
+                f"expected one of {', '.join(LATENCY_DISTRIBUTIONS)}."
+            )
+        if not 0 <= self.error_rate <= 1:
+            raise ValueError("The error rate must be between 0 and 1.")
+        if self.experimenters_min < 1:
+            raise ValueError("Every proposal needs at least one experimenter (the PI).")
+        if self.experimenters_min > self.experimenters_max:
+            raise ValueError(
+                "experimenters_min must not be more than experimenters_max."
+            )
+
+
+def sample_latency(config: SimulatorConfig, rng: random.Random) -> float:
+    """
+    :return: A latency, in seconds, drawn from the configured distribution.
+    """
+    mean = config.latency_ms / 1000
+    match config.latency_distribution:
+        case "none":
+            return 0.0
+        case "fixed":
+            return mean
+        case "uniform":
+            return max(
+                0.0,
+                rng.uniform(
+                    mean * (1 - config.latency_spread),
+                    mean * (1 + config.latency_spread),
+                ),
+            )
+        case "exponential":
+            return rng.expovariate(1 / mean) if mean > 0 else 0.0
+        case "lognormal":
+            return rng.lognormvariate(0, config.latency_spread) * mean
+    return 0.0
+
+
+class SimulatedUpstream:
+    """
+    Generates PASS and BNL People responses.  Everything is derived from the seed
+    and the IDs in the request, so the same request always gets the same response.
+    """
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.cycles = self._generate_cycles()
+
+    def _rng(self, *parts) -> random.Random:
+        return random.Random(":".join(str(part) for part in (self.config.seed, *parts)))
+
+    # People
+
+    def account_name(self, person_index: int) -> str:
+        return f"simuser{person_index:05d}"
+
+    def employee_number(self, person_index: int) -> str:
+        return str(_FIRST_EMPLOYEE_NUMBER + person_index)
+
+    def person_index_by_employee_number(self, employee_number: str) -> Optional[int]:
+        try:
+            index = int(employee_number) - _FIRST_EMPLOYEE_NUMBER
+        except ValueError:
+            return None
+        return index if 0 <= index < self.config.people else None
+
+    def person_index_by_account_name(self, account_name: str) -> Optional[int]:
+        if not account_name.startswith("simuser"):
+            return None
+        try:
+            index = int(account_name.removeprefix("simuser"))
+        except ValueError:
+            return None
+        return index if 0 <= index < self.config.people else None
+
+    def bnl_person(self, person_index: int) -> dict:
+        rng = self._rng("person", person_index)
+        return {
+            "ActiveDirectoryName": self.account_name(person_index),
+            "BNLEmail": f"{self.account_name(person_index)}@bnl.gov",
+            "EmployeeNumber": self.employee_number(person_index),
+            "EmployeeType": rng.choice(["Staff", "Guest", "Student"]),
+            "FirstName": f"Sim{person_index}",
+            "LastName": rng.choice(["Smith", "Jones", "Garcia", "Chen", "Okafor"]),
+            "Institution": rng.choice(["BNL", "Stony Brook", "Columbia", "Yale"]),
+            "IsUSCitizen": rng.random() < 0.7,
+            "DepartmentCode": rng.choice(_DEPARTMENT_CODES),
+            "EmployeeStatus": rng.choices(
+                ["Active", "Inactive", "Pending"], weights=[85, 10, 5]
+            )[0],
+        }
+
+    def people(
+        self,
+        account_name: Optional[str] = None,
+        employee_number: Optional[str] = None,
+        email: Optional[str] = None,
+        department_code: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        The people matching all of the given criteria, as the BNL People API
+        filters them (email, department and status are not case sensitive).
+        """
+        if account_name is not None:
+            indexes = [self.person_index_by_account_name(account_name)]
+        elif employee_number is not None:
+            indexes = [self.person_index_by_employee_number(employee_number)]
+        elif email is not None:
+            account_name = email.partition("@")[0].lower()
+            indexes = [self.person_index_by_account_name(account_name)]
+        else:
+            indexes = range(self.config.people)
+
+        criteria = {
+            "BNLEmail": email,
+            "DepartmentCode": department_code,
+            "EmployeeStatus": status,
+        }
+        criteria = {field: value.lower() for field, value in criteria.items() if value}
+        people = []
+        for index in indexes:
+            if index is None:
+                continue
+            person = self.bnl_person(index)
+            if all(person[field].lower() == value for field, value in criteria.items()):
+                people.append(person)
+        return people
+
+    def _pass_person(self, person_index: int, proposal_id: int, cls=PassPerson):
+        return cls(
+            Account=self.account_name(person_index),
+            BNL_ID=self.employee_number(person_index),
+            Email=f"{self.account_name(person_index)}@example.com",
+            First_Name=f"Sim{person_index}",
+            Last_Name="User",
+            Proposal_ID=proposal_id,
+            User_ID=person_index,
+            User_Facility_ID=self.config.facility,
+        )
+
+    # Cycles, resources and proposal types
+
+    def _generate_cycles(self) -> list[PassCycle]:
+        cycles = []
+        for year in range(
+            self.config.first_year, self.config.first_year + self.config.years
+        ):
+            for run, (start_month, end_month) in enumerate(
+                [(1, 4), (5, 8), (9, 12)], start=1
+            ):
+                start = datetime.datetime(year, start_month, 1)
+                end = datetime.datetime(year, end_month, 28)
+                cycles.append(
+                    PassCycle(
+                        Active=True,
+                        ID=_FIRST_CYCLE_ID + len(cycles),
+                        Year=year,
+                        Start_Date=start.isoformat(),
+                        End_Date=end.isoformat(),
+                        Name=f"{year}-{run}",
+                        Description=f"{year} Cycle {run}",
+                        User_Facility_ID=self.config.facility,
+                    )
+                )
+        return cycles
+
+    def resources(self) -> list[PassResource]:
+        return [
+            PassResource(
+                ID=synthetic_beamline_pass_id(index),
+                Description=f"Synthetic Beamline {synthetic_beamline_name(index)}",
+                Short_Name=synthetic_beamline_name(index),
+                User_Facility_ID=self.config.facility,
+            )
+            for index in range(self.config.beamlines)
+        ]
+
+    def proposal_types(self) -> list[PassProposalType]:
+        return [
+            PassProposalType(
+                ID=type_id,
+                Code=code,
+                Description=description,
+                User_Facility_ID=self.config.facility,
+            )
+            for type_id, code, description in PROPOSAL_TYPES
+        ]
+
+    # Proposals
+
+    def cycle_proposal_ids(self, cycle_index: int) -> range:
+        first = _FIRST_PROPOSAL_ID + cycle_index * self.config.proposals_per_cycle
+        return range(first, first + self.config.proposals_per_cycle)
+
+    def _proposal_cycle_index(self, proposal_id: int) -> Optional[int]:
+        index = (proposal_id - _FIRST_PROPOSAL_ID) // max(
+            1, self.config.proposals_per_cycle
+        )
+        return index if 0 <= index < len(self.cycles) else None
+
+    def _is_commissioning(self, proposal_id: int) -> bool:
+        return (
+            self._rng("commissioning", proposal_id).random()
+            < self.config.commissioning_share
+        )
+
+    def _experimenter_indexes(self, proposal_id: int) -> list[int]:
+        rng = self._rng("experimenters", proposal_id)
+        count = rng.randint(
+            self.config.experimenters_min, self.config.experimenters_max
+        )
+        return rng.sample(range(self.config.people), min(count, self.config.people))
+
+    def proposal(self, proposal_id: int) -> Optional[PassProposal]:
+        if self._proposal_cycle_index(proposal_id) is None:
+            return None
+
+        rng = self._rng("proposal", proposal_id)
+        people = self._experimenter_indexes(proposal_id)
+        pi = people[0]
+        if self._is_commissioning(proposal_id):
+            type_id, _, type_description = PROPOSAL_TYPES[3]
+        else:
+            type_id, _, type_description = rng.choice(
+                PROPOSAL_TYPES[:3] + PROPOSAL_TYPES[4:]
+            )
+
+        resources = self.resources()
+        return PassProposal(
+            Expired=False,
+            Proposal_ID=proposal_id,
+            Proposal_Type_ID=type_id,
+            Proposal_Type_Description=type_description,
+            PI_User_ID=pi,
+            Creator_User_ID=pi,
+            Title=f"Simulated proposal {proposal_id}",
+            User_Facility_ID=self.config.facility,
+            PI=self._pass_person(pi, proposal_id),
+            Creator=self._pass_person(pi, proposal_id),
+            Experimenters=[
+                self._pass_person(person, proposal_id, cls=PassExperimenter)
+                for person in people
+            ],
+            Resources=rng.sample(resources, min(len(resources), rng.randint(1, 2))),
+        )
+
+    def safs(self, proposal_id: int) -> list[PassSaf]:
+        proposal = self.proposal(proposal_id)
+        if proposal is None:
+            return []
+        rng = self._rng("safs", proposal_id)
+        return [
+            PassSaf(
+                SAF_ID=proposal_id * 10 + index,
+                Status=rng.choice(["APPROVED", "APPROVED", "APPROVED", "PENDING"]),
+                Date_Expires=f"{datetime.date.today().year + 1}-12-31",
+                Experimenters=proposal.Experimenters,
+                Resources=proposal.Resources,
+            )
+            for index in range(rng.randint(0, self.config.safs_max))
+        ]
+
+    def allocations(self, cycle_id: int) -> list[PassAllocation]:
+        cycle_index = cycle_id - _FIRST_CYCLE_ID
+        if not 0 <= cycle_index < len(self.cycles):
+            return []
+        cycle = self.cycles[cycle_index]
+        allocations = []
+        for proposal_id in self.cycle_proposal_ids(cycle_index):
+            if self._is_commissioning(proposal_id):
+                continue
+            proposal = self.proposal(proposal_id)
+            allocations.append(
+                PassAllocation(
+                    Proposal_ID=proposal_id,
+                    Cycle_Request_ID=cycle.ID,
+                    Cycle_Requested_Description=cycle.Description,
+                    Allocated_Proposal_Type_ID=proposal.Proposal_Type_ID,
+                    Allocated_Proposal_Type_Description=proposal.Proposal_Type_Description,
+                    Total_Hours_Awarded=float(
+                        self._rng("hours", proposal_id).randint(8, 96)
+                    ),
+                    Title=proposal.Title,
+                    User_Facility_ID=self.config.facility,
+                    PI=proposal.PI,
+                )
+            )
+        return allocations
+
+    def commissioning_proposals(self, year: int) -> list[PassProposal]:
+        proposals = []
+        for cycle_index, cycle in enumerate(self.cycles):
+            if cycle.Year != year:
+                continue
+            for proposal_id in self.cycle_proposal_ids(cycle_index):
+                if self._is_commissioning(proposal_id):
+                    proposals.append(self.proposal(proposal_id))
+        return proposals
+
+    def proposals_by_person(self, employee_number: str) -> list[PassProposal]:
+        person = self.person_index_by_employee_number(employee_number)
+        if person is None:
+            return []
+        proposals = []
+        for cycle_index in range(len(self.cycles)):
+            for proposal_id in self.cycle_proposal_ids(cycle_index):
+                if person in self._experimenter_indexes(proposal_id):
+                    proposals.append(self.proposal(proposal_id))
+        return proposals
+
+
+def fixture_path(fixtures_dir: Path, request: Request) -> Path:
+    """
+    Where a recorded response for the request would be.
+
+    The PASS API key is left out, so `/passapi/Proposal/GetProposal/KEY/NSLS-II/312064`
+    is `passapi/Proposal/GetProposal/NSLS-II/312064.json`, and any query string is
+    added to the name, so `/BNLPeople/api/BNLPeople?accountName=jbloggs` is
+    `BNLPeople/api/BNLPeople/accountName=jbloggs.json`.
+    """
+    parts = [part for part in request.url.path.split("/") if part]
+    if parts and parts[0] == "passapi" and len(parts) > 3:
+        del parts[3]
+    if request.url.query:
+        parts.append(request.url.query.replace("/", "_"))
+    path = fixtures_dir.joinpath(*parts)
+    # Not with_suffix, which would replace the end of a name containing a dot
+    return path.with_name(f"{path.name}.json")
+
+
+def _dump(models) -> list[dict]:
+    return [model.model_dump(mode="json") for model in models]
+
+
+def create_app(config: Optional[SimulatorConfig] = None) -> FastAPI:
+    if config is None:
+        config = SimulatorConfig()
+    upstream = SimulatedUpstream(config)
+    # Separate from the data, so injected latency/errors don't change the responses
+    chaos = random.Random(config.seed)
+
+    app = FastAPI(title="PASS and BNL People simulator", docs_url="/")
+    app.state.config = config
+    app.state.upstream = upstream
+
+    @app.middleware("http")
+    async def inject_latency_and_errors(request: Request, call_next):
+        latency = sample_latency(config, chaos)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        if config.error_rate and chaos.random() < config.error_rate:
+            return JSONResponse(
+                {"Message": "Simulated upstream error."},
+                status_code=config.error_status,
+            )
+        if config.fixtures_dir is not None:
+            recorded = fixture_path(config.fixtures_dir, request)
+            if recorded.is_file():
+                return Response(recorded.read_bytes(), media_type="application/json")
+        return await call_next(request)
+
+    @app.get("/passapi/Proposal/GetProposal/{api_key}/{facility}/{proposal_id}")
+    async def get_proposal(api_key: str, facility: str, proposal_id: int):
+        proposal = upstream.proposal(proposal_id)
+        if proposal is None:
+            return JSONResponse({"Message": "Proposal not found."}, status_code=404)
+        return proposal.model_dump(mode="json")
+
+    @app.get("/passapi/Proposal/GetProposalTypes/{api_key}/{facility}")
+    async def get_proposal_types(api_key: str, facility: str):
+        return _dump(upstream.proposal_types())
+
+    @app.get("/passapi/SAF/GetSAFsByProposal/{api_key}/{facility}/{proposal_id}")
+    async def get_safs(api_key: str, facility: str, proposal_id: int):
+        return _dump(upstream.safs(proposal_id))
+
+    @app.get(
+        "/passapi/Proposal/GetProposalsByType/{api_key}/{facility}/{year}/{type_id}/{unused}"
+    )
+    async def get_proposals_by_type(
+        api_key: str, facility: str, year: int, type_id: int, unused: str
+    ):
+        if type_id != COMMISSIONING_TYPE_ID:
+            return []
+        return _dump(upstream.commissioning_proposals(year))
+
+    @app.get("/passapi/Resource/GetResources/{api_key}/{facility}")
+    async def get_resources(api_key: str, facility: str):
+        return _dump(upstream.resources())
+
+    @app.get("/passapi/Proposal/GetCycles/{api_key}/{facility}")
+    async def get_cycles(api_key: str, facility: str):
+        return _dump(upstream.cycles)
+
+    @app.get(
+        "/passapi/Proposal/GetProposalsAllocatedByCycle/{api_key}/{facility}/{cycle_id}/{unused}"
+    )
+    async def get_proposals_allocated_by_cycle(
+        api_key: str, facility: str, cycle_id: int, unused: str
+    ):
+        return _dump(upstream.allocations(cycle_id))
+
+    @app.get("/passapi/Proposal/GetProposalsAllocated/{api_key}/{facility}")
+    async def get_proposals_allocated(api_key: str, facility: str):
+        allocations = []
+        for cycle in upstream.cycles:
+            allocations.extend(upstream.allocations(cycle.ID))
+        return _dump(allocations)
+
+    @app.get(
+        "/passapi/Proposal/GetProposalsByPerson/{api_key}/{facility}/{a}/{b}/{bnl_id}/{c}"
+    )
+    async def get_proposals_by_person(
+        api_key: str, facility: str, a: str, b: str, bnl_id: str, c: str
+    ):
+        return _dump(upstream.proposals_by_person(bnl_id))
+
+    @app.get("/BNLPeople/api/BNLPeople")
+    async def get_people(
+        accountName: Optional[str] = None,
+        employeeNumber: Optional[str] = None,
+        email: Optional[str] = None,
+        departmentCode: Optional[str] = None,
+        status: Optional[str] = None,
+    ):
+        return upstream.people(
+            account_name=accountName,
+            employee_number=employeeNumber,
+            email=email,
+            department_code=departmentCode,
+            status=status,
+        )
+
+    return app
@@ -6,7 +6,7 @@ from fastapi import FastAPI
 from nsls2api.infrastructure import mongodb_setup
 from nsls2api.infrastructure.config import get_settings
 from nsls2api.infrastructure.logging import logger
-from nsls2api.services import background_service
+from nsls2api.services import background_service, n2sn_service, scheduler_service
 from nsls2api.services.helpers import httpx_client_wrapper
 from nsls2api.version import get_version
 
@@ -26,12 +26,26 @@ async def app_lifespan(app: FastAPI):
     # Create a shared httpx client
     httpx_client_wrapper.start()
 
-    # Start the background workers
+    # Follow changes to the jobs made by any process, for the job event streams (and
+    # to wake the background workers)
+    background_service.start_jobs_watcher()
 
-    # noinspection PyAsyncCall
-    asyncio.create_task(background_service.worker_function())
+    # Start the background workers (unless they are run separately with `nsls2api worker`)
+    if settings.run_background_workers_in_api:
+        # noinspection PyAsyncCall
+        asyncio.create_task(background_service.worker_function())
+        if settings.scheduler_enabled:
+            # noinspection PyAsyncCall
+            asyncio.create_task(scheduler_service.scheduler_function())
+    else:
+        logger.info("Background workers are disabled in the API processes.")
 
     yield
 
+    background_service.stop_jobs_watcher()
+
     # Cleanup httpx client
     await httpx_client_wrapper.stop()
+
+    # Close the Active Directory connections
+    n2sn_service.close_ldap_pool()
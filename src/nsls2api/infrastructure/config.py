@@ -19,11 +19,39 @@ class Settings(BaseSettings):
     -----------
     pass_api_key (str): The API key used for authentication with the PASS API.
     pass_api_url (str): The URL of the PASS API. Defaults to "https://passservices.bnl.gov/passapi".
+    bnlpeople_api_url (str): The URL of the BNL People API. Defaults to "https://api.bnl.gov/BNLPeople".
     active_directory_server (str): The server address for the Active Directory.
     active_directory_server_list (str): A list of Active Directory server addresses.
     n2sn_user_search (str): The search query for user information in N2SN.
     n2sn_group_search (str): The search query for group information in N2SN.
     bnlroot_ca_certs_file (str): The file path for the BNL root CA certificates.
+    mongodb_query_warning_threshold (int): The number of database queries made by one request above which a warning is logged.
+    mongodb_slow_query_ms (int): How long a database query can take (in milliseconds) before it is logged as slow.
+    ldap_pool_size (int): The number of Active Directory connections (and threads) each process keeps open.
+    ldap_call_timeout_seconds (float): The longest to wait for an Active Directory lookup, including waiting for a free connection.
+    ldap_connection_max_age_seconds (int): How long an Active Directory connection is reused before it is replaced.
+    ldap_group_cache_ttl_seconds (int): How long the members of an Active Directory group are cached before they are refreshed.
+    ldap_group_cache_stale_seconds (int): How much longer the cached members of a group are used while they are refreshed in the background.
+    sync_write_batch_size (int): The number of proposals written per bulk write during synchronization.
+    sync_fetch_concurrency (int): The number of proposals fetched from PASS concurrently during synchronization.
+    sync_enrich_concurrency (int): The number of proposals enriched (usernames, beamlines) concurrently.
+    sync_transform_concurrency (int): The number of proposals transformed into documents concurrently.
+    sync_queue_size (int): The maximum number of proposals waiting between synchronization stages.
+    run_background_workers_in_api (bool): Whether the API processes also run background jobs (disable when running `nsls2api worker` separately).
+    background_worker_concurrency (int): The number of background jobs each worker process runs concurrently.
+    job_lease_seconds (int): How long a running job may go without renewing its lease before it is considered stale and reclaimed.
+    job_poll_backoff_max_seconds (float): The longest a worker process waits between checks for new jobs without a change stream (e.g. against a standalone MongoDB server).  The wait starts short and doubles up to this while there are none.
+    job_watch_fallback_poll_seconds (float): How often a worker process checks for new jobs while a change stream notifies it of them (as a safety net), and how long it waits before reopening a failed change stream.
+    job_action_concurrency_limits (dict[str, int]): The maximum number of jobs of each action that may run at once across all workers (actions not listed are unlimited).
+    job_checkpoint_interval_seconds (int): The minimum interval between checkpoints saved by long-running jobs.
+    job_progress_interval_seconds (int): The minimum interval between progress updates saved by long-running jobs.
+    job_batch_max_size (int): The maximum number of jobs that can be submitted, or queried, in one batch request.
+    job_events_max_seconds (int): The longest a client can stay connected to the job events stream.
+    job_events_poll_interval_seconds (float): How often the job events stream checks for changes when it cannot be notified of them.
+    scheduler_enabled (bool): Whether the worker processes queue jobs from the schedules stored in the database.
+    scheduler_tick_seconds (int): How often the scheduler checks for schedules that are due.
+    scheduler_lease_seconds (int): How long the scheduler lease lasts without being renewed before another process takes over.
+    allow_synthetic_data (bool): Whether synthetic datasets can be generated through the API (only enable for development and test databases).
 
     model_config (SettingsConfigDict): An instance of the `SettingsConfigDict` class, used for loading settings from an environment file (".env").
 
@@ -48,9 +76,16 @@ class Settings(BaseSettings):
     n2sn_user_search: str
     n2sn_group_search: str
     bnlroot_ca_certs_file: str
+    ldap_pool_size: int = 4
+    ldap_call_timeout_seconds: float = 10.0
+    ldap_connection_max_age_seconds: int = 300
+    ldap_group_cache_ttl_seconds: int = 300
+    ldap_group_cache_stale_seconds: int = 600
 
     # MongoDB settings
     mongodb_dsn: MongoDsn
+    mongodb_query_warning_threshold: int = 50
+    mongodb_slow_query_ms: int = 500
 
     # Proxy settings
     use_socks_proxy: bool = False
@@ -66,6 +101,41 @@ class Settings(BaseSettings):
     pass_api_key: str
     pass_api_url: HttpUrl = "https://passservices.bnl.gov/passapi"
 
+    # BNL People settings
+    bnlpeople_api_url: HttpUrl = "https://api.bnl.gov/BNLPeople"
+
+    # Synchronization settings
+    sync_write_batch_size: int = 500
+    sync_fetch_concurrency: int = 4
+    sync_enrich_concurrency: int = 4
+    sync_transform_concurrency: int = 1
+    sync_queue_size: int = 100
+
+    # Background job settings
+    run_background_workers_in_api: bool = True
+    background_worker_concurrency: int = 4
+    job_lease_seconds: int = 300
+    job_poll_backoff_max_seconds: float = 1.0
+    job_watch_fallback_poll_seconds: float = 10.0
+    job_action_concurrency_limits: dict[str, int] = {
+        "synchronize_proposals_for_cycle": 1,
+        "synchronize_proposals_incremental": 1,
+        "update_cycle_information": 1,
+    }
+    job_checkpoint_interval_seconds: int = 30
+    job_progress_interval_seconds: int = 5
+    job_batch_max_size: int = 1000
+    job_events_max_seconds: int = 300
+    job_events_poll_interval_seconds: float = 2.0
+
+    # Job scheduler settings
+    scheduler_enabled: bool = False
+    scheduler_tick_seconds: int = 30
+    scheduler_lease_seconds: int = 90
+
+    # Development settings
+    allow_synthetic_data: bool = False
+
     model_config = SettingsConfigDict(
         env_file=str(Path(__file__).parent.parent / ".env"),
         extra="ignore",
@@ -0,0 +1,286 @@
+"""
+Monitoring of the commands sent to MongoDB.
+
+The number (and total time) of the commands sent while handling each request, or
+running each background job, is counted so that endpoints which fan out into many
+queries (e.g. one per item in a list) are easy to spot.  The count for a request is
+reported in its `Server-Timing` header, and tests can hold code to a query budget
+with `query_budget`.
+
+The time taken by every command is also recorded in a Prometheus histogram, by
+collection, command and the shape of its filter (the filter with its values left
+out), and slow commands are logged.  `getMore`s that wait for new data on a change
+stream (or other tailable cursor) are left out of both, as they are meant to block.
+"""
+
+import contextlib
+import contextvars
+import json
+import threading
+from typing import Any, Iterator, Optional
+
+from pymongo import monitoring
+
+from nsls2api.infrastructure import metrics
+from nsls2api.infrastructure.config import get_settings
+from nsls2api.infrastructure.logging import logger
+
+settings = get_settings()
+
+
+class QueryCount:
+    """
+    The commands sent to MongoDB in one scope (e.g. a request).  Scopes can be
+    nested, in which case the commands are also counted by the enclosing scopes.
+    """
+
+    def __init__(self, parent: Optional["QueryCount"] = None):
+        self.parent = parent
+        self.count = 0
+        self.duration_ms = 0.0
+        # Motor runs commands (and so the listeners) on its own threads
+        self._lock = threading.Lock()
+
+    def _started(self) -> None:
+        with self._lock:
+            self.count += 1
+        if self.parent is not None:
+            self.parent._started()
+
+    def _finished(self, duration_ms: float) -> None:
+        with self._lock:
+            self.duration_ms += duration_ms
+        if self.parent is not None:
+            self.parent._finished(duration_ms)
+
+
+_current_query_count: contextvars.ContextVar[Optional[QueryCount]] = (
+    contextvars.ContextVar("current_query_count", default=None)
+)
+
+
+class QueryCountListener(monitoring.CommandListener):
+    """
+    Counts each command against the `QueryCount` of the scope it was sent from.
+
+    This relies on the context being carried over to the thread that sends the
+    command, which Motor does (as does PyMongo's own async API).
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        query_count = _current_query_count.get()
+        if query_count is not None:
+            query_count._started()
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        query_count = _current_query_count.get()
+        if query_count is not None:
+            query_count._finished(event.duration_micros / 1000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        query_count = _current_query_count.get()
+        if query_count is not None:
+            query_count._finished(event.duration_micros / 1000)
+
+
+# Operators whose operand is a list of filters, rather than of values
+_LOGICAL_OPERATORS = {"$and", "$or", "$nor"}
+
+# Keeps the number of distinct label values (and the log lines) manageable
+_MAX_FILTER_SHAPE_LENGTH = 200
+
+
+def _shape(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: (
+                [_shape(item) for item in operand]
+                if key in _LOGICAL_OPERATORS and isinstance(operand, list)
+                else _shape(operand)
+            )
+            for key, operand in sorted(value.items())
+        }
+    return "?"
+
+
+def filter_shape(query: Optional[dict]) -> str:
+    """
+    The shape of a query filter: its fields and operators, with every value
+    replaced by `?`, e.g. `{"instruments":{"$in":"?"},"proposal_id":"?"}`.  Fields
+    are sorted, so the same query written in a different order has the same shape.
+    """
+    if not query:
+        return ""
+    shape = json.dumps(_shape(query), separators=(",", ":"))
+    if len(shape) > _MAX_FILTER_SHAPE_LENGTH:
+        shape = shape[: _MAX_FILTER_SHAPE_LENGTH - 3] + "..."
+    return shape
+
+
+def _command_filter(command_name: str, command: dict) -> Optional[dict]:
+    match command_name:
+        case "find":
+            return command.get("filter")
+        case "count" | "distinct" | "findAndModify":
+            return command.get("query")
+        case "aggregate":
+            pipeline = command.get("pipeline") or [{}]
+            return pipeline[0].get("$match")
+        case "update":
+            return (command.get("updates") or [{}])[0].get("q")
+        case "delete":
+            return (command.get("deletes") or [{}])[0].get("q")
+    return None
+
+
+def _command_collection(command_name: str, command: dict) -> str:
+    if command_name == "getMore":
+        collection = command.get("collection")
+    else:
+        # Most commands take the collection as the value of the command name
+        collection = command.get(command_name)
+    return collection if isinstance(collection, str) else ""
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Records how long each command takes in the `mongodb_command_duration_seconds`
+    histogram, and logs the commands slower than `mongodb_slow_query_ms`.
+
+    Commands that wait for new data on a change stream are ignored, as their
+    duration is mostly spent idle.
+    """
+
+    def __init__(self):
+        # The labels of the commands in progress, as the finished events don't
+        # include the command itself
+        self._in_progress: dict[tuple, tuple[str, str, str]] = {}
+        # The commands opening change streams, and the cursors they returned
+        self._opening_change_streams: set[tuple] = set()
+        self._change_stream_cursors: set[int] = set()
+        self._lock = threading.Lock()
+
+    def _is_awaiting_data(self, command_name: str, command: dict) -> bool:
+        if command_name != "getMore":
+            return False
+        # getMores on other tailable, awaitData cursors are sent with a maxTimeMS,
+        # which is how long the server waits for new data before answering
+        return command["getMore"] in self._change_stream_cursors or (
+            "maxTimeMS" in command
+        )
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return event.connection_id, event.request_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        command_name = event.command_name
+        with self._lock:
+            if command_name == "killCursors":
+                self._change_stream_cursors.difference_update(
+                    event.command.get("cursors", [])
+                )
+            elif command_name == "aggregate" and "$changeStream" in (
+                (event.command.get("pipeline") or [{}])[0]
+            ):
+                self._opening_change_streams.add(self._key(event))
+            elif self._is_awaiting_data(command_name, event.command):
+                return
+        labels = (
+            _command_collection(command_name, event.command),
+            command_name,
+            filter_shape(_command_filter(command_name, event.command)),
+        )
+        with self._lock:
+            self._in_progress[self._key(event)] = labels
+
+    def _finished(self, event, failed: bool) -> None:
+        with self._lock:
+            labels = self._in_progress.pop(self._key(event), None)
+        if labels is None:
+            return
+        collection, command_name, shape = labels
+
+        metrics.mongodb_command_duration_seconds.labels(*labels).observe(
+            event.duration_micros / 1_000_000
+        )
+        if failed:
+            metrics.mongodb_command_failures.labels(collection, command_name).inc()
+
+        duration_ms = event.duration_micros / 1000
+        if duration_ms > settings.mongodb_slow_query_ms:
+            logger.warning(
+                f"Slow MongoDB query: {command_name} on {event.database_name}."
+                f"{collection} took {duration_ms:.1f} ms (filter: {shape or 'none'})."
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        with self._lock:
+            if self._key(event) in self._opening_change_streams:
+                self._opening_change_streams.discard(self._key(event))
+                cursor_id = event.reply.get("cursor", {}).get("id")
+                if cursor_id:
+                    self._change_stream_cursors.add(cursor_id)
+        self._finished(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        with self._lock:
+            self._opening_change_streams.discard(self._key(event))
+        self._finished(event, failed=True)
+
+
+# The listeners that `mongodb_setup.init_connection` always registers
+command_listeners: list[monitoring.CommandListener] = [
+    QueryCountListener(),
+    CommandMetricsListener(),
+]
+
+
+@contextlib.contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """
+    Count the commands sent to MongoDB within the block, including from any tasks
+    started within it.
+    """
+    query_count = QueryCount(parent=_current_query_count.get())
+    token = _current_query_count.set(query_count)
+    try:
+        yield query_count
+    finally:
+        _current_query_count.reset(token)
+
+
+def log_query_count(description: str, query_count: QueryCount) -> None:
+    """
+    Log the commands sent to MongoDB for a request, warning when there are enough of
+    them to suggest an N+1 query.
+    """
+    message = (
+        f"{description} made {query_count.count} database queries "
+        f"({query_count.duration_ms:.1f} ms)."
+    )
+    if query_count.count > settings.mongodb_query_warning_threshold:
+        logger.warning(message)
+    else:
+        logger.debug(message)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextlib.contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryCount]:
+    """
+    Fail if the block sends more than `max_queries` commands to MongoDB; for tests,
+    so that a change which adds queries to an endpoint is caught.
+
+    :raises QueryBudgetExceeded: If the budget was exceeded.
+    """
+    with count_queries() as query_count:
+        yield query_count
+    if query_count.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"Made {query_count.count} database queries, "
+            f"but the budget is {max_queries}."
+        )
@@ -0,0 +1,97 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# These are registered with the default registry, so they are exposed on the same
+# /metrics endpoint as the metrics from prometheus-fastapi-instrumentator.
+
+jobs_coalesced = Counter(
+    "nsls2api_jobs_coalesced_total",
+    "Requests for a background job that were merged into an identical unfinished job.",
+    ["action"],
+)
+
+job_claim_conflicts = Counter(
+    "nsls2api_job_claim_conflicts_total",
+    "Races for a background job lost to another worker, when claiming the job or writing to it after its lease was taken over.",
+)
+
+job_leases_lost = Counter(
+    "nsls2api_job_leases_lost_total",
+    "Running background jobs abandoned because their lease was taken over by another worker.",
+    ["action"],
+)
+
+job_stale_writes_rejected = Counter(
+    "nsls2api_job_stale_writes_rejected_total",
+    "Checkpoint or completion writes rejected because the writer no longer held the job lease.",
+    ["operation"],
+)
+
+jobs_reclaimed = Counter(
+    "nsls2api_jobs_reclaimed_total",
+    "Background jobs returned to the queue after their lease expired.",
+)
+
+job_retries = Counter(
+    "nsls2api_job_retries_total",
+    "Background jobs returned to the queue to be retried after a transient failure.",
+    ["action"],
+)
+
+jobs_dead_lettered = Counter(
+    "nsls2api_jobs_dead_lettered_total",
+    "Background jobs given up on after failing with transient errors too many times.",
+    ["action"],
+)
+
+scheduled_runs = Counter(
+    "nsls2api_scheduled_runs_total",
+    "Scheduled job runs, by whether a job was queued, the run was skipped or queuing it failed.",
+    ["schedule", "outcome"],
+)
+
+# Progress of the most recent job of each action that reports progress (e.g. cycle syncs)
+
+job_items_expected = Gauge(
+    "nsls2api_job_items_expected",
+    "Number of items the running background job has to process.",
+    ["action"],
+)
+
+job_items_done = Gauge(
+    "nsls2api_job_items_done",
+    "Number of items the running background job has processed (including failures).",
+    ["action"],
+)
+
+job_items_failed = Gauge(
+    "nsls2api_job_items_failed",
+    "Number of items the running background job has failed to process.",
+    ["action"],
+)
+
+job_stage_items_per_second = Gauge(
+    "nsls2api_job_stage_items_per_second",
+    "Throughput of each stage of the running background job.",
+    ["action", "stage"],
+)
+
+job_stage_elapsed_seconds = Gauge(
+    "nsls2api_job_stage_elapsed_seconds",
+    "Wall time each stage of the running background job has been working for.",
+    ["action", "stage"],
+)
+
+# MongoDB commands, from the command listener in db_monitoring
+
+mongodb_command_duration_seconds = Histogram(
+    "nsls2api_mongodb_command_duration_seconds",
+    "Time taken by MongoDB commands, by collection, command and (normalized) filter shape.",
+    ["collection", "command", "filter_shape"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+mongodb_command_failures = Counter(
+    "nsls2api_mongodb_command_failures_total",
+    "MongoDB commands that failed, by collection and command.",
+    ["collection", "command"],
+)
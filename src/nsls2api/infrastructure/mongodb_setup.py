@@ -1,11 +1,14 @@
 import asyncio
+from typing import Optional, Sequence
 
 import beanie
 import click
 import motor.motor_asyncio
 from pydantic import MongoDsn
+from pymongo import monitoring
 
 from nsls2api import models
+from nsls2api.infrastructure import db_monitoring
 from nsls2api.infrastructure.logging import logger
 
 
@@ -22,11 +25,25 @@ def create_connection_string(
     )
 
 
-async def init_connection(mongodb_dsn: MongoDsn):
+async def init_connection(
+    mongodb_dsn: MongoDsn,
+    event_listeners: Optional[Sequence[monitoring.CommandListener]] = None,
+):
+    """
+    :param mongodb_dsn: The MongoDB connection string.
+    :param event_listeners: Extra pymongo command listeners to register on the client
+        (e.g. to count or time database commands), in addition to those in
+        `db_monitoring.command_listeners`.
+    """
     logger.info(f"Attempting to connect to {click.style(str(mongodb_dsn), fg='green')}")
 
     client = motor.motor_asyncio.AsyncIOMotorClient(
-        mongodb_dsn.unicode_string(), uuidRepresentation="standard"
+        mongodb_dsn.unicode_string(),
+        uuidRepresentation="standard",
+        event_listeners=[
+            *db_monitoring.command_listeners,
+            *(event_listeners or []),
+        ],
     )
 
     # This is to make sure that the client is using the same event loop as the rest of the application
@@ -20,7 +20,7 @@ from nsls2api.api.v1 import user_api as user_api_v1
 from nsls2api.infrastructure import app_setup
 from nsls2api.infrastructure.config import get_settings
 from nsls2api.infrastructure.logging import logger
-from nsls2api.middleware import ProcessTimeMiddleware
+from nsls2api.middleware import ProcessTimeMiddleware, QueryCountMiddleware
 from nsls2api.views import diagnostics, home
 
 settings = get_settings()
@@ -44,7 +44,7 @@ app_setup.local_development_mode = local_development_mode
 # Instantiate the instrumentator
 instrumentator = Instrumentator()
 
-middleware = [Middleware(ProcessTimeMiddleware)]
+middleware = [Middleware(ProcessTimeMiddleware), Middleware(QueryCountMiddleware)]
 
 app = fastapi.FastAPI(
     title="NSLS-II API", middleware=middleware, lifespan=app_setup.app_lifespan
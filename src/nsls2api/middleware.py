@@ -3,6 +3,8 @@ import time
 from starlette.datastructures import MutableHeaders
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from nsls2api.infrastructure.db_monitoring import count_queries, log_query_count
+
 
 class ProcessTimeMiddleware:
     app: ASGIApp
@@ -21,7 +23,39 @@ class ProcessTimeMiddleware:
                 headers = MutableHeaders(scope=message)
                 end_time = time.perf_counter()
                 lapsed_time = (end_time - start_time) * 1000
-                headers["Server-Timing"] = f"total;dur={lapsed_time:.3f} ms"
+                headers.append("Server-Timing", f"total;dur={lapsed_time:.3f} ms")
             await send(message)
 
         await self.app(scope, receive, send_wrapper)
+
+
+class QueryCountMiddleware:
+    """
+    Counts the database queries made while handling each request, and reports them
+    in the `Server-Timing` header (as `db`) and the log.
+    """
+
+    app: ASGIApp
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as queries:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={queries.duration_ms:.3f};desc="{queries.count} queries"',
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        log_query_count(f"{scope['method']} {scope['path']}", queries)
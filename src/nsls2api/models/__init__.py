@@ -6,6 +6,8 @@ from nsls2api.models import (
     jobs,
     proposal_types,
     proposals,
+    schedules,
+    sync_state,
 )
 
 all_models = [
@@ -17,4 +19,7 @@ all_models = [
     apikeys.ApiKey,
     apikeys.ApiUser,
     jobs.BackgroundJob,
+    sync_state.ProposalSyncState,
+    schedules.JobSchedule,
+    schedules.SchedulerLease,
 ]
@@ -1,5 +1,5 @@
 import datetime
-from enum import StrEnum
+from enum import IntEnum, StrEnum
 from typing import Optional
 
 import beanie
@@ -18,6 +18,8 @@ class JobStatus(StrEnum):
     unneeded = "unneeded"
     failed = "failed"
     success = "success"
+    # Failed with a retryable error too many times, and won't be retried again
+    dead_letter = "dead_letter"
 
 
 class JobSyncSource(StrEnum):
@@ -29,9 +31,36 @@ class JobActions(StrEnum):
     synchronize_cycles = "synchronize_cycles"
     synchronize_proposal = "synchronize_proposal"
     synchronize_proposals_for_cycle = "synchronize_proposals_for_cycle"
+    synchronize_proposals_incremental = "synchronize_proposals_incremental"
     synchronize_proposal_types = "synchronize_proposal_types"
     update_cycle_information = "update_cycle_information"
     create_slack_channel = "create_slack_channel"
+    generate_synthetic_dataset = "generate_synthetic_dataset"
+
+
+class JobPriority(IntEnum):
+    """
+    Jobs with a higher priority are claimed first (then oldest first).
+    """
+
+    bulk = 0
+    normal = 50
+    interactive = 100
+
+
+# Single-item syncs are usually requested by someone waiting on the result, so they
+# should not queue up behind facility-wide refreshes.
+DEFAULT_JOB_PRIORITIES: dict[JobActions, JobPriority] = {
+    JobActions.synchronize_proposal: JobPriority.interactive,
+    JobActions.create_slack_channel: JobPriority.interactive,
+    JobActions.synchronize_admins: JobPriority.normal,
+    JobActions.synchronize_cycles: JobPriority.normal,
+    JobActions.synchronize_proposal_types: JobPriority.normal,
+    JobActions.synchronize_proposals_for_cycle: JobPriority.bulk,
+    JobActions.synchronize_proposals_incremental: JobPriority.bulk,
+    JobActions.update_cycle_information: JobPriority.bulk,
+    JobActions.generate_synthetic_dataset: JobPriority.bulk,
+}
 
 
 class JobSyncParameters(pydantic.BaseModel):
@@ -42,6 +71,47 @@ class JobSyncParameters(pydantic.BaseModel):
     proposal_type_id: Optional[str] = None
     beamline: Optional[str] = None
     sync_source: Optional[JobSyncSource] = JobSyncSource.PASS
+    # For generate_synthetic_dataset jobs
+    proposal_count: Optional[int] = None
+    first_proposal_id: Optional[int] = None
+    seed: Optional[int] = None
+
+
+class JobCheckpoint(pydantic.BaseModel):
+    """
+    Progress saved by a long-running job so that it can be resumed after a restart.
+    """
+
+    remaining: list[str] = []
+    failed: dict[str, str] = {}
+    updated_at: datetime.datetime = pydantic.Field(
+        default_factory=datetime.datetime.now
+    )
+
+
+class JobStageProgress(pydantic.BaseModel):
+    name: str
+    concurrency: int = 1
+    processed: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    items_per_second: float = 0.0
+    mean_latency_seconds: float = 0.0
+
+
+class JobProgress(pydantic.BaseModel):
+    """
+    How far a job working through a list of items (e.g. proposals) has got.
+    """
+
+    items_total: int = 0
+    # Items that have been dealt with, whether they succeeded or failed
+    items_done: int = 0
+    items_failed: int = 0
+    stages: list[JobStageProgress] = []
+    updated_at: datetime.datetime = pydantic.Field(
+        default_factory=datetime.datetime.now
+    )
 
 
 class BackgroundJob(beanie.Document):
@@ -51,10 +121,24 @@ class BackgroundJob(beanie.Document):
     started_date: Optional[datetime.datetime] = None
     finished_date: Optional[datetime.datetime] = None
     processing_status: str = JobStatus.awaiting
+    priority: int = JobPriority.normal
     is_finished: bool = False
     action: str
     sync_parameters: Optional[JobSyncParameters] = None
+    # Identifies the work the job does, so that duplicate unfinished jobs can be coalesced
+    job_key: Optional[str] = None
     log_message: Optional[str] = None
+    lease_owner: Optional[str] = None
+    # Unique to each claim of the job, so writes from a worker that lost its lease are rejected
+    lease_token: Optional[str] = None
+    lease_expires_at: Optional[datetime.datetime] = None
+    checkpoint: Optional[JobCheckpoint] = None
+    progress: Optional[JobProgress] = None
+    resume_count: int = 0
+    # Number of times the job has been claimed to run
+    attempts: int = 0
+    # A job waiting to be retried is not claimed before this time
+    next_attempt_at: Optional[datetime.datetime] = None
 
     class Settings:
         name = "jobs"
@@ -65,10 +149,27 @@ class BackgroundJob(beanie.Document):
             pymongo.IndexModel(
                 keys=[("processing_status", pymongo.ASCENDING)], name="status_ascend"
             ),
+            pymongo.IndexModel(
+                keys=[
+                    ("processing_status", pymongo.ASCENDING),
+                    ("priority", pymongo.DESCENDING),
+                    ("created_date", pymongo.ASCENDING),
+                ],
+                name="claim_order",
+            ),
             pymongo.IndexModel(
                 keys=[("sync_parameters.proposal_id", pymongo.ASCENDING)],
                 name="proposal_ascend",
             ),
+            pymongo.IndexModel(
+                keys=[("job_key", pymongo.ASCENDING)],
+                name="unfinished_job_key_unique",
+                unique=True,
+                partialFilterExpression={
+                    "is_finished": False,
+                    "job_key": {"$type": "string"},
+                },
+            ),
             pymongo.IndexModel(
                 keys=[("created_date", pymongo.ASCENDING)],
                 name="created_date_expiring",
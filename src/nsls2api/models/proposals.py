@@ -54,6 +54,9 @@ class ProposalDisplay(ProposalBase):
 
 # -- Beanie Model for Database --
 class Proposal(ProposalBase, beanie.Document):
+    # Fingerprint of the PASS-sourced content, used to skip no-op synchronizations
+    content_hash: Optional[str] = None
+
     class Settings:
         name = "proposals"
         indexes = [
@@ -113,3 +116,11 @@ class ProposalIdView(pydantic.BaseModel):
 
     class Settings:
         projection = {"proposal_id": "$proposal_id"}
+
+
+class ProposalContentHashView(pydantic.BaseModel):
+    proposal_id: str
+    content_hash: Optional[str] = None
+
+    class Settings:
+        projection = {"proposal_id": "$proposal_id", "content_hash": "$content_hash"}
@@ -0,0 +1,61 @@
+import datetime
+from typing import Optional
+
+import beanie
+import pydantic
+import pymongo
+
+from nsls2api.models.jobs import JobSyncParameters
+
+
+class JobSchedule(beanie.Document):
+    """
+    A background job that is queued automatically on a cron-like schedule.
+    """
+
+    name: str
+    action: str
+    sync_parameters: Optional[JobSyncParameters] = None
+    # Standard 5-field cron expression (minute hour day-of-month month day-of-week)
+    cron: str
+    enabled: bool = True
+    # Each run is delayed by a random amount up to this, to spread out the load
+    jitter_seconds: int = 0
+    next_run_at: Optional[datetime.datetime] = None
+    last_run_at: Optional[datetime.datetime] = None
+    last_job_id: Optional[beanie.PydanticObjectId] = None
+    skipped_runs: int = 0
+    created_on: datetime.datetime = pydantic.Field(
+        default_factory=datetime.datetime.now
+    )
+    last_updated: datetime.datetime = pydantic.Field(
+        default_factory=datetime.datetime.now
+    )
+
+    class Settings:
+        name = "job_schedules"
+        indexes = [
+            pymongo.IndexModel(
+                keys=[("name", pymongo.ASCENDING)], name="name_unique", unique=True
+            ),
+            pymongo.IndexModel(
+                keys=[
+                    ("enabled", pymongo.ASCENDING),
+                    ("next_run_at", pymongo.ASCENDING),
+                ],
+                name="enabled_next_run_ascend",
+            ),
+        ]
+
+
+class SchedulerLease(beanie.Document):
+    """
+    Held by the one process that is currently queuing scheduled jobs.
+    """
+
+    id: str
+    owner: str
+    expires_at: datetime.datetime
+
+    class Settings:
+        name = "scheduler_lease"
@@ -0,0 +1,40 @@
+import datetime
+from typing import Optional
+
+import beanie
+import pydantic
+import pymongo
+
+
+class ProposalSyncState(beanie.Document):
+    """
+    Watermark for incremental proposal synchronization of a facility.
+
+    Stores a fingerprint of the PASS allocations of every proposal seen on the last
+    run, so that the next run only needs to synchronize new or changed proposals.
+    """
+
+    facility: str
+    sync_source: str
+    allocation_hashes: dict[str, str] = {}
+    last_run_started: Optional[datetime.datetime] = None
+    last_successful_run: Optional[datetime.datetime] = None
+    created_on: datetime.datetime = pydantic.Field(
+        default_factory=datetime.datetime.now
+    )
+    last_updated: datetime.datetime = pydantic.Field(
+        default_factory=datetime.datetime.now
+    )
+
+    class Settings:
+        name = "sync_state"
+        indexes = [
+            pymongo.IndexModel(
+                keys=[
+                    ("facility", pymongo.ASCENDING),
+                    ("sync_source", pymongo.ASCENDING),
+                ],
+                name="facility_sync_source_unique",
+                unique=True,
+            ),
+        ]
@@ -1,22 +1,338 @@
 import asyncio
 import datetime
+import hashlib
+import json
+import os
+import random
+import socket
 import traceback
+import uuid
+from dataclasses import dataclass
 from typing import Optional
 
 import bson
+import httpx
+import pymongo
+from beanie import PydanticObjectId
+from beanie.operators import In, Inc, Or, Set
+from pymongo import ReturnDocument
+from pymongo.errors import AutoReconnect, BulkWriteError, DuplicateKeyError
 
+from nsls2api.infrastructure import metrics
+from nsls2api.infrastructure.config import get_settings
+from nsls2api.infrastructure.db_monitoring import count_queries
 from nsls2api.infrastructure.logging import logger
-from nsls2api.models.jobs import BackgroundJob, JobActions, JobStatus, JobSyncParameters
-from nsls2api.services import sync_service
+from nsls2api.models.jobs import (
+    DEFAULT_JOB_PRIORITIES,
+    BackgroundJob,
+    JobActions,
+    JobCheckpoint,
+    JobPriority,
+    JobProgress,
+    JobStageProgress,
+    JobStatus,
+    JobSyncParameters,
+)
+from nsls2api.services import sync_service, synthetic_data_service
+
+settings = get_settings()
+
+
+class LeaseLostError(Exception):
+    """
+    Raised when a worker tries to update a job whose lease it no longer holds (because
+    the lease expired and the job was reclaimed by another worker).
+    """
+
+
+# Errors that are likely to go away if the job is simply run again a bit later
+TRANSIENT_ERRORS = (
+    httpx.TransportError,
+    asyncio.TimeoutError,
+    AutoReconnect,
+)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How often, and how soon, a job that fails with a transient error is retried.
+
+    The delay before each retry is chosen at random between zero and an exponentially
+    growing cap (i.e. "full jitter"), so that jobs that failed together because an
+    upstream service was down don't all retry at the same moment.
+    """
+
+    max_attempts: int = 3
+    base_delay_seconds: float = 30.0
+    max_delay_seconds: float = 1800.0
+    retryable: tuple[type[BaseException], ...] = TRANSIENT_ERRORS
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """
+        Whether the error, or any error it was raised from, is transient.
+        """
+        seen = set()
+        while error is not None and id(error) not in seen:
+            seen.add(id(error))
+            if isinstance(error, httpx.HTTPStatusError):
+                status_code = error.response.status_code
+                if status_code >= 500 or status_code == 429:
+                    return True
+            elif isinstance(error, self.retryable):
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+
+    def backoff_seconds(self, attempt: int) -> float:
+        """
+        :param attempt: The attempt that has just failed (starting at 1).
+        """
+        cap = min(
+            self.max_delay_seconds, self.base_delay_seconds * 2 ** max(0, attempt - 1)
+        )
+        return random.uniform(0, cap)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+RETRY_POLICIES = {
+    JobActions.synchronize_proposal: RetryPolicy(
+        max_attempts=5, base_delay_seconds=30, max_delay_seconds=1800
+    ),
+    JobActions.synchronize_proposals_for_cycle: RetryPolicy(
+        max_attempts=3, base_delay_seconds=300, max_delay_seconds=3600
+    ),
+    JobActions.synchronize_proposals_incremental: RetryPolicy(
+        max_attempts=3, base_delay_seconds=300, max_delay_seconds=3600
+    ),
+    JobActions.synchronize_cycles: RetryPolicy(
+        max_attempts=3, base_delay_seconds=300, max_delay_seconds=3600
+    ),
+}
+
+
+def retry_policy(action: str) -> RetryPolicy:
+    return RETRY_POLICIES.get(action, DEFAULT_RETRY_POLICY)
+
+
+# Shortest wait between polls for new jobs when idle, doubling up to job_poll_backoff_max_seconds
+_MIN_POLL_INTERVAL = 0.05
+
+
+class _Notification:
+    def __init__(self):
+        self.event = asyncio.Event()
+        # Once notified, the job the notification was about (None for any job) and
+        # the notification that follows it
+        self.job_id: Optional[bson.ObjectId] = None
+        self.next: Optional[_Notification] = None
+
+
+class JobWakeup:
+    """
+    Wakes anything waiting on the jobs collection, e.g. idle workers as soon as there
+    might be a job for them to claim.
+
+    Waiters take a `snapshot()` *before* looking at the jobs and then `wait()` on it,
+    so a notification that arrives in between is never missed.
+    """
+
+    def __init__(self):
+        self._notification = _Notification()
+        # True while a change stream is delivering notifications from other processes
+        self.listening = False
+
+    def snapshot(self) -> _Notification:
+        return self._notification
+
+    def notify(self, job_id: Optional[bson.ObjectId] = None) -> None:
+        """
+        :param job_id: The job that changed, if the notification is about just one.
+        """
+        notification, self._notification = self._notification, _Notification()
+        notification.job_id = job_id
+        notification.next = self._notification
+        notification.event.set()
+
+    @staticmethod
+    async def wait(
+        snapshot: _Notification,
+        timeout: float,
+        job_ids: Optional[set[bson.ObjectId]] = None,
+    ) -> bool:
+        """
+        :param job_ids: Only wake for notifications about these jobs (or any job).
+        :return: True if woken by a notification, False if the timeout expired.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if not snapshot.event.is_set():
+                try:
+                    await asyncio.wait_for(
+                        snapshot.event.wait(), deadline - loop.time()
+                    )
+                except TimeoutError:
+                    return False
+            if job_ids is None or snapshot.job_id is None or snapshot.job_id in job_ids:
+                return True
+            snapshot = snapshot.next
+
+
+job_wakeup = JobWakeup()
+
+# Notified whenever a job is created or changes (e.g. its status or progress)
+job_updates = JobWakeup()
+
+
+def job_key(action: JobActions, sync_parameters: Optional[JobSyncParameters]) -> str:
+    """
+    Generate a key identifying the work a job does, i.e. its action and parameters.
+    """
+    parameters = sync_parameters.model_dump(mode="json") if sync_parameters else None
+    normalized = json.dumps(
+        {"action": action, "sync_parameters": parameters},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def _run_now_if_backing_off(job: BackgroundJob) -> BackgroundJob:
+    """
+    Make a job that is waiting to be retried due straight away, as it has been asked
+    for again and the request shouldn't be held up by the job's backoff.
+    """
+    if job.processing_status != JobStatus.awaiting or job.next_attempt_at is None:
+        return job
+
+    result = await BackgroundJob.get_motor_collection().update_one(
+        {
+            "_id": job.id,
+            "processing_status": JobStatus.awaiting,
+            "next_attempt_at": {"$ne": None},
+        },
+        {"$set": {"next_attempt_at": None}},
+    )
+    if result.modified_count:
+        job.next_attempt_at = None
+        job_wakeup.notify()
+        job_updates.notify(job.id)
+    return job
 
 
 async def create_background_job(
-    action: JobActions, sync_parameters: JobSyncParameters = None
+    action: JobActions,
+    sync_parameters: JobSyncParameters = None,
+    priority: Optional[JobPriority] = None,
 ) -> BackgroundJob:
-    job = BackgroundJob(action=action, sync_parameters=sync_parameters)
-    await job.save()
+    """
+    Queue a background job, unless an identical job is already waiting or running,
+    in which case that job is returned instead (and, if it is waiting to be retried,
+    made due straight away).
 
-    return job
+    If no priority is given, the default priority for the action is used.
+
+    The unique (partial) index on the job key for unfinished jobs makes this safe
+    against concurrent requests in any number of processes.
+    """
+    key = job_key(action, sync_parameters)
+    if priority is None:
+        priority = DEFAULT_JOB_PRIORITIES.get(action, JobPriority.normal)
+
+    # Retry in case the duplicate we collided with finishes before we can read it
+    for _ in range(3):
+        job = BackgroundJob(
+            action=action,
+            sync_parameters=sync_parameters,
+            job_key=key,
+            priority=priority,
+        )
+        try:
+            await job.insert()
+        except DuplicateKeyError:
+            existing = await BackgroundJob.find_one(
+                BackgroundJob.job_key == key,
+                BackgroundJob.is_finished == False,  # noqa: E712
+            )
+            if existing is not None:
+                logger.debug(
+                    f"Coalesced {action} request into existing job {existing.id}."
+                )
+                metrics.jobs_coalesced.labels(action=action).inc()
+                return await _run_now_if_backing_off(existing)
+            continue
+
+        # Let any idle workers in this process know straight away
+        job_wakeup.notify()
+        job_updates.notify(job.id)
+        return job
+
+    raise Exception(f"Unable to create {action} job.")
+
+
+async def create_background_jobs(
+    requests: list[tuple[JobActions, Optional[JobSyncParameters]]],
+) -> list[BackgroundJob]:
+    """
+    Queue many background jobs with a single `insert_many`.
+
+    As with create_background_job, a request that duplicates an unfinished job (or
+    another request in the same batch) is coalesced into that job.
+
+    :param requests: The action and sync parameters of each job.
+    :return: The job for each request, in the same order as the requests.
+    """
+    keys = [job_key(action, sync_parameters) for action, sync_parameters in requests]
+
+    new_jobs: dict[str, BackgroundJob] = {}
+    for (action, sync_parameters), key in zip(requests, keys):
+        if key not in new_jobs:
+            new_jobs[key] = BackgroundJob(
+                id=PydanticObjectId(),
+                action=action,
+                sync_parameters=sync_parameters,
+                job_key=key,
+                priority=DEFAULT_JOB_PRIORITIES.get(action, JobPriority.normal),
+            )
+    jobs_by_key = dict(new_jobs)
+    if not new_jobs:
+        return []
+
+    try:
+        await BackgroundJob.insert_many(list(new_jobs.values()), ordered=False)
+    except BulkWriteError as error:
+        write_errors = error.details.get("writeErrors", [])
+        other_errors = [e for e in write_errors if e.get("code") != 11000]
+        if other_errors:
+            raise Exception(
+                f"Unable to create background jobs: {other_errors}"
+            ) from error
+
+        new_keys = list(new_jobs)
+        duplicate_keys = [new_keys[e["index"]] for e in write_errors]
+        existing_jobs = await BackgroundJob.find(
+            In(BackgroundJob.job_key, duplicate_keys),
+            BackgroundJob.is_finished == False,  # noqa: E712
+        ).to_list()
+        for existing in existing_jobs:
+            jobs_by_key[existing.job_key] = await _run_now_if_backing_off(existing)
+            metrics.jobs_coalesced.labels(action=existing.action).inc()
+
+        # The job we collided with may have finished before we could read it
+        for key in duplicate_keys:
+            job = jobs_by_key[key]
+            if job is new_jobs[key]:
+                jobs_by_key[key] = await create_background_job(
+                    job.action, job.sync_parameters, job.priority
+                )
+
+    logger.info(f"Queued {len(requests):,} background jobs in one batch.")
+    job_wakeup.notify()
+    job_updates.notify()
+
+    return [jobs_by_key[key] for key in keys]
 
 
 async def pending_jobs(limit=1_000) -> list[BackgroundJob]:
@@ -32,48 +348,589 @@ async def pending_jobs(limit=1_000) -> list[BackgroundJob]:
         return []
 
 
-async def start_job(job_id: bson.ObjectId) -> Optional[BackgroundJob]:
+async def _claim_job(
+    query: dict, worker_id: Optional[str] = None, sort: Optional[list] = None
+) -> Optional[BackgroundJob]:
+    """
+    Atomically move a single awaiting job matching `query` to processing.
+
+    Using `find_one_and_update` means that only one worker can ever claim a given job.
+    Jobs waiting to be retried are not claimed until their next attempt is due.
+    """
+    now = datetime.datetime.now()
+    document = await BackgroundJob.get_motor_collection().find_one_and_update(
+        {
+            "$and": [
+                query,
+                {"processing_status": JobStatus.awaiting},
+                {
+                    "$or": [
+                        {"next_attempt_at": None},
+                        {"next_attempt_at": {"$lte": now}},
+                    ]
+                },
+            ]
+        },
+        {
+            "$set": {
+                "processing_status": JobStatus.processing,
+                "started_date": now,
+                "lease_owner": worker_id,
+                "lease_token": uuid.uuid4().hex,
+                "lease_expires_at": now
+                + datetime.timedelta(seconds=settings.job_lease_seconds),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=sort,
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is None:
+        return None
+    job_updates.notify(document["_id"])
+    return BackgroundJob.model_validate(document)
+
+
+async def saturated_actions() -> list[str]:
+    """
+    The actions that have reached their limit in job_action_concurrency_limits.
+    """
+    limits = settings.job_action_concurrency_limits
+    if not limits:
+        return []
+
+    running = BackgroundJob.get_motor_collection().aggregate(
+        [
+            {
+                "$match": {
+                    "processing_status": JobStatus.processing,
+                    "action": {"$in": list(limits)},
+                }
+            },
+            {"$group": {"_id": "$action", "count": {"$sum": 1}}},
+        ]
+    )
+    return [
+        action["_id"]
+        async for action in running
+        if action["count"] >= limits[action["_id"]]
+    ]
+
+
+async def _within_concurrency_limit(job: BackgroundJob) -> bool:
+    """
+    Check a freshly claimed job against its action's concurrency limit.
+
+    Two workers can both see an action as unsaturated and claim a job for it at the
+    same time; ranking the running jobs the same way in both means that exactly the
+    ones beyond the limit give their job back.
+    """
+    limit = settings.job_action_concurrency_limits.get(job.action)
+    if limit is None:
+        return True
+
+    running = (
+        BackgroundJob.get_motor_collection()
+        .find(
+            {"processing_status": JobStatus.processing, "action": job.action},
+            {"_id": 1},
+        )
+        .sort([("started_date", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+        .limit(limit)
+    )
+    return job.id in {running_job["_id"] async for running_job in running}
+
+
+async def _release_job(job: BackgroundJob) -> None:
+    await BackgroundJob.get_motor_collection().update_one(
+        _leased_job_query(job.id, job.lease_token),
+        {
+            "$set": {
+                "processing_status": JobStatus.awaiting,
+                "started_date": None,
+                "lease_owner": None,
+                "lease_token": None,
+                "lease_expires_at": None,
+            },
+            # The job was never actually run
+            "$inc": {"attempts": -1},
+        },
+    )
+
+
+async def claim_next_job(worker_id: str) -> Optional[BackgroundJob]:
+    """
+    Claim the highest priority (then oldest) awaiting job for the given worker,
+    skipping actions that are already running as many jobs as they are allowed.
+
+    :param worker_id: An identifier for the worker claiming the job.
+    :return: The claimed job, or None if there are no jobs that can be run.
+    """
+    query = {}
+    saturated = await saturated_actions()
+    if saturated:
+        query["action"] = {"$nin": saturated}
+
+    job = await _claim_job(
+        query,
+        worker_id=worker_id,
+        sort=[("priority", pymongo.DESCENDING), ("created_date", pymongo.ASCENDING)],
+    )
+    if job is None:
+        return None
+
+    if not await _within_concurrency_limit(job):
+        logger.debug(f"Returning job {job.id} as {job.action} is at its limit.")
+        metrics.job_claim_conflicts.inc()
+        await _release_job(job)
+        return None
+
+    return job
+
+
+async def start_job(
+    job_id: bson.ObjectId, worker_id: Optional[str] = None
+) -> Optional[BackgroundJob]:
+    job = await _claim_job({"_id": job_id}, worker_id=worker_id)
+    if job is not None:
+        return job
+
+    # Work out why we couldn't start the job
     job = await job_by_id(job_id)
     if not job:
         raise Exception(f"No job with ID {job_id} found.")
 
-    if job.processing_status != JobStatus.awaiting:
+    if job.processing_status == JobStatus.processing:
+        metrics.job_claim_conflicts.inc()
+    if job.processing_status == JobStatus.awaiting and job.next_attempt_at:
         raise Exception(
-            f"Cannot start job {job_id} with status {job.processing_status}."
+            f"Cannot start job {job_id} before its next attempt at {job.next_attempt_at}."
         )
+    raise Exception(f"Cannot start job {job_id} with status {job.processing_status}.")
 
-    job.processing_status = JobStatus.processing
-    job.started_date = datetime.datetime.now()
-    await job.save()
 
-    return job
+def _record_lost_race(operation: str) -> None:
+    """
+    Count a write to a job rejected because another worker has since claimed it.
+    """
+    metrics.job_stale_writes_rejected.labels(operation=operation).inc()
+    metrics.job_claim_conflicts.inc()
+
+
+def _leased_job_query(job_id: bson.ObjectId, lease_token: Optional[str]) -> dict:
+    query = {"_id": job_id, "processing_status": JobStatus.processing}
+    if lease_token is not None:
+        query["lease_token"] = lease_token
+    return query
 
 
 async def complete_job(
-    job_id: bson.ObjectId, processing_status: JobStatus, log_message: str = None
+    job_id: bson.ObjectId,
+    processing_status: JobStatus,
+    log_message: str = None,
+    lease_token: Optional[str] = None,
 ) -> Optional[BackgroundJob]:
+    """
+    Record the outcome of a running job.
+
+    If `lease_token` is given, the job is only updated if that claim still holds the
+    lease, otherwise a LeaseLostError is raised.
+    """
+    document = await BackgroundJob.get_motor_collection().find_one_and_update(
+        _leased_job_query(job_id, lease_token),
+        {
+            "$set": {
+                "processing_status": processing_status,
+                "finished_date": datetime.datetime.now(),
+                "is_finished": True,
+                "log_message": log_message,
+                "lease_owner": None,
+                "lease_token": None,
+                "lease_expires_at": None,
+            }
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is not None:
+        # A slot may have opened up for an action at its concurrency limit
+        job_wakeup.notify()
+        job_updates.notify(job_id)
+        return BackgroundJob.model_validate(document)
+
     job = await job_by_id(job_id)
     if not job:
         raise Exception(f"No job with ID {job_id} found.")
 
-    if job.processing_status != JobStatus.processing:
-        raise Exception(
-            f"Cannot complete job {job_id} with status {job.processing_status}."
+    if job.processing_status == JobStatus.processing:
+        _record_lost_race("complete")
+        raise LeaseLostError(
+            f"Cannot complete job {job_id} as it is now leased by {job.lease_owner}."
         )
 
-    job.processing_status = processing_status
-    job.finished_date = datetime.datetime.now()
-    job.is_finished = True
-    job.log_message = log_message
-    await job.save()
+    raise Exception(
+        f"Cannot complete job {job_id} with status {job.processing_status}."
+    )
 
-    return job
+
+async def renew_lease(job_id: bson.ObjectId, lease_token: Optional[str] = None) -> bool:
+    """
+    Extend the lease on a running job so that it is not reclaimed as stale.
+
+    :return: False if the lease is no longer held by this claim of the job.
+    """
+    result = await BackgroundJob.get_motor_collection().update_one(
+        _leased_job_query(job_id, lease_token),
+        {
+            "$set": {
+                "lease_expires_at": datetime.datetime.now()
+                + datetime.timedelta(seconds=settings.job_lease_seconds)
+            }
+        },
+    )
+    return result.matched_count == 1
+
+
+async def save_checkpoint(
+    job_id: bson.ObjectId,
+    checkpoint: JobCheckpoint,
+    lease_token: Optional[str] = None,
+    progress: Optional[JobProgress] = None,
+) -> None:
+    """
+    Save a checkpoint of a running job (and renew its lease at the same time).
+
+    Raises a LeaseLostError if the lease is no longer held by this claim of the job.
+    """
+    update = {
+        "checkpoint": checkpoint.model_dump(),
+        "lease_expires_at": datetime.datetime.now()
+        + datetime.timedelta(seconds=settings.job_lease_seconds),
+    }
+    if progress is not None:
+        update["progress"] = progress.model_dump()
+
+    result = await BackgroundJob.get_motor_collection().update_one(
+        _leased_job_query(job_id, lease_token), {"$set": update}
+    )
+    if result.matched_count != 1:
+        _record_lost_race("checkpoint")
+        raise LeaseLostError(f"Lease on job {job_id} has been lost.")
+    job_updates.notify(job_id)
+
+
+async def save_progress(
+    job_id: bson.ObjectId,
+    progress: JobProgress,
+    lease_token: Optional[str] = None,
+) -> None:
+    """
+    Record how far a running job has got.
+
+    Raises a LeaseLostError if the lease is no longer held by this claim of the job.
+    """
+    result = await BackgroundJob.get_motor_collection().update_one(
+        _leased_job_query(job_id, lease_token),
+        {"$set": {"progress": progress.model_dump()}},
+    )
+    if result.matched_count != 1:
+        _record_lost_race("progress")
+        raise LeaseLostError(f"Lease on job {job_id} has been lost.")
+    job_updates.notify(job_id)
+
+
+async def retry_job(
+    job: BackgroundJob, delay_seconds: float, log_message: str = None
+) -> BackgroundJob:
+    """
+    Return a running job to the queue, to be run again after `delay_seconds`.
+
+    Like `complete_job`, this raises a LeaseLostError if the claim in `job` no longer
+    holds the lease.  Any checkpoint is kept, so the retry resumes where it left off.
+    """
+    next_attempt_at = datetime.datetime.now() + datetime.timedelta(
+        seconds=delay_seconds
+    )
+    document = await BackgroundJob.get_motor_collection().find_one_and_update(
+        _leased_job_query(job.id, job.lease_token),
+        {
+            "$set": {
+                "processing_status": JobStatus.awaiting,
+                "next_attempt_at": next_attempt_at,
+                "log_message": log_message,
+                "started_date": None,
+                "lease_owner": None,
+                "lease_token": None,
+                "lease_expires_at": None,
+            }
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is None:
+        _record_lost_race("retry")
+        raise LeaseLostError(f"Cannot retry job {job.id} as it is no longer leased.")
+
+    metrics.job_retries.labels(action=job.action).inc()
+    job_updates.notify(job.id)
+    return BackgroundJob.model_validate(document)
+
+
+async def record_job_failure(job: BackgroundJob, error: Exception) -> None:
+    """
+    Record that a running job raised `error`.
+
+    Transient errors are retried, with backoff, up to the number of attempts allowed
+    by the action's retry policy; after that the job is dead-lettered.  Any other
+    error fails the job straight away.
+    """
+    policy = retry_policy(job.action)
+    error_message = "".join(
+        traceback.format_exception(type(error), error, error.__traceback__)
+    )
+
+    if not policy.is_retryable(error):
+        await complete_job(
+            job.id, JobStatus.failed, error_message, lease_token=job.lease_token
+        )
+        return
+
+    if job.attempts >= policy.max_attempts:
+        logger.error(
+            f"Giving up on job {job.id} for {job.action} after {job.attempts} attempts."
+        )
+        metrics.jobs_dead_lettered.labels(action=job.action).inc()
+        await complete_job(
+            job.id, JobStatus.dead_letter, error_message, lease_token=job.lease_token
+        )
+        return
+
+    delay = policy.backoff_seconds(job.attempts)
+    logger.warning(
+        f"Retrying job {job.id} for {job.action} in {delay:.0f}s "
+        f"(attempt {job.attempts} of {policy.max_attempts} failed)."
+    )
+    await retry_job(job, delay, error_message)
+
+
+def _attempts_used_up() -> dict:
+    """
+    A query matching the jobs that have used up the attempts their retry policy allows.
+    """
+    conditions = [
+        {"action": action, "attempts": {"$gte": policy.max_attempts}}
+        for action, policy in RETRY_POLICIES.items()
+    ]
+    conditions.append(
+        {
+            "action": {"$nin": list(RETRY_POLICIES)},
+            "attempts": {"$gte": DEFAULT_RETRY_POLICY.max_attempts},
+        }
+    )
+    return {"$or": conditions}
+
+
+async def reclaim_stale_jobs() -> int:
+    """
+    Return jobs whose lease has expired (e.g. because the worker running them was
+    restarted) to the queue, so that they are picked up again and resumed from their
+    last checkpoint.
+
+    Every claim of a job counts as an attempt, so a job that has used up the attempts
+    allowed by its retry policy is dead-lettered instead; otherwise a job that takes
+    its worker down with it would be run again forever.
+
+    :return: The number of jobs reclaimed, including those dead-lettered.
+    """
+    now = datetime.datetime.now()
+    stale_started_date = now - datetime.timedelta(seconds=settings.job_lease_seconds)
+    stale = Or(
+        BackgroundJob.lease_expires_at < now,
+        # Jobs started before leases were introduced
+        {
+            "lease_expires_at": None,
+            "started_date": {"$lt": stale_started_date},
+        },
+    )
+
+    dead_lettered = 0
+    async for job in BackgroundJob.find(
+        BackgroundJob.processing_status == JobStatus.processing,
+        stale,
+        _attempts_used_up(),
+    ):
+        # Unless the lease has been renewed, or the job claimed again, in the meantime
+        result = await BackgroundJob.get_motor_collection().update_one(
+            {
+                "_id": job.id,
+                "processing_status": JobStatus.processing,
+                "lease_token": job.lease_token,
+                "lease_expires_at": job.lease_expires_at,
+            },
+            {
+                "$set": {
+                    "processing_status": JobStatus.dead_letter,
+                    "finished_date": now,
+                    "is_finished": True,
+                    "log_message": f"The lease of attempt {job.attempts}, the last "
+                    "one allowed, expired before the job finished.",
+                    "lease_owner": None,
+                    "lease_token": None,
+                    "lease_expires_at": None,
+                }
+            },
+        )
+        if result.modified_count:
+            logger.error(
+                f"Giving up on job {job.id} for {job.action} after its lease expired "
+                f"on attempt {job.attempts}."
+            )
+            metrics.jobs_dead_lettered.labels(action=job.action).inc()
+            dead_lettered += 1
+
+    result = await BackgroundJob.find(
+        BackgroundJob.processing_status == JobStatus.processing,
+        stale,
+        {"$nor": [_attempts_used_up()]},
+    ).update(
+        Set(
+            {
+                BackgroundJob.processing_status: JobStatus.awaiting,
+                BackgroundJob.lease_owner: None,
+                BackgroundJob.lease_token: None,
+                BackgroundJob.lease_expires_at: None,
+            }
+        ),
+        Inc({BackgroundJob.resume_count: 1}),
+    )
+
+    reclaimed = result.modified_count if result else 0
+    if reclaimed:
+        metrics.jobs_reclaimed.inc(reclaimed)
+        logger.warning(f"Reclaimed {reclaimed} stale background job(s).")
+    if reclaimed or dead_lettered:
+        job_wakeup.notify()
+        job_updates.notify()
+    return reclaimed + dead_lettered
+
+
+def job_progress(progress: sync_service.ProposalSyncProgress) -> JobProgress:
+    return JobProgress(
+        items_total=progress.total,
+        items_done=progress.done,
+        items_failed=len(progress.failed),
+        stages=[
+            JobStageProgress(
+                name=stage.name,
+                concurrency=stage.concurrency,
+                processed=stage.processed,
+                failed=stage.failed,
+                elapsed_seconds=stage.elapsed_seconds,
+                items_per_second=stage.throughput,
+                mean_latency_seconds=stage.mean_latency,
+            )
+            for stage in progress.stages
+        ],
+    )
+
+
+def _record_progress_metrics(action: str, progress: JobProgress) -> None:
+    metrics.job_items_expected.labels(action=action).set(progress.items_total)
+    metrics.job_items_done.labels(action=action).set(progress.items_done)
+    metrics.job_items_failed.labels(action=action).set(progress.items_failed)
+    for stage in progress.stages:
+        metrics.job_stage_items_per_second.labels(action=action, stage=stage.name).set(
+            stage.items_per_second
+        )
+        metrics.job_stage_elapsed_seconds.labels(action=action, stage=stage.name).set(
+            stage.elapsed_seconds
+        )
+
+
+class JobProgressRecorder:
+    """
+    Progress callback for long-running synchronizations.
+
+    Records the progress on the job (and in the Prometheus metrics) at most once every
+    `job_progress_interval_seconds`.  With `checkpoint=True` it also saves a checkpoint
+    that the job can be resumed from, at most once every
+    `job_checkpoint_interval_seconds`.
+    """
+
+    def __init__(self, job: BackgroundJob, checkpoint: bool = False):
+        self.job = job
+        self.checkpoint = checkpoint
+        self._last_progress = 0.0
+        self._last_checkpoint = 0.0
+
+    async def __call__(self, progress: sync_service.ProposalSyncProgress) -> None:
+        now = asyncio.get_running_loop().time()
+        progress_due = (
+            progress.finished
+            or now - self._last_progress >= settings.job_progress_interval_seconds
+        )
+        checkpoint_due = self.checkpoint and (
+            progress.finished
+            or now - self._last_checkpoint >= settings.job_checkpoint_interval_seconds
+        )
+        if not (progress_due or checkpoint_due):
+            return
+
+        current_progress = job_progress(progress)
+        if checkpoint_due:
+            await save_checkpoint(
+                self.job.id,
+                JobCheckpoint(
+                    remaining=sorted(progress.remaining), failed=dict(progress.failed)
+                ),
+                lease_token=self.job.lease_token,
+                progress=current_progress,
+            )
+            self._last_checkpoint = now
+            logger.debug(
+                f"Checkpointed job {self.job.id}: {progress.done:,} of {progress.total:,} done."
+            )
+        else:
+            await save_progress(
+                self.job.id, current_progress, lease_token=self.job.lease_token
+            )
+        self._last_progress = now
+
+        _record_progress_metrics(self.job.action, current_progress)
+
+
+async def _keep_lease_alive(
+    job: BackgroundJob, job_task: asyncio.Task, lease_lost: asyncio.Event
+) -> None:
+    """
+    Heartbeat for a running job.  If the lease turns out to have been taken over by
+    another worker, the job is cancelled here so that only one worker carries on.
+    """
+    while True:
+        await asyncio.sleep(settings.job_lease_seconds / 3)
+        try:
+            renewed = await renew_lease(job.id, job.lease_token)
+        except Exception as e:
+            logger.error(f"Error renewing lease for job {job.id}: {e}")
+            continue
+
+        if not renewed:
+            logger.warning(
+                f"Lease on job {job.id} was lost to another worker, abandoning it."
+            )
+            metrics.job_leases_lost.labels(action=job.action).inc()
+            metrics.job_claim_conflicts.inc()
+            lease_lost.set()
+            job_task.cancel()
+            return
 
 
 async def job_by_id(job_id: bson.ObjectId) -> Optional[BackgroundJob]:
     return await BackgroundJob.find_one(BackgroundJob.id == job_id)
 
 
+async def jobs_by_ids(job_ids: list[bson.ObjectId]) -> list[BackgroundJob]:
+    return await BackgroundJob.find(In(BackgroundJob.id, job_ids)).to_list()
+
+
 async def is_job_finished(job_id: bson.ObjectId) -> bool:
     job: Optional[BackgroundJob] = await job_by_id(job_id)
     if not job:
@@ -82,77 +939,274 @@ async def is_job_finished(job_id: bson.ObjectId) -> bool:
     return job.is_finished
 
 
-async def worker_function():
-    logger.info("Background asyncio service worker up and running.")
-    await asyncio.sleep(1)
+async def _run_job_action(job: BackgroundJob) -> None:
+    match job.action:
+        case JobActions.synchronize_admins:
+            logger.info(f"Processing job {job.id} to synchronize admins.")
+            await sync_service.worker_synchronize_dataadmins()
+        case JobActions.update_cycle_information:
+            logger.info(
+                f"Processing job {job.id} to update cycle information for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
+            )
+            await sync_service.worker_update_proposal_to_cycle_mapping(
+                job.sync_parameters.facility, job.sync_parameters.sync_source
+            )
+        case JobActions.synchronize_cycles:
+            logger.info(
+                f"Processing job {job.id} to synchronize cycles for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
+            )
+            await sync_service.worker_synchronize_cycles_from_pass(
+                job.sync_parameters.facility
+            )
+        case JobActions.synchronize_proposal:
+            logger.info(
+                f"Processing job {job.id} to synchronize proposal {job.sync_parameters.proposal_id} for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
+            )
+            await sync_service.worker_synchronize_proposal_from_pass(
+                job.sync_parameters.proposal_id, job.sync_parameters.facility
+            )
+        case JobActions.synchronize_proposals_for_cycle:
+            logger.info(
+                f"Processing job {job.id} to synchronize proposals for the {job.sync_parameters.facility} facility's cycle {job.sync_parameters.cycle} (from {job.sync_parameters.sync_source})."
+            )
+            if job.checkpoint is not None:
+                logger.info(
+                    f"Resuming job {job.id} from checkpoint with {len(job.checkpoint.remaining)} proposals remaining."
+                )
+            await sync_service.worker_synchronize_proposals_for_cycle_from_pass(
+                job.sync_parameters.cycle,
+                job.sync_parameters.facility,
+                remaining_proposal_ids=(
+                    job.checkpoint.remaining if job.checkpoint else None
+                ),
+                previously_failed=(job.checkpoint.failed if job.checkpoint else None),
+                on_progress=JobProgressRecorder(job, checkpoint=True),
+            )
+        case JobActions.synchronize_proposals_incremental:
+            logger.info(
+                f"Processing job {job.id} to incrementally synchronize proposals for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
+            )
+            await sync_service.worker_synchronize_proposals_incremental_from_pass(
+                job.sync_parameters.facility, on_progress=JobProgressRecorder(job)
+            )
+        case JobActions.synchronize_proposal_types:
+            logger.info(
+                f"Processing job {job.id} to synchronize proposal types for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
+            )
+            await sync_service.worker_synchronize_proposal_types_from_pass(
+                job.sync_parameters.facility
+            )
+        case JobActions.create_slack_channel:
+            logger.info(
+                f"I would be Processing job {job.id} to create Slack channel for proposal {job.sync_parameters.proposal_id} if it was written."
+            )
+            # await proposal_service.worker_create_slack_channel(job.proposal_id)
+        case JobActions.generate_synthetic_dataset:
+            logger.info(
+                f"Processing job {job.id} to generate {job.sync_parameters.proposal_count} synthetic proposals."
+            )
+            await synthetic_data_service.worker_generate_synthetic_dataset(
+                job.sync_parameters
+            )
+        case _:
+            raise Exception(f"Unknown job action {job.action}.")
+
+
+async def process_job(job: BackgroundJob) -> None:
+    """
+    Run a job that has already been claimed, and record the outcome on the job.
+    """
+    lease_lost = asyncio.Event()
+    with count_queries() as queries:
+        # The task inherits the query count; the lease keeper's queries aren't counted
+        job_task = asyncio.create_task(_run_job_action(job))
+    lease_keeper = asyncio.create_task(_keep_lease_alive(job, job_task, lease_lost))
+    try:
+        await job_task
+        await complete_job(job.id, JobStatus.success, lease_token=job.lease_token)
 
+    except asyncio.CancelledError:
+        if not lease_lost.is_set():
+            raise
+        logger.warning(f"Stopped processing job {job.id} after losing its lease.")
+
+    except LeaseLostError as e:
+        logger.warning(f"Stopped processing job {job.id}: {e}")
+
+    except Exception as e:
+        logger.exception(f"Error processing job {job.id} for {job.action}: {e}")
+        try:
+            await record_job_failure(job, e)
+        except LeaseLostError as lease_error:
+            logger.warning(f"Could not record failure of job {job.id}: {lease_error}")
+
+    finally:
+        lease_keeper.cancel()
+        job_task.cancel()
+        # Jobs routinely make many queries, so this is only for information
+        logger.info(
+            f"Job {job.id} ({job.action}) made {queries.count} database queries "
+            f"({queries.duration_ms:.1f} ms)."
+        )
+
+
+async def claim_jobs(idle_workers: asyncio.Queue) -> None:
+    """
+    Claim jobs for the idle workers of this process, one worker at a time, so a
+    process looks for new jobs once however many of its workers are idle.
+
+    :param idle_workers: Queue of (worker id, future) pairs put by idle workers; the
+        job claimed for a worker is handed over by setting the result of its future.
+    """
+    poll_interval = _MIN_POLL_INTERVAL
     while True:
-        jobs = await pending_jobs()
-        if len(jobs) == 0:
-            # logger.debug("No new jobs to process.")
-            await asyncio.sleep(1)
-            continue
+        worker_id, handoff = await idle_workers.get()
+        while True:
+            wakeup = job_wakeup.snapshot()
+            try:
+                job = await claim_next_job(worker_id)
+            except Exception as e:
+                logger.error(f"[{worker_id}] Error claiming a job: {e}")
+                job = None
+            if job is not None:
+                break
+
+            # With a change stream we are told about new jobs, so only poll as a safety net
+            if job_wakeup.listening:
+                timeout = settings.job_watch_fallback_poll_seconds
+            else:
+                timeout = poll_interval
+            if not await job_wakeup.wait(wakeup, timeout):
+                # Without a change stream, jobs queued by other processes are only
+                # found by polling, so keep the wait short
+                poll_interval = min(
+                    poll_interval * 2, settings.job_poll_backoff_max_seconds
+                )
+
+        poll_interval = _MIN_POLL_INTERVAL
+        if handoff.cancelled():
+            # The worker stopped while we were waiting for a job; if the job can't be
+            # released it is reclaimed once its lease runs out
+            try:
+                await _release_job(job)
+            except Exception as e:
+                logger.error(f"[{worker_id}] Error releasing job {job.id}: {e}")
+        else:
+            handoff.set_result(job)
+
 
-        # Only process one job per iteration
-        job = jobs[0]
+async def worker_loop(worker_id: str, idle_workers: asyncio.Queue) -> None:
+    """
+    Repeatedly process the jobs claimed for this worker by `claim_jobs`.  Several of
+    these run concurrently, so a short job never has to wait for a long one to finish.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        handoff = loop.create_future()
+        await idle_workers.put((worker_id, handoff))
+        job = await handoff
+
+        logger.info(f"[{worker_id}] Starting job {job.id} with action {job.action}.")
         try:
-            logger.info(f"Starting new job {job.id} with action {job.action}.")
-            await start_job(job.id)
+            await process_job(job)
         except Exception as e:
-            logger.error(f"Error starting new job {job.id}: {e}")
-            continue
+            # e.g. the database went away while recording the outcome; the job is
+            # reclaimed once its lease runs out, so this worker just carries on
+            logger.exception(f"[{worker_id}] Error processing job {job.id}: {e}")
+
+
+async def _is_replica_set() -> bool:
+    client = BackgroundJob.get_motor_collection().database.client
+    hello = await client.admin.command("hello")
+    return "setName" in hello
+
+
+def _makes_job_claimable(change: dict) -> bool:
+    if change["operationType"] == "insert":
+        return True
+    updated_fields = change.get("updateDescription", {}).get("updatedFields", {})
+    return (
+        updated_fields.get("processing_status") == JobStatus.awaiting
+        # A job finishing may free a slot for an action at its concurrency limit
+        or updated_fields.get("is_finished") is True
+    )
+
+
+async def _watch_jobs() -> None:
+    """
+    Follow changes to the jobs collection made by any process, using a MongoDB change
+    stream, to wake idle workers (when a job becomes claimable) and anyone waiting
+    for a job's status to change.
+
+    Change streams are only available on replica sets (and sharded clusters), so
+    against a standalone server everyone falls back to polling instead.
+    """
+    try:
+        if not await _is_replica_set():
+            logger.info("MongoDB is not a replica set, polling for job changes.")
+            return
+    except Exception as e:
+        logger.warning(f"Could not determine the MongoDB topology ({e}), polling.")
+        return
 
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update"]}}}]
+    while True:
         try:
-            match job.action:
-                case JobActions.synchronize_admins:
-                    logger.info(f"Processing job {job.id} to synchronize admins.")
-                    await sync_service.worker_synchronize_dataadmins()
-                case JobActions.update_cycle_information:
-                    logger.info(
-                        f"Processing job {job.id} to update cycle information for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
-                    )
-                    await sync_service.worker_update_proposal_to_cycle_mapping(
-                        job.sync_parameters.facility, job.sync_parameters.sync_source
-                    )
-                case JobActions.synchronize_cycles:
-                    logger.info(
-                        f"Processing job {job.id} to synchronize cycles for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
-                    )
-                    await sync_service.worker_synchronize_cycles_from_pass(
-                        job.sync_parameters.facility
-                    )
-                case JobActions.synchronize_proposal:
-                    logger.info(
-                        f"Processing job {job.id} to synchronize proposal {job.sync_parameters.proposal_id} for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
-                    )
-                    await sync_service.worker_synchronize_proposal_from_pass(
-                        job.sync_parameters.proposal_id, job.sync_parameters.facility
-                    )
-                case JobActions.synchronize_proposals_for_cycle:
-                    logger.info(
-                        f"Processing job {job.id} to synchronize proposals for the {job.sync_parameters.facility} facility's cycle {job.sync_parameters.cycle} (from {job.sync_parameters.sync_source})."
-                    )
-                    await sync_service.worker_synchronize_proposals_for_cycle_from_pass(
-                        job.sync_parameters.cycle, job.sync_parameters.facility
-                    )
-                case JobActions.synchronize_proposal_types:
-                    logger.info(
-                        f"Processing job {job.id} to synchronize proposal types for the {job.sync_parameters.facility} facility (from {job.sync_parameters.sync_source})."
-                    )
-                    await sync_service.worker_synchronize_proposal_types_from_pass(
-                        job.sync_parameters.facility
-                    )
-                case JobActions.create_slack_channel:
-                    logger.info(
-                        f"I would be Processing job {job.id} to create Slack channel for proposal {job.sync_parameters.proposal_id} if it was written."
-                    )
-                    # await proposal_service.worker_create_slack_channel(job.proposal_id)
-                case _:
-                    raise Exception(f"Unknown job action {job.action}.")
+            async with BackgroundJob.get_motor_collection().watch(pipeline) as stream:
+                job_wakeup.listening = job_updates.listening = True
+                logger.info("Watching the jobs collection for changes.")
+                async for change in stream:
+                    job_updates.notify(change["documentKey"]["_id"])
+                    if _makes_job_claimable(change):
+                        job_wakeup.notify()
+        except Exception as e:
+            logger.error(f"Change stream on the jobs collection failed: {e}")
+        finally:
+            job_wakeup.listening = job_updates.listening = False
+        await asyncio.sleep(settings.job_watch_fallback_poll_seconds)
 
-            await complete_job(job.id, JobStatus.success)
 
+_jobs_watcher: Optional[asyncio.Task] = None
+
+
+def start_jobs_watcher() -> None:
+    """
+    Start following changes to the jobs collection, if this process isn't already.
+    """
+    global _jobs_watcher
+    if _jobs_watcher is None or _jobs_watcher.done():
+        _jobs_watcher = asyncio.create_task(_watch_jobs())
+
+
+def stop_jobs_watcher() -> None:
+    global _jobs_watcher
+    if _jobs_watcher is not None:
+        _jobs_watcher.cancel()
+        _jobs_watcher = None
+
+
+async def _reclaim_stale_jobs_periodically() -> None:
+    while True:
+        try:
+            await reclaim_stale_jobs()
         except Exception as e:
-            logger.exception(f"Error processing job {job.id} for {job.action}: {e}")
-            error_message = traceback.format_exc()
-            await complete_job(job.id, JobStatus.failed, error_message)
+            logger.error(f"Error reclaiming stale jobs: {e}")
+        await asyncio.sleep(settings.job_lease_seconds / 3)
+
+
+async def worker_function(concurrency: int = settings.background_worker_concurrency):
+    concurrency = max(1, concurrency)
+    logger.info(
+        f"Background asyncio service worker up and running ({concurrency} concurrent workers)."
+    )
+    await asyncio.sleep(1)
+
+    worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+    async with asyncio.TaskGroup() as workers:
+        # Look for jobs abandoned by a worker that went away mid-job
+        workers.create_task(_reclaim_stale_jobs_periodically())
+        start_jobs_watcher()
+        idle_workers = asyncio.Queue()
+        workers.create_task(claim_jobs(idle_workers))
+        for n in range(concurrency):
+            workers.create_task(worker_loop(f"{worker_prefix}:{n}", idle_workers))
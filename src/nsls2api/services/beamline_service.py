@@ -69,6 +69,19 @@ async def beamline_by_pass_id(pass_id: str) -> Optional[Beamline]:
     return beamline
 
 
+async def beamlines_by_pass_ids(pass_ids: list[str]) -> list[Beamline]:
+    """
+    Find and return all the beamlines matching any of the given PASS IDs.
+
+    :param pass_ids: The PASS IDs of the beamlines to search for.
+    :return: A list of the beamlines found (which may be empty).
+    """
+    beamlines = await Beamline.find(
+        In(Beamline.pass_id, [str(pass_id) for pass_id in pass_ids])
+    ).to_list()
+    return beamlines
+
+
 async def all_services(name: str) -> Optional[ServicesOnly]:
     beamline_services = await Beamline.find_one(Beamline.name == name.upper()).project(
         ServicesOnly
@@ -296,8 +309,15 @@ async def data_admin_group(beamline_name: str) -> str:
     """
     beamline = await Beamline.find_one(Beamline.name == beamline_name.upper())
 
+    return beamline_data_admin_group(beamline)
+
+
+def beamline_data_admin_group(beamline: Beamline) -> str:
+    """
+    The data admin group for a beamline that has already been retrieved.
+    """
     if beamline.custom_data_admin_group is None:
-        return f"n2sn-right-dataadmin-{beamline_name.lower()}"
+        return f"n2sn-right-dataadmin-{beamline.name.lower()}"
     else:
         return beamline.custom_data_admin_group
 
@@ -1,13 +1,16 @@
 from typing import List, Optional
 
 from nsls2api.api.models.person_model import BNLPerson
+from nsls2api.infrastructure.config import get_settings
 from nsls2api.infrastructure.logging import logger
 from nsls2api.services.helpers import (
     _call_async_webservice_with_client,
     httpx_client_wrapper,
 )
 
-base_url = "https://api.bnl.gov/BNLPeople"
+settings = get_settings()
+
+base_url = str(settings.bnlpeople_api_url).rstrip("/")
 
 
 async def _call_bnlpeople_webservice(url: str):
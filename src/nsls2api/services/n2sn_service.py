@@ -1,5 +1,11 @@
-from typing import Optional
+import asyncio
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional, TypeVar
 
+from ldap3.core.exceptions import LDAPException
 from N2SNUserTools.ldap import ADObjects
 
 from nsls2api.api.models.person_model import (
@@ -11,6 +17,153 @@ from nsls2api.infrastructure.logging import logger
 
 settings = get_settings()
 
+T = TypeVar("T")
+
+
+class LdapTimeoutError(Exception):
+    """
+    Raised when Active Directory doesn't answer within the time allowed.
+    """
+
+
+class _PooledConnection:
+    def __init__(self):
+        self.ad = ADObjects(
+            settings.active_directory_server,
+            user_search=settings.n2sn_user_search,
+            group_search=settings.n2sn_group_search,
+            authenticate=False,
+            ca_certs_file=settings.bnlroot_ca_certs_file,
+        )
+        # Connects and binds
+        self.ad.__enter__()
+        self.created = time.monotonic()
+
+    def is_healthy(self) -> bool:
+        if time.monotonic() - self.created > settings.ldap_connection_max_age_seconds:
+            return False
+        # The ldap3 connection that ADObjects opened (and bound) in __enter__
+        connection = self.ad.connection
+        return connection.bound and not connection.closed
+
+    def close(self) -> None:
+        try:
+            self.ad.__exit__(None, None, None)
+        except Exception as e:
+            logger.debug(f"Error closing LDAP connection: {e}")
+
+
+class LdapConnectionPool:
+    """
+    A small pool of Active Directory connections, used from a dedicated thread pool.
+
+    The LDAP calls are blocking, so they are run in the pool's own threads rather than
+    on the event loop (or in the default executor, where they would compete with
+    everything else).  There is one thread per connection, so a connection is only
+    ever used by one thread at a time.  Connections are replaced when they get too
+    old, or when a call fails with an LDAP (e.g. connection) error, in which case the
+    call is retried once on a new connection.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.size, thread_name_prefix="ldap"
+        )
+        self._idle: collections.deque[_PooledConnection] = collections.deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _checkout(self) -> _PooledConnection:
+        with self._lock:
+            while self._idle:
+                connection = self._idle.pop()
+                if connection.is_healthy():
+                    return connection
+                connection.close()
+        return _PooledConnection()
+
+    def _checkin(self, connection: _PooledConnection) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def _call(self, operation: Callable[[ADObjects], T]) -> T:
+        # Runs in one of the pool's threads
+        connection = self._checkout()
+        broken = False
+        try:
+            try:
+                return operation(connection.ad)
+            except LDAPException as e:
+                logger.warning(f"LDAP call failed ({e}), retrying on a new connection.")
+                connection.close()
+                # So that it isn't closed again if a new connection can't be made
+                connection = None
+                connection = _PooledConnection()
+                return operation(connection.ad)
+        except LDAPException:
+            broken = True
+            raise
+        finally:
+            # Any other error isn't a problem with the connection (e.g. a group that
+            # doesn't exist), so it goes back in the pool
+            if connection is not None:
+                if broken:
+                    connection.close()
+                else:
+                    self._checkin(connection)
+
+    async def run(
+        self, operation: Callable[[ADObjects], T], timeout: Optional[float] = None
+    ) -> T:
+        """
+        Run `operation` with a pooled connection, without blocking the event loop.
+
+        :param operation: A function that makes the LDAP call(s), given an ADObjects.
+        :param timeout: The longest to wait, in seconds, including time spent waiting
+            for a free connection (defaults to the ldap_call_timeout_seconds setting).
+        :raises LdapTimeoutError: If the call took longer than `timeout`.
+        """
+        if timeout is None:
+            timeout = settings.ldap_call_timeout_seconds
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._call, operation)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError as error:
+            # The call itself carries on in its thread, and returns its connection when done
+            raise LdapTimeoutError(
+                f"Timed out after {timeout}s waiting for Active Directory."
+            ) from error
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), collections.deque()
+        for connection in idle:
+            connection.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[LdapConnectionPool] = None
+
+
+def ldap_pool() -> LdapConnectionPool:
+    global _pool
+    if _pool is None:
+        _pool = LdapConnectionPool(settings.ldap_pool_size)
+    return _pool
+
+
+def close_ldap_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
 
 async def get_groups_by_username(username: str) -> Optional[ActiveDirectoryUserGroups]:
     """
@@ -18,14 +171,9 @@ async def get_groups_by_username(username: str) -> Optional[ActiveDirectoryUserG
     :return: An instance of ActiveDirectoryUserGroups that contains information about the groups the user belongs to. Returns None if the user is not found or if there are multiple users with the same username.
     """
 
-    with ADObjects(
-        settings.active_directory_server,
-        user_search=settings.n2sn_user_search,
-        group_search=settings.n2sn_group_search,
-        authenticate=False,
-        ca_certs_file=settings.bnlroot_ca_certs_file,
-    ) as ad:
-        user_details = ad.get_group_by_samaccountname(username)
+    user_details = await ldap_pool().run(
+        lambda ad: ad.get_group_by_samaccountname(username)
+    )
     if len(user_details) == 0 or len(user_details) > 1:
         return None
     return ActiveDirectoryUserGroups(**user_details[0])
@@ -39,17 +187,9 @@ async def get_user_by_username(username: str) -> Optional[ActiveDirectoryUser]:
     :return: An instance of ActiveDirectoryUser if the user is found, else None.
     """
 
-    print(f"type = {type(settings)}")
-    print(settings.pass_api_key)
-
-    with ADObjects(
-        settings.active_directory_server,
-        user_search=settings.n2sn_user_search,
-        group_search=settings.n2sn_group_search,
-        authenticate=False,
-        ca_certs_file=settings.bnlroot_ca_certs_file,
-    ) as ad:
-        user_details = ad.get_user_by_samaccountname(username)
+    user_details = await ldap_pool().run(
+        lambda ad: ad.get_user_by_samaccountname(username)
+    )
     if len(user_details) == 0 or len(user_details) > 1:
         return None
     return ActiveDirectoryUser(**user_details[0])
@@ -61,14 +201,7 @@ async def get_user_by_id(bnl_id: str) -> Optional[ActiveDirectoryUser]:
     :return: An ActiveDirectoryUser object representing the user's details
 
     """
-    with ADObjects(
-        settings.active_directory_server,
-        user_search=settings.n2sn_user_search,
-        group_search=settings.n2sn_group_search,
-        authenticate=False,
-        ca_certs_file=settings.bnlroot_ca_certs_file,
-    ) as ad:
-        user_details = ad.get_user_by_id(bnl_id)
+    user_details = await ldap_pool().run(lambda ad: ad.get_user_by_id(bnl_id))
     if len(user_details) == 0 or len(user_details) > 1:
         return None
     return ActiveDirectoryUser(**user_details[0])
@@ -86,27 +219,106 @@ async def get_users_in_group(group: str) -> list[ActiveDirectoryUser]:
     :param group: The name of the group that you want to retrieve the users from.
 
     :return: A list of `ActiveDirectoryUser` objects representing the users in the specified group.
+    :raises LdapTimeoutError: If Active Directory didn't answer in time, in which case
+        the members are unknown (rather than there being none).
+    :raises RuntimeError: If there is more than one group with the name.
+
+    """
+    return await ldap_pool().run(lambda ad: ad.get_group_members(group))
 
+
+class GroupMembershipCache:
+    """
+    Caches the sAMAccountNames of the members of Active Directory groups.
+
+    A group's members are fetched at most once at a time, however many callers ask
+    for it concurrently.  Once the cached members are older than `ttl_seconds` they
+    are refreshed in the background, and callers are given the cached members in the
+    meantime, for up to another `stale_seconds`; after that callers wait for the
+    refresh.
+
+    A fetch that fails is never cached: the previous members are kept (and returned,
+    however old they are) until a fetch succeeds, and if there are none the error is
+    raised to the caller.
     """
-    with ADObjects(
-        settings.active_directory_server,
-        user_search=settings.n2sn_user_search,
-        group_search=settings.n2sn_group_search,
-        authenticate=False,
-        ca_certs_file=settings.bnlroot_ca_certs_file,
-    ) as ad:
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[frozenset[str]]],
+        ttl_seconds: float,
+        stale_seconds: float = 0,
+    ):
+        self._fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        # Group name -> (members, when they were fetched)
+        self._members: dict[str, tuple[frozenset[str], float]] = {}
+        self._fetches: dict[str, asyncio.Task] = {}
+
+    async def members(self, group: str) -> frozenset[str]:
+        cached = self._members.get(group)
+        if cached is not None:
+            members, fetched_at = cached
+            age = time.monotonic() - fetched_at
+            if age < self.ttl_seconds:
+                return members
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._refresh(group)
+                return members
         try:
-            users = ad.get_group_members(group)
-        except RuntimeError as e:
-            logger.exception(e)
-            return []
-    return users
+            # Shielded so that a caller giving up doesn't cancel the fetch for the others
+            return await asyncio.shield(self._refresh(group))
+        except Exception:
+            if cached is None:
+                raise
+            return cached[0]
+
+    def _refresh(self, group: str) -> asyncio.Task:
+        task = self._fetches.get(group)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(group))
+            self._fetches[group] = task
+            task.add_done_callback(lambda done: self._fetched(group, done))
+        return task
 
+    async def _fetch_and_store(self, group: str) -> frozenset[str]:
+        members = frozenset(await self._fetch(group))
+        self._members[group] = (members, time.monotonic())
+        return members
 
-async def is_user_in_group(username: str, group: str):
+    def _fetched(self, group: str, task: asyncio.Task) -> None:
+        self._fetches.pop(group, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Could not fetch members of {group}: {task.exception()}")
+
+    def invalidate(self, group: Optional[str] = None) -> None:
+        if group is None:
+            self._members.clear()
+        else:
+            self._members.pop(group, None)
+
+
+async def _fetch_group_members(group: str) -> frozenset[str]:
+    users = await get_users_in_group(group)
+    return frozenset(
+        user["sAMAccountName"] for user in users if user["sAMAccountName"] is not None
+    )
+
+
+group_membership_cache = GroupMembershipCache(
+    _fetch_group_members,
+    ttl_seconds=settings.ldap_group_cache_ttl_seconds,
+    stale_seconds=settings.ldap_group_cache_stale_seconds,
+)
+
+
+async def is_user_in_group(username: str, group: str) -> bool:
     """
     Checks if a user is present in a specified group.
 
+    The group's members are cached (see `group_membership_cache`), so this doesn't
+    usually need to ask Active Directory.
+
     Args:
         username (str): The username of the user to check.
         group (str): The name of the group to check.
@@ -114,9 +326,4 @@ async def is_user_in_group(username: str, group: str):
     Returns:
         bool: True if the user is found in the group, False otherwise.
     """
-    _user_found = False
-    users = await get_users_in_group(group)
-    _user_found: bool = any(
-        [user for user in users if user["sAMAccountName"] == username]
-    )
-    return _user_found
+    return username in await group_membership_cache.members(group)
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+from nsls2api.infrastructure.logging import logger
+
+# Marker placed on a queue to tell the workers of the next stage to stop
+_END_OF_STREAM = object()
+
+
+@dataclass
+class Stage:
+    """
+    A single step of a StagedPipeline.
+
+    The handler is called once per item and its return value is passed on to the next
+    stage.  Up to `concurrency` items are handled at the same time.
+    """
+
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+
+
+@dataclass
+class StageMetrics:
+    """Throughput and latency figures for one stage of a pipeline run."""
+
+    name: str
+    concurrency: int
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    max_latency: float = 0.0
+    first_started: Optional[float] = None
+    last_finished: Optional[float] = None
+
+    def record(self, started: float, finished: float, succeeded: bool) -> None:
+        if self.first_started is None:
+            self.first_started = started
+        self.last_finished = finished
+
+        latency = finished - started
+        self.busy_seconds += latency
+        self.max_latency = max(self.max_latency, latency)
+        if succeeded:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.first_started is None or self.last_finished is None:
+            return 0.0
+        return self.last_finished - self.first_started
+
+    @property
+    def mean_latency(self) -> float:
+        handled = self.processed + self.failed
+        return self.busy_seconds / handled if handled else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Items successfully processed per second of stage wall time."""
+        return self.processed / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.processed:,} processed, {self.failed:,} failed, "
+            f"{self.throughput:,.2f} items/s, mean latency {self.mean_latency * 1000:,.1f} ms, "
+            f"max latency {self.max_latency * 1000:,.1f} ms (concurrency={self.concurrency})"
+        )
+
+
+@dataclass
+class PipelineResult:
+    stages: list[StageMetrics]
+    failures: dict[Hashable, Exception] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+
+class StagedPipeline:
+    """
+    Streams items through a sequence of stages connected by bounded asyncio queues.
+
+    Each stage runs its own pool of worker tasks, so the stages overlap with each other
+    and the bounded queues apply backpressure to faster upstream stages.  An item that
+    raises in any stage is recorded as a failure (keyed by `key(item)`) and dropped
+    from the rest of the pipeline; the other items carry on.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int = 100,
+        key: Callable[[Any], Hashable] = lambda item: item,
+        on_failure: Optional[Callable[[Any, Exception], Awaitable[None]]] = None,
+    ):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.key = key
+        self.on_failure = on_failure
+        # Metrics for the current (or last) run, updated live as items are processed
+        self.metrics: list[StageMetrics] = []
+
+    async def run(self, items: Iterable[Any]) -> PipelineResult:
+        start_time = time.perf_counter()
+        metrics = [StageMetrics(stage.name, stage.concurrency) for stage in self.stages]
+        self.metrics = metrics
+        failures: dict[Hashable, Exception] = {}
+
+        # One queue feeding each stage
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+
+        async def feed():
+            for item in items:
+                await queues[0].put(item)
+            for _ in range(max(1, self.stages[0].concurrency)):
+                await queues[0].put(_END_OF_STREAM)
+
+        async def work(index: int):
+            stage = self.stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                item = await inbox.get()
+                if item is _END_OF_STREAM:
+                    return
+
+                started = time.perf_counter()
+                try:
+                    result = await stage.handler(item)
+                except Exception as error:
+                    metrics[index].record(started, time.perf_counter(), succeeded=False)
+                    failures[self.key(item)] = error
+                    logger.error(
+                        f"Pipeline stage '{stage.name}' failed for {self.key(item)}: {error}"
+                    )
+                    if self.on_failure is not None:
+                        await self.on_failure(item, error)
+                    continue
+                metrics[index].record(started, time.perf_counter(), succeeded=True)
+
+                if outbox is not None:
+                    await outbox.put(result)
+
+        async def run_stage(index: int):
+            async with asyncio.TaskGroup() as workers:
+                for _ in range(max(1, self.stages[index].concurrency)):
+                    workers.create_task(work(index))
+            # Every worker of this stage has finished, so tell the next stage to stop
+            if index + 1 < len(self.stages):
+                for _ in range(max(1, self.stages[index + 1].concurrency)):
+                    await queues[index + 1].put(_END_OF_STREAM)
+
+        async with asyncio.TaskGroup() as group:
+            group.create_task(feed())
+            for index in range(len(self.stages)):
+                group.create_task(run_stage(index))
+
+        return PipelineResult(
+            stages=metrics,
+            failures=failures,
+            elapsed_seconds=time.perf_counter() - start_time,
+        )
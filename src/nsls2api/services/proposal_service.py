@@ -1,4 +1,6 @@
 import datetime
+import hashlib
+import json
 import random
 from pathlib import Path
 from typing import Optional
@@ -21,7 +23,7 @@ from nsls2api.api.models.proposal_model import (
 from nsls2api.infrastructure.logging import logger
 from nsls2api.models.cycles import Cycle
 from nsls2api.models.proposal_types import ProposalType
-from nsls2api.models.proposals import Proposal, ProposalIdView, User
+from nsls2api.models.proposals import Proposal, ProposalBase, ProposalIdView, User
 from nsls2api.models.slack_models import SlackChannel, SlackChannelToCreate
 from nsls2api.services import (
     beamline_service,
@@ -209,6 +211,49 @@ def generate_data_session_for_proposal(proposal_id: str) -> str:
     return f"pass-{str(proposal_id)}"
 
 
+def proposal_content_hash(proposal: ProposalBase) -> str:
+    """
+    Generate a stable fingerprint of the content of a proposal that is sourced from PASS.
+
+    Lists are normalized (sorted) so that the ordering returned by PASS does not
+    affect the fingerprint. Locally maintained fields (cycles, slack channels, locks
+    and timestamps) are not included.
+
+    Args:
+        proposal (ProposalBase): The proposal to fingerprint.
+
+    Returns:
+        str: The hex digest of the normalized proposal content.
+    """
+    safs = sorted(
+        (
+            {
+                "saf_id": saf.saf_id,
+                "status": saf.status,
+                "instruments": sorted(saf.instruments or []),
+            }
+            for saf in proposal.safs or []
+        ),
+        key=lambda saf: saf["saf_id"],
+    )
+    users = sorted(
+        (user.model_dump() for user in proposal.users or []),
+        key=lambda user: json.dumps(user, sort_keys=True),
+    )
+    content = {
+        "proposal_id": proposal.proposal_id,
+        "data_session": proposal.data_session,
+        "title": proposal.title,
+        "type": proposal.type,
+        "pass_type_id": proposal.pass_type_id,
+        "instruments": sorted(proposal.instruments or []),
+        "safs": safs,
+        "users": users,
+    }
+    normalized = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
 async def get_beamline_specific_slack_channel_for_proposal(
     proposal_id: str,
 ) -> list[str]:
@@ -0,0 +1,356 @@
+import asyncio
+import datetime
+import os
+import random
+import socket
+from dataclasses import dataclass
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from nsls2api.api.models.facility_model import FacilityName
+from nsls2api.infrastructure import metrics
+from nsls2api.infrastructure.config import get_settings
+from nsls2api.infrastructure.logging import logger
+from nsls2api.models.jobs import JobActions, JobSyncParameters
+from nsls2api.models.schedules import JobSchedule, SchedulerLease
+from nsls2api.services import background_service
+
+settings = get_settings()
+
+_SCHEDULER_LEASE_ID = "scheduler"
+
+# The refreshes that used to be triggered externally, created the first time the
+# scheduler runs (after that they can be changed, or disabled, in the database).
+DEFAULT_SCHEDULES = [
+    dict(
+        name="nsls2-cycles-hourly",
+        action=JobActions.synchronize_cycles,
+        sync_parameters=JobSyncParameters(facility=FacilityName.nsls2),
+        cron="5 * * * *",
+        jitter_seconds=120,
+    ),
+    dict(
+        name="data-admins-hourly",
+        action=JobActions.synchronize_admins,
+        cron="20 * * * *",
+        jitter_seconds=120,
+    ),
+    dict(
+        name="nsls2-current-cycle-proposals-hourly",
+        action=JobActions.synchronize_proposals_incremental,
+        sync_parameters=JobSyncParameters(facility=FacilityName.nsls2),
+        cron="35 * * * *",
+        jitter_seconds=300,
+    ),
+    dict(
+        name="nsls2-proposal-types-nightly",
+        action=JobActions.synchronize_proposal_types,
+        sync_parameters=JobSyncParameters(facility=FacilityName.nsls2),
+        cron="15 2 * * *",
+        jitter_seconds=600,
+    ),
+]
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> frozenset[int]:
+    values = set()
+    for part in field.split(","):
+        range_part, has_step, step_part = part.partition("/")
+        step = int(step_part) if has_step else 1
+        if step < 1:
+            raise ValueError(f"Invalid step in cron field '{field}'.")
+
+        if range_part == "*":
+            start, end = low, high
+        elif "-" in range_part:
+            start, end = (int(value) for value in range_part.split("-", 1))
+        else:
+            start = int(range_part)
+            # "5/15" means every 15 starting at 5
+            end = high if has_step else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field '{field}' is outside the range {low}-{high}.")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    """
+    A standard 5-field cron expression: minute, hour, day of month, month and day of
+    week (0-7, where both 0 and 7 are Sunday).  Fields can be `*`, values, ranges,
+    steps and comma-separated lists of these (e.g. `*/15`, `1-5`, `0,30`).
+    """
+
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    days_restricted: bool
+    weekdays_restricted: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronSchedule":
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(
+                f"Cron expression '{expression}' should have 5 fields, not {len(fields)}."
+            )
+        minute, hour, day, month, weekday = fields
+
+        weekdays = _parse_cron_field(weekday, 0, 7)
+        if 7 in weekdays:
+            weekdays = (weekdays - {7}) | {0}
+
+        return cls(
+            minutes=_parse_cron_field(minute, 0, 59),
+            hours=_parse_cron_field(hour, 0, 23),
+            days=_parse_cron_field(day, 1, 31),
+            months=_parse_cron_field(month, 1, 12),
+            weekdays=weekdays,
+            days_restricted=day != "*",
+            weekdays_restricted=weekday != "*",
+        )
+
+    def _day_matches(self, moment: datetime.datetime) -> bool:
+        day_matches = moment.day in self.days
+        # Python counts Monday as 0, cron counts Sunday as 0
+        weekday_matches = (moment.weekday() + 1) % 7 in self.weekdays
+        # As in cron, if both are restricted then either one matching is enough
+        if self.days_restricted and self.weekdays_restricted:
+            return day_matches or weekday_matches
+        return day_matches and weekday_matches
+
+    def next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """
+        The first time (to the minute) matching the schedule that is after `after`.
+        """
+        moment = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        # Long enough to include a leap day
+        give_up = moment + datetime.timedelta(days=366 * 5)
+
+        while moment < give_up:
+            if moment.month not in self.months:
+                next_month = moment.replace(
+                    day=1, hour=0, minute=0
+                ) + datetime.timedelta(days=32)
+                moment = next_month.replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment
+
+        raise ValueError("The cron schedule never matches.")
+
+
+def next_run_time(
+    schedule: JobSchedule, after: Optional[datetime.datetime] = None
+) -> datetime.datetime:
+    if after is None:
+        after = datetime.datetime.now()
+    next_run = CronSchedule.parse(schedule.cron).next_after(after)
+    if schedule.jitter_seconds > 0:
+        next_run += datetime.timedelta(
+            seconds=random.uniform(0, schedule.jitter_seconds)
+        )
+    return next_run
+
+
+async def seed_default_schedules() -> None:
+    """
+    Create any of the default schedules that don't exist yet.
+    """
+    for default in DEFAULT_SCHEDULES:
+        schedule = JobSchedule(**default)
+        schedule.next_run_at = next_run_time(schedule)
+        try:
+            await schedule.insert()
+            logger.info(f"Created job schedule {schedule.name} ({schedule.cron}).")
+        except DuplicateKeyError:
+            pass
+
+
+async def acquire_scheduler_lease(owner: str) -> bool:
+    """
+    Try to become (or remain) the process that queues scheduled jobs.
+
+    :return: True if `owner` holds the lease.
+    """
+    now = datetime.datetime.now()
+    try:
+        await SchedulerLease.get_motor_collection().find_one_and_update(
+            {
+                "_id": _SCHEDULER_LEASE_ID,
+                "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}],
+            },
+            {
+                "$set": {
+                    "owner": owner,
+                    "expires_at": now
+                    + datetime.timedelta(seconds=settings.scheduler_lease_seconds),
+                }
+            },
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        # Somebody else holds an unexpired lease, so the upsert tried to insert
+        return False
+
+
+async def run_due_schedules(now: Optional[datetime.datetime] = None) -> int:
+    """
+    Queue a job for every enabled schedule that is due, unless the job from its
+    previous run is still waiting or running.
+
+    A schedule with an invalid cron expression is disabled, and an error with one
+    schedule doesn't stop the others from being run.
+
+    :return: The number of jobs queued.
+    """
+    if now is None:
+        now = datetime.datetime.now()
+
+    due_schedules = await JobSchedule.find(
+        JobSchedule.enabled == True,  # noqa: E712
+        JobSchedule.next_run_at <= now,
+    ).to_list()
+
+    # Schedules added directly to the database won't have a next run time yet
+    async for schedule in JobSchedule.find(
+        JobSchedule.enabled == True,  # noqa: E712
+        JobSchedule.next_run_at == None,  # noqa: E711
+    ):
+        try:
+            next_run_at = next_run_time(schedule, now)
+        except ValueError as e:
+            await _disable_schedule(schedule, e, now)
+            continue
+        await JobSchedule.find_one(JobSchedule.id == schedule.id).update(
+            {"$set": {"next_run_at": next_run_at}}
+        )
+
+    queued = 0
+    for schedule in due_schedules:
+        try:
+            next_run_at = next_run_time(schedule, now)
+        except ValueError as e:
+            await _disable_schedule(schedule, e, now)
+            continue
+
+        try:
+            if await _run_schedule(schedule, next_run_at, now):
+                queued += 1
+        except Exception as e:
+            logger.exception(f"Error running schedule {schedule.name}: {e}")
+            metrics.scheduled_runs.labels(
+                schedule=schedule.name, outcome="failed"
+            ).inc()
+
+    return queued
+
+
+async def _disable_schedule(
+    schedule: JobSchedule, error: ValueError, now: datetime.datetime
+) -> None:
+    logger.error(
+        f"Disabling schedule {schedule.name} as its cron expression "
+        f"'{schedule.cron}' is invalid: {error}"
+    )
+    metrics.scheduled_runs.labels(schedule=schedule.name, outcome="failed").inc()
+    await JobSchedule.find_one(JobSchedule.id == schedule.id).update(
+        {"$set": {"enabled": False, "last_updated": now}}
+    )
+
+
+async def _run_schedule(
+    schedule: JobSchedule, next_run_at: datetime.datetime, now: datetime.datetime
+) -> bool:
+    """
+    Queue the job for a due schedule, and move the schedule on to its next run.
+
+    :return: True if a job was queued.
+    """
+    update = {"next_run_at": next_run_at, "last_updated": now}
+
+    previous_job = None
+    if schedule.last_job_id is not None:
+        previous_job = await background_service.job_by_id(schedule.last_job_id)
+    if previous_job is not None and not previous_job.is_finished:
+        logger.warning(
+            f"Skipping scheduled {schedule.name} run as job {schedule.last_job_id} has not finished."
+        )
+        metrics.scheduled_runs.labels(schedule=schedule.name, outcome="skipped").inc()
+        await _update_schedule(schedule, update, {"skipped_runs": 1})
+        return False
+
+    # The schedule is only moved on once its job has been queued, so that a run
+    # isn't lost if queuing fails (it is tried again on the next tick instead)
+    try:
+        job = await background_service.create_background_job(
+            schedule.action, schedule.sync_parameters
+        )
+    except Exception as e:
+        logger.error(f"Could not queue a job for schedule {schedule.name}: {e}")
+        metrics.scheduled_runs.labels(schedule=schedule.name, outcome="failed").inc()
+        return False
+
+    # If another process got there first, the job will have been coalesced into
+    # the one it queued
+    if not await _update_schedule(
+        schedule, {**update, "last_job_id": job.id, "last_run_at": now}
+    ):
+        return False
+
+    logger.info(f"Queued job {job.id} for schedule {schedule.name}.")
+    metrics.scheduled_runs.labels(schedule=schedule.name, outcome="queued").inc()
+    return True
+
+
+async def _update_schedule(
+    schedule: JobSchedule, update: dict, increment: Optional[dict] = None
+) -> bool:
+    operations = {"$set": update}
+    if increment:
+        operations["$inc"] = increment
+    result = await JobSchedule.get_motor_collection().update_one(
+        {"_id": schedule.id, "next_run_at": schedule.next_run_at}, operations
+    )
+    return result.modified_count == 1
+
+
+async def scheduler_function() -> None:
+    """
+    Queue scheduled jobs, for as long as this process holds the scheduler lease.
+
+    Every process runs this, but only the current lease holder queues anything, so
+    each scheduled run happens once however many processes are deployed.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Job scheduler started ({owner}).")
+    is_leader = False
+    seeded = False
+
+    while True:
+        try:
+            was_leader = is_leader
+            is_leader = await acquire_scheduler_lease(owner)
+            if is_leader and not was_leader:
+                logger.info(f"{owner} is now queuing scheduled jobs.")
+
+            if is_leader:
+                if not seeded:
+                    await seed_default_schedules()
+                    seeded = True
+                await run_due_schedules()
+        except Exception as e:
+            logger.error(f"Error running scheduled jobs: {e}")
+
+        await asyncio.sleep(settings.scheduler_tick_seconds)
@@ -1,23 +1,37 @@
+import asyncio
 import datetime
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, Optional
 
 from beanie import UpdateResponse
-from beanie.operators import AddToSet, Set
+from beanie.operators import AddToSet, In, Set
 from httpx import HTTPStatusError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 
 from nsls2api.api.models.facility_model import FacilityName
 from nsls2api.api.models.person_model import ActiveDirectoryUser
+from nsls2api.infrastructure.config import get_settings
 from nsls2api.infrastructure.logging import logger
-from nsls2api.models.beamlines import Beamline
 from nsls2api.models.cycles import Cycle
 from nsls2api.models.jobs import JobSyncSource
 from nsls2api.models.pass_models import (
+    PassAllocation,
     PassCycle,
     PassProposal,
     PassProposalType,
     PassSaf,
 )
 from nsls2api.models.proposal_types import ProposalType
-from nsls2api.models.proposals import Proposal, SafetyForm, User
+from nsls2api.models.proposals import (
+    Proposal,
+    ProposalContentHashView,
+    SafetyForm,
+    User,
+)
+from nsls2api.models.sync_state import ProposalSyncState
 from nsls2api.services import (
     beamline_service,
     bnlpeople_service,
@@ -26,59 +40,115 @@ from nsls2api.services import (
     pass_service,
     proposal_service,
 )
+from nsls2api.services.pipeline import Stage, StagedPipeline, StageMetrics
+
+settings = get_settings()
+
+
+@dataclass
+class ProposalSyncCounts:
+    """Tally of the outcome of each proposal synchronized during a run."""
+
+    changed: int = 0
+    unchanged: int = 0
+
+    def record(self, changed: bool) -> None:
+        if changed:
+            self.changed += 1
+        else:
+            self.unchanged += 1
+
+    def __str__(self) -> str:
+        return f"{self.changed:,} changed, {self.unchanged:,} unchanged"
+
+
+async def _data_admin_usernames(group: str, limit: asyncio.Semaphore) -> set[str]:
+    async with limit:
+        ad_users: list[ActiveDirectoryUser] = await n2sn_service.get_users_in_group(
+            group
+        )
+    return {u["sAMAccountName"] for u in ad_users if u["sAMAccountName"] is not None}
 
 
 async def worker_synchronize_dataadmins(skip_beamlines=False) -> None:
     """
     This method synchronizes the (data) admin permissions (both beamline and facility)
     for all users in the system.
+
+    The group names come from the facility and beamline documents, which are loaded
+    up front, and each group is looked up in Active Directory once, concurrently.
+    Admin lists are only written when their membership has changed, and are left
+    alone if their group couldn't be looked up (rather than being emptied).
     """
     start_time = datetime.datetime.now()
 
-    facility_list = await facility_service.all_facilities()
-    for facility in facility_list:
-        logger.info(f"Synchronizing data admins for facility {facility.facility_id}.")
-        data_admin_group_name = await facility_service.data_admin_group(
-            facility.facility_id
-        )
-        if data_admin_group_name:
-            ad_users: list[ActiveDirectoryUser] = await n2sn_service.get_users_in_group(
-                data_admin_group_name
-            )
-            username_list = [
-                u["sAMAccountName"] for u in ad_users if u["sAMAccountName"] is not None
-            ]
-            logger.info(f"Setting user list = {username_list} ")
-            await facility_service.update_data_admins(
-                facility.facility_id, username_list
-            )
+    facility_groups: dict[str, str] = {}
+    facility_admins: dict[str, set[str]] = {}
+    for facility in await facility_service.all_facilities():
+        if facility.data_admin_group:
+            facility_groups[facility.facility_id] = facility.data_admin_group
+            facility_admins[facility.facility_id] = set(facility.data_admins or [])
         else:
             logger.warning(
                 f"There is no 'data_admin_group' for facility_id={facility.facility_id} defined in the database."
             )
-    time_taken = datetime.datetime.now() - start_time
-    logger.info(
-        f"Facility Data Admin permissions synchronized in {time_taken.total_seconds():,.2f} seconds"
-    )
 
+    beamline_groups: dict[str, str] = {}
+    beamline_admins: dict[str, set[str]] = {}
     if skip_beamlines is False:
-        beamline_list: list[Beamline] = await beamline_service.all_beamlines()
-        for beamline in beamline_list:
-            logger.info(f"Synchronizing data admins for beamline {beamline.name}.")
-            data_admin_group_name = await beamline_service.data_admin_group(
-                beamline.name
+        for beamline in await beamline_service.all_beamlines():
+            beamline_groups[beamline.name] = beamline_service.beamline_data_admin_group(
+                beamline
             )
-            ad_users: list[ActiveDirectoryUser] = await n2sn_service.get_users_in_group(
-                data_admin_group_name
+            beamline_admins[beamline.name] = set(beamline.data_admins or [])
+
+    # Several facilities/beamlines may share a group, so only look each one up once
+    groups = sorted(set(facility_groups.values()) | set(beamline_groups.values()))
+    limit = asyncio.Semaphore(max(1, settings.ldap_pool_size))
+    members = await asyncio.gather(
+        *[_data_admin_usernames(group, limit) for group in groups],
+        return_exceptions=True,
+    )
+    usernames_by_group: dict[str, set[str]] = {}
+    for group, result in zip(groups, members):
+        if isinstance(result, Exception):
+            logger.error(f"Could not look up the members of {group}: {result!r}")
+        else:
+            usernames_by_group[group] = result
+
+    changed = 0
+    skipped = 0
+    for facility_id, group in facility_groups.items():
+        usernames = usernames_by_group.get(group)
+        if usernames is None:
+            logger.warning(f"Leaving the data admins for {facility_id} unchanged.")
+            skipped += 1
+        elif usernames != facility_admins[facility_id]:
+            logger.info(f"Setting data admins for {facility_id} = {sorted(usernames)}")
+            await facility_service.update_data_admins(facility_id, sorted(usernames))
+            changed += 1
+
+    for beamline_name, group in beamline_groups.items():
+        usernames = usernames_by_group.get(group)
+        if usernames is None:
+            logger.warning(f"Leaving the data admins for {beamline_name} unchanged.")
+            skipped += 1
+        elif usernames != beamline_admins[beamline_name]:
+            logger.info(
+                f"Setting data admins for {beamline_name} = {sorted(usernames)}"
             )
-            username_list = [
-                u["sAMAccountName"] for u in ad_users if u["sAMAccountName"] is not None
-            ]
-            await beamline_service.update_data_admins(beamline.name, username_list)
+            await beamline_service.update_data_admins(beamline_name, sorted(usernames))
+            changed += 1
 
-        time_taken = datetime.datetime.now() - start_time
-        logger.info(
-            f"Beamline Data Admin permissions synchronized in {time_taken.total_seconds():,.2f} seconds"
+    time_taken = datetime.datetime.now() - start_time
+    unchanged = len(facility_groups) + len(beamline_groups) - changed - skipped
+    logger.info(
+        f"Data Admin permissions synchronized from {len(groups)} groups "
+        f"({changed:,} changed, {unchanged:,} unchanged, {skipped:,} skipped) in {time_taken.total_seconds():,.2f} seconds"
+    )
+    if skipped:
+        raise Exception(
+            f"Could not synchronize the data admins of {skipped} facilities/beamlines."
         )
 
 
@@ -219,65 +289,118 @@ async def worker_synchronize_proposal_types_from_pass(
     )
 
 
-async def synchronize_proposal_from_pass(
-    proposal_id: str, facility_name: FacilityName = FacilityName.nsls2
-) -> None:
+@dataclass
+class ProposalSyncItem:
     """
-    Synchronize a proposal from PASS into the local database.
-
-    This function fetches proposal details, associated SAFs, beamlines, and users from PASS,
-    and updates or inserts the corresponding Proposal document in the database.
+    A proposal making its way through the synchronization stages.
 
-    :param proposal_id: The PASS proposal ID to synchronize.
-    :type proposal_id: str
-    :param facility_name: The facility name (FacilityName) to use for synchronization.
-    :type facility_name: FacilityName
-    :return: None
+    Each stage fills in more of the item: fetch (PASS proposal and SAFs), enrich
+    (beamline names and BNL usernames) and transform (the Proposal document).
     """
-    beamline_list = []
-    user_list = []
-    saf_list = []
 
+    proposal_id: str
+    facility_name: FacilityName = FacilityName.nsls2
+    pass_proposal: Optional[PassProposal] = None
+    pass_safs: list[PassSaf] = field(default_factory=list)
+    beamlines_by_pass_id: dict[str, str] = field(default_factory=dict)
+    usernames_by_bnl_id: dict[str, Optional[str]] = field(default_factory=dict)
+    proposal: Optional[Proposal] = None
+
+
+async def fetch_proposal_from_pass(item: ProposalSyncItem) -> ProposalSyncItem:
+    """
+    Fetch the proposal and its SAFs from PASS.
+    """
     try:
-        pass_proposal: PassProposal = await pass_service.get_proposal(
-            proposal_id, facility_name
+        item.pass_proposal = await pass_service.get_proposal(
+            item.proposal_id, item.facility_name
         )
     except pass_service.PassException as error:
-        error_message = f"Error retrieving proposal {proposal_id} from PASS"
+        error_message = f"Error retrieving proposal {item.proposal_id} from PASS"
         logger.exception(error_message)
         raise Exception(error_message) from error
 
-    # Get the SAFs for this proposal
-    pass_saf_list: list[PassSaf] = await pass_service.get_saf_from_proposal(
-        proposal_id, facility_name
+    item.pass_safs = await pass_service.get_saf_from_proposal(
+        item.proposal_id, item.facility_name
     )
-    for saf in pass_saf_list:
-        saf_beamline_list = []
-        for resource in saf.Resources:
-            beamline = await beamline_service.beamline_by_pass_id(str(resource.ID))
-            if beamline:
-                saf_beamline_list.append(beamline.name)
+    return item
+
+
+async def _lookup_username(bnl_id: str) -> Optional[str]:
+    try:
+        logger.debug(f"Looking up username for employee/life number = {bnl_id}")
+        bnl_username = await bnlpeople_service.get_username_by_id(bnl_id)
+        logger.debug(f"     ---> {bnl_username}")
+    except HTTPStatusError as error:
+        logger.error(f"Could not find BNL username for BNL ID '{bnl_id}'.")
+        logger.error(f"BNL People API returned: {error}")
+        bnl_username = None
+    return bnl_username
+
+
+async def enrich_proposal(item: ProposalSyncItem) -> ProposalSyncItem:
+    """
+    Resolve the beamline names and BNL usernames needed to build the proposal.
+    """
+    pass_proposal = item.pass_proposal
+
+    # Look up all the beamlines for the proposal and its SAFs in one go
+    resource_ids = {str(resource.ID) for resource in pass_proposal.Resources}
+    for saf in item.pass_safs:
+        resource_ids.update(str(resource.ID) for resource in saf.Resources)
+    if resource_ids:
+        beamlines = await beamline_service.beamlines_by_pass_ids(list(resource_ids))
+        item.beamlines_by_pass_id = {
+            beamline.pass_id: beamline.name for beamline in beamlines
+        }
+
+    # Users are only added to proposals that have a PI
+    if pass_proposal.PI is not None:
+        bnl_ids = {user.BNL_ID for user in pass_proposal.Experimenters}
+        bnl_ids.add(pass_proposal.PI.BNL_ID)
+        bnl_ids.discard(None)
+        usernames = await asyncio.gather(
+            *[_lookup_username(bnl_id) for bnl_id in bnl_ids]
+        )
+        item.usernames_by_bnl_id = dict(zip(bnl_ids, usernames))
+
+    return item
 
+
+async def transform_proposal(item: ProposalSyncItem) -> ProposalSyncItem:
+    """
+    Build the (unsaved) Proposal document, along with its content fingerprint.
+    """
+    pass_proposal = item.pass_proposal
+    proposal_id = item.proposal_id
+    user_list = []
+    saf_list = []
+
+    for saf in item.pass_safs:
+        saf_beamline_list = [
+            item.beamlines_by_pass_id[str(resource.ID)]
+            for resource in saf.Resources
+            if str(resource.ID) in item.beamlines_by_pass_id
+        ]
         saf_list.append(
             SafetyForm(
                 saf_id=str(saf.SAF_ID),
                 status=saf.Status,
-                instruments=list(set(saf_beamline_list)),
+                instruments=sorted(set(saf_beamline_list)),
             )
         )
 
-    # Get the beamlines for this proposal and add them
-    for resource in pass_proposal.Resources:
-        beamline = await beamline_service.beamline_by_pass_id(str(resource.ID))
-        if beamline:
-            beamline_list.append(beamline.name)
+    beamline_list = [
+        item.beamlines_by_pass_id[str(resource.ID)]
+        for resource in pass_proposal.Resources
+        if str(resource.ID) in item.beamlines_by_pass_id
+    ]
 
     pi_found_in_experimenters = False
 
     # Get the users for this proposal
     for user in pass_proposal.Experimenters:
         user_is_pi = False
-        bnl_username = None
 
         if pass_proposal.PI is None:
             logger.warning(f"Proposal {proposal_id} does not have a PI.")
@@ -286,23 +409,13 @@ async def synchronize_proposal_from_pass(
             if str(pass_proposal.PI.BNL_ID).casefold() == str(user.BNL_ID).casefold():
                 user_is_pi = True
                 pi_found_in_experimenters = True
-        try:
-            logger.debug(
-                f"Looking up username for employee/life number = {user.BNL_ID}"
-            )
-            bnl_username = await bnlpeople_service.get_username_by_id(user.BNL_ID)
-            logger.debug(f"     ---> {bnl_username}")
-        except HTTPStatusError as error:
-            logger.error(f"Could not find BNL username for BNL ID '{user.BNL_ID}'.")
-            logger.error(f"BNL People API returned: {error}")
-            bnl_username = None
 
         userinfo = User(
             first_name=user.First_Name,
             last_name=user.Last_Name,
             email=user.Email,
             bnl_id=user.BNL_ID,
-            username=bnl_username,
+            username=item.usernames_by_bnl_id.get(user.BNL_ID),
             is_pi=user_is_pi,
             orcid=user.ORCID_ID,
         )
@@ -311,15 +424,12 @@ async def synchronize_proposal_from_pass(
     # Let's add the PI explicitly anyway as PASS sometimes includes the PI in the
     # Experimenters list and sometimes not.
     if pass_proposal.PI and not pi_found_in_experimenters:
-        bnl_username = await bnlpeople_service.get_username_by_id(
-            pass_proposal.PI.BNL_ID
-        )
         pi_info = User(
             first_name=pass_proposal.PI.First_Name,
             last_name=pass_proposal.PI.Last_Name,
             email=pass_proposal.PI.Email,
             bnl_id=pass_proposal.PI.BNL_ID,
-            username=bnl_username,
+            username=item.usernames_by_bnl_id.get(pass_proposal.PI.BNL_ID),
             is_pi=True,
         )
         user_list.append(pi_info)
@@ -332,29 +442,325 @@ async def synchronize_proposal_from_pass(
         data_session=data_session,
         pass_type_id=str(pass_proposal.Proposal_Type_ID),
         type=pass_proposal.Proposal_Type_Description,
-        instruments=list(set(beamline_list)),
+        instruments=sorted(set(beamline_list)),
         safs=saf_list,
         users=user_list,
         last_updated=datetime.datetime.now(),
     )
+    proposal.content_hash = proposal_service.proposal_content_hash(proposal)
+
+    item.proposal = proposal
+    return item
+
+
+async def build_proposal_from_pass(
+    proposal_id: str, facility_name: FacilityName = FacilityName.nsls2
+) -> Proposal:
+    """
+    Build a Proposal document from the information held in PASS.
+
+    This function runs the fetch, enrich and transform stages for a single proposal
+    and returns the (unsaved) Proposal along with its content fingerprint.
+
+    :param proposal_id: The PASS proposal ID to build.
+    :type proposal_id: str
+    :param facility_name: The facility name (FacilityName) to use for synchronization.
+    :type facility_name: FacilityName
+    :return: The Proposal built from PASS.
+    :rtype: Proposal
+    """
+    item = ProposalSyncItem(proposal_id=str(proposal_id), facility_name=facility_name)
+    item = await fetch_proposal_from_pass(item)
+    item = await enrich_proposal(item)
+    item = await transform_proposal(item)
+    return item.proposal
+
+
+class ProposalBulkWriter:
+    """
+    Buffers synchronized proposals and writes them to the database in batches.
+
+    Each flush uses a single query to fetch the stored content fingerprints for the
+    buffered proposals and a single unordered `bulk_write` of upserts for those that
+    have changed. Write errors are mapped back to the proposal IDs they belong to,
+    and if the database can't be reached at all, every proposal in the batch is
+    recorded as failed.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.sync_write_batch_size,
+        on_flush: Optional[Callable[[list[str]], Awaitable[None]]] = None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.counts = ProposalSyncCounts()
+        self.failed: dict[str, str] = {}
+        self.on_flush = on_flush
+        self._buffer: dict[str, Proposal] = {}
+
+    async def __aenter__(self) -> "ProposalBulkWriter":
+        return self
 
-    response = await Proposal.find_one(Proposal.proposal_id == str(proposal_id)).upsert(
-        Set(
-            {
-                Proposal.title: pass_proposal.Title,
-                Proposal.data_session: data_session,
-                Proposal.pass_type_id: str(pass_proposal.Proposal_Type_ID),
-                Proposal.type: pass_proposal.Proposal_Type_Description,
-                Proposal.instruments: beamline_list,
-                Proposal.safs: saf_list,
-                Proposal.users: user_list,
-                Proposal.last_updated: datetime.datetime.now(),
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.flush()
+
+    async def add(self, proposal: Proposal) -> None:
+        # If the same proposal is added twice before a flush, the latest version wins
+        self._buffer[proposal.proposal_id] = proposal
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+
+        batch = self._buffer
+        self._buffer = {}
+
+        try:
+            await self._write(batch)
+        except Exception as error:
+            # Account for every buffered proposal, not just the one whose addition
+            # happened to trigger the flush
+            self._record_failures(list(batch.keys()), error)
+
+        # Let the caller know which proposals have been dealt with (written, unchanged or failed)
+        if self.on_flush is not None:
+            await self.on_flush(list(batch.keys()))
+
+    def _record_failures(self, proposal_ids: list[str], error: Exception) -> None:
+        for proposal_id in proposal_ids:
+            self.failed[proposal_id] = str(error)
+        logger.error(f"Failed to write {len(proposal_ids)} proposals: {error}")
+
+    async def _write(self, batch: dict[str, Proposal]) -> None:
+        # The counts are only recorded once the outcome of every proposal in the batch
+        # is known, so if this raises, none of the batch has been accounted for
+        try:
+            stored_hashes = {
+                p.proposal_id: p.content_hash
+                for p in await Proposal.find(
+                    In(Proposal.proposal_id, list(batch.keys())),
+                    projection_model=ProposalContentHashView,
+                ).to_list()
             }
-        ),
-        on_insert=proposal,
-        response_type=UpdateResponse.UPDATE_RESULT,
+        except PyMongoError as error:
+            self._record_failures(list(batch.keys()), error)
+            return
+
+        changed_ids = [
+            proposal_id
+            for proposal_id, proposal in batch.items()
+            if stored_hashes.get(proposal_id, "") != proposal.content_hash
+        ]
+        operations = [
+            _proposal_upsert_operation(batch[proposal_id])
+            for proposal_id in changed_ids
+        ]
+
+        written = len(operations)
+        if operations:
+            try:
+                await Proposal.get_motor_collection().bulk_write(
+                    operations, ordered=False
+                )
+            except BulkWriteError as error:
+                for write_error in error.details.get("writeErrors", []):
+                    proposal_id = changed_ids[write_error["index"]]
+                    self.failed[proposal_id] = write_error.get(
+                        "errmsg", str(write_error)
+                    )
+                    logger.error(
+                        f"Failed to write proposal {proposal_id}: {self.failed[proposal_id]}"
+                    )
+                    written -= 1
+            except PyMongoError as error:
+                # Nothing is known to have been written, e.g. the connection was lost
+                self._record_failures(changed_ids, error)
+                written = 0
+
+        for _ in range(len(batch) - len(changed_ids)):
+            self.counts.record(changed=False)
+        for _ in range(written):
+            self.counts.record(changed=True)
+
+        logger.debug(f"Wrote {written} of {len(batch)} buffered proposals.")
+
+
+def _proposal_upsert_operation(proposal: Proposal) -> UpdateOne:
+    now = datetime.datetime.now()
+    return UpdateOne(
+        {"proposal_id": proposal.proposal_id},
+        {
+            "$set": {
+                **proposal.model_dump(
+                    include={
+                        "title",
+                        "data_session",
+                        "pass_type_id",
+                        "type",
+                        "instruments",
+                        "safs",
+                        "users",
+                        "content_hash",
+                    }
+                ),
+                "last_updated": now,
+            },
+            "$setOnInsert": {
+                **proposal.model_dump(
+                    include={"proposal_id", "cycles", "slack_channels", "locked"}
+                ),
+                "created_on": now,
+            },
+        },
+        upsert=True,
+    )
+
+
+async def synchronize_proposal_from_pass(
+    proposal_id: str, facility_name: FacilityName = FacilityName.nsls2
+) -> bool:
+    """
+    Synchronize a proposal from PASS into the local database.
+
+    The proposal document is only written (and `last_updated` bumped) when the
+    content fingerprint differs from the one already stored.
+
+    :param proposal_id: The PASS proposal ID to synchronize.
+    :type proposal_id: str
+    :param facility_name: The facility name (FacilityName) to use for synchronization.
+    :type facility_name: FacilityName
+    :return: True if the proposal was inserted or updated, False if it was unchanged.
+    :rtype: bool
+    """
+    proposal = await build_proposal_from_pass(proposal_id, facility_name)
+
+    async with ProposalBulkWriter(batch_size=1) as writer:
+        await writer.add(proposal)
+
+    if writer.failed:
+        raise Exception(
+            f"Error writing proposal {proposal_id}: {writer.failed[proposal.proposal_id]}"
+        )
+
+    return writer.counts.changed > 0
+
+
+@dataclass
+class ProposalSyncProgress:
+    """
+    Running state of a multi-proposal synchronization, reported as batches complete.
+
+    `remaining` holds the IDs of the proposals that have not yet been written (or
+    failed), which is everything a resumed synchronization still needs to do.
+    """
+
+    total: int
+    remaining: set[str]
+    failed: dict[str, str] = field(default_factory=dict)
+    stages: list[StageMetrics] = field(default_factory=list)
+    # Set for the final report, once everything has been written
+    finished: bool = False
+
+    @property
+    def done(self) -> int:
+        return self.total - len(self.remaining)
+
+
+@dataclass
+class ProposalSyncResult:
+    counts: ProposalSyncCounts
+    failed: dict[str, str]
+    stages: list[StageMetrics]
+    elapsed_seconds: float
+
+
+async def synchronize_proposals_from_pass(
+    items: Iterable[ProposalSyncItem],
+    fetch_concurrency: int = settings.sync_fetch_concurrency,
+    enrich_concurrency: int = settings.sync_enrich_concurrency,
+    transform_concurrency: int = settings.sync_transform_concurrency,
+    queue_size: int = settings.sync_queue_size,
+    write_batch_size: int = settings.sync_write_batch_size,
+    on_progress: Optional[Callable[[ProposalSyncProgress], Awaitable[None]]] = None,
+) -> ProposalSyncResult:
+    """
+    Synchronize many proposals from PASS using a staged streaming pipeline.
+
+    The fetch, enrich, transform and write stages run concurrently, connected by
+    bounded queues, so the overall time approaches that of the slowest stage.  A
+    proposal that fails in any stage is reported in the result without stopping
+    the others.
+
+    :param items: The proposals to synchronize.
+    :param on_progress: Optional callback, awaited whenever a batch has been written
+        or a proposal has failed (and once more when finished), e.g. to checkpoint a
+        long-running job.
+    :return: The outcome of the synchronization along with per-stage metrics.
+    :rtype: ProposalSyncResult
+    """
+    items = list(items)
+    progress = ProposalSyncProgress(
+        total=len(items), remaining={item.proposal_id for item in items}
+    )
+
+    async def report_progress():
+        progress.stages = pipeline.metrics
+        if on_progress is not None:
+            await on_progress(progress)
+
+    async def batch_flushed(proposal_ids: list[str]):
+        progress.remaining.difference_update(proposal_ids)
+        progress.failed.update(writer.failed)
+        await report_progress()
+
+    async def item_failed(item: ProposalSyncItem, error: Exception):
+        progress.remaining.discard(item.proposal_id)
+        progress.failed[item.proposal_id] = str(error)
+        await report_progress()
+
+    writer = ProposalBulkWriter(batch_size=write_batch_size, on_flush=batch_flushed)
+
+    async def write(item: ProposalSyncItem) -> ProposalSyncItem:
+        await writer.add(item.proposal)
+        return item
+
+    pipeline = StagedPipeline(
+        [
+            Stage("fetch", fetch_proposal_from_pass, fetch_concurrency),
+            Stage("enrich", enrich_proposal, enrich_concurrency),
+            Stage("transform", transform_proposal, transform_concurrency),
+            Stage("write", write, 1),
+        ],
+        queue_size=queue_size,
+        key=lambda item: item.proposal_id,
+        on_failure=item_failed,
+    )
+
+    result = await pipeline.run(items)
+
+    # Whatever is left in the buffer still needs to be written
+    flush_start = time.perf_counter()
+    await writer.flush()
+    write_metrics = result.stages[-1]
+    write_metrics.busy_seconds += time.perf_counter() - flush_start
+
+    failed = {str(key): str(error) for key, error in result.failures.items()}
+    failed.update(writer.failed)
+    progress.failed.update(failed)
+    progress.finished = True
+    await report_progress()
+
+    for stage_metrics in result.stages:
+        logger.info(f"Proposal sync stage {stage_metrics}")
+
+    return ProposalSyncResult(
+        counts=writer.counts,
+        failed=failed,
+        stages=result.stages,
+        elapsed_seconds=result.elapsed_seconds,
     )
-    logger.debug(f"Response: {response}")
 
 
 async def update_proposals_with_cycle(
@@ -397,52 +803,258 @@ async def worker_synchronize_proposal_from_pass(
 ) -> None:
     start_time = datetime.datetime.now()
 
-    await synchronize_proposal_from_pass(proposal_id, facility)
+    changed = await synchronize_proposal_from_pass(proposal_id, facility)
 
     time_taken = datetime.datetime.now() - start_time
     logger.info(
-        f"Proposal {proposal_id} synchronized in {time_taken.total_seconds():,.0f} seconds"
+        f"Proposal {proposal_id} synchronized in {time_taken.total_seconds():,.0f} seconds "
+        f"({'changed' if changed else 'unchanged'})"
     )
 
 
 async def worker_synchronize_proposals_for_cycle_from_pass(
-    cycle: str, facility_name: FacilityName = FacilityName.nsls2
+    cycle: str,
+    facility_name: FacilityName = FacilityName.nsls2,
+    remaining_proposal_ids: Optional[list[str]] = None,
+    previously_failed: Optional[dict[str, str]] = None,
+    on_progress: Optional[Callable[[ProposalSyncProgress], Awaitable[None]]] = None,
 ) -> None:
+    """
+    Synchronize all the proposals (and commissioning proposals) for a cycle from PASS.
+
+    :param cycle: The name of the cycle.
+    :param facility_name: The facility the cycle belongs to.
+    :param remaining_proposal_ids: When resuming an interrupted synchronization, the
+        proposals that were still to be synchronized.  If None, the proposals for the
+        cycle are looked up and all of them are synchronized.
+    :param previously_failed: When resuming, the proposals that had already failed.
+    :param on_progress: Optional callback used to checkpoint progress.
+    """
     start_time = datetime.datetime.now()
 
-    cycle_year = await facility_service.cycle_year(cycle, facility_name=facility_name)
+    if remaining_proposal_ids is None:
+        cycle_year = await facility_service.cycle_year(
+            cycle, facility_name=facility_name
+        )
+
+        proposals = await proposal_service.fetch_proposals_for_cycle(
+            cycle, facility_name=facility_name
+        )
+        logger.info(
+            f"Synchronizing {len(proposals)} proposals for facility {facility_name} in {cycle} cycle."
+        )
+
+        commissioning_proposals: list[
+            PassProposal
+        ] = await pass_service.get_commissioning_proposals_by_year(
+            cycle_year, facility_name=facility_name
+        )
+        logger.info(
+            f"Synchronizing {len(commissioning_proposals)} commissioning proposals for the year {cycle_year}."
+        )
+
+        proposal_ids = [str(proposal_id) for proposal_id in proposals]
+        proposal_ids += [
+            str(proposal.Proposal_ID) for proposal in commissioning_proposals
+        ]
+    else:
+        proposal_ids = remaining_proposal_ids
+        logger.info(
+            f"Resuming synchronization of {len(proposal_ids)} remaining proposals for facility {facility_name} in {cycle} cycle."
+        )
+
+    items = [
+        ProposalSyncItem(proposal_id=proposal_id, facility_name=facility_name)
+        for proposal_id in dict.fromkeys(proposal_ids)
+    ]
+
+    async def report_progress(progress: ProposalSyncProgress):
+        if previously_failed:
+            progress.failed = {**previously_failed, **progress.failed}
+        if on_progress is not None:
+            await on_progress(progress)
 
-    proposals = await proposal_service.fetch_proposals_for_cycle(
-        cycle, facility_name=facility_name
+    sync_result = await synchronize_proposals_from_pass(
+        items, on_progress=report_progress
     )
+    failed = {**(previously_failed or {}), **sync_result.failed}
+
+    # Now update the cycle information for each proposal
+    await update_proposals_with_cycle(cycle, facility_name=facility_name)
+
+    time_taken = datetime.datetime.now() - start_time
     logger.info(
-        f"Synchronizing {len(proposals)} proposals for facility {facility_name} in {cycle} cycle."
+        f"Proposals for the {cycle} cycle synchronized in {time_taken.total_seconds():,.0f} seconds ({sync_result.counts})"
     )
 
-    for proposal_id in proposals:
-        logger.info(f"Synchronizing proposal {proposal_id}.")
-        await synchronize_proposal_from_pass(proposal_id, facility_name)
+    if failed:
+        raise Exception(
+            f"Failed to synchronize {len(failed)} proposals for the {cycle} cycle: {failed}"
+        )
+
+
+def allocation_hashes(allocations: Iterable[PassAllocation]) -> dict[str, str]:
+    """
+    Fingerprint the PASS allocations of each proposal.
+
+    A proposal can have several allocations (e.g. one per cycle), so all of the
+    allocations for a proposal are combined into one order-independent fingerprint.
+
+    :param allocations: The allocations returned by PASS.
+    :return: A mapping of proposal ID to allocation fingerprint.
+    """
+    allocations_by_proposal: dict[str, set[str]] = {}
+    for allocation in allocations:
+        if allocation.Proposal_ID is None:
+            continue
+        allocations_by_proposal.setdefault(str(allocation.Proposal_ID), set()).add(
+            allocation.model_dump_json()
+        )
+
+    return {
+        proposal_id: hashlib.sha256(
+            "\n".join(sorted(serialized)).encode("utf-8")
+        ).hexdigest()
+        for proposal_id, serialized in allocations_by_proposal.items()
+    }
+
+
+async def add_proposals_to_cycle(
+    cycle_name: str,
+    proposal_ids: list[str],
+    facility_name: FacilityName = FacilityName.nsls2,
+) -> None:
+    """
+    Record that the given proposals belong to a cycle (on both the cycle and the proposals).
+
+    :param cycle_name: The name of the cycle.
+    :param proposal_ids: The IDs of the proposals allocated to the cycle.
+    :param facility_name: The facility the cycle belongs to.
+    """
+    if not proposal_ids:
+        return
 
-    commissioning_proposals: list[
-        PassProposal
-    ] = await pass_service.get_commissioning_proposals_by_year(
-        cycle_year, facility_name=facility_name
+    now = datetime.datetime.now()
+    await Cycle.find_one(
+        Cycle.name == cycle_name, Cycle.facility == facility_name
+    ).update(
+        AddToSet({Cycle.proposals: {"$each": proposal_ids}}),
+        Set({Cycle.last_updated: now}),
+    )
+    # Only touch the proposals that don't already know about this cycle
+    await Proposal.find(
+        In(Proposal.proposal_id, proposal_ids), Proposal.cycles != cycle_name
+    ).update(
+        AddToSet({Proposal.cycles: cycle_name}),
+        Set({Proposal.last_updated: now}),
     )
+
+
+async def worker_synchronize_proposals_incremental_from_pass(
+    facility_name: FacilityName = FacilityName.nsls2,
+    on_progress: Optional[Callable[[ProposalSyncProgress], Awaitable[None]]] = None,
+) -> None:
+    """
+    Synchronize only the proposals whose PASS allocations are new or have changed.
+
+    The allocation fingerprints from the previous run are kept in a ProposalSyncState
+    document for the facility.  Proposals that fail to synchronize keep their old
+    fingerprint so that they are picked up again on the next run.
+
+    :param facility_name: The facility to synchronize.
+    :param on_progress: Optional callback used to report progress.
+    """
+    start_time = datetime.datetime.now()
+
+    state = await ProposalSyncState.find_one(
+        ProposalSyncState.facility == facility_name,
+        ProposalSyncState.sync_source == JobSyncSource.PASS,
+    )
+    if state is None:
+        state = ProposalSyncState(
+            facility=facility_name, sync_source=JobSyncSource.PASS
+        )
+    state.last_run_started = start_time
+
+    try:
+        allocations = await pass_service.get_proposals_allocated(facility_name)
+        current_cycle = await facility_service.current_operating_cycle(facility_name)
+        current_cycle_allocations = []
+        if current_cycle:
+            current_cycle_allocations = (
+                await pass_service.get_proposals_allocated_by_cycle(
+                    current_cycle, facility=facility_name
+                )
+            )
+    except pass_service.PassException as error:
+        error_message = (
+            f"Error retrieving allocations from PASS for {facility_name} facility."
+        )
+        logger.exception(error_message)
+        raise Exception(error_message) from error
+
+    current_hashes = allocation_hashes(allocations + current_cycle_allocations)
+    changed_proposal_ids = [
+        proposal_id
+        for proposal_id, allocation_hash in current_hashes.items()
+        if state.allocation_hashes.get(proposal_id) != allocation_hash
+    ]
     logger.info(
-        f"Synchronizing {len(proposals)} commissioning proposals for the year {cycle_year}."
+        f"{len(changed_proposal_ids):,} of {len(current_hashes):,} allocated proposals "
+        f"for {facility_name} are new or have changed since {state.last_successful_run}."
     )
-    for proposal in commissioning_proposals:
-        logger.info(f"Synchronizing commissioning proposal {proposal.Proposal_ID}.")
-        await synchronize_proposal_from_pass(str(proposal.Proposal_ID), facility_name)
 
-    # Now update the cycle information for each proposal
-    await update_proposals_with_cycle(cycle, facility_name=facility_name)
+    sync_result = await synchronize_proposals_from_pass(
+        (
+            ProposalSyncItem(proposal_id=proposal_id, facility_name=facility_name)
+            for proposal_id in changed_proposal_ids
+        ),
+        on_progress=on_progress,
+    )
+
+    if current_cycle:
+        current_cycle_proposal_ids = {
+            str(allocation.Proposal_ID)
+            for allocation in current_cycle_allocations
+            if allocation.Proposal_ID is not None
+        }
+        await add_proposals_to_cycle(
+            current_cycle,
+            [
+                proposal_id
+                for proposal_id in changed_proposal_ids
+                if proposal_id in current_cycle_proposal_ids
+                and proposal_id not in sync_result.failed
+            ],
+            facility_name=facility_name,
+        )
+
+    # Failed proposals keep their previous fingerprint (if any) so they are retried next time
+    new_hashes = {
+        proposal_id: allocation_hash
+        for proposal_id, allocation_hash in current_hashes.items()
+        if proposal_id not in sync_result.failed
+    }
+    for proposal_id in sync_result.failed:
+        if proposal_id in state.allocation_hashes:
+            new_hashes[proposal_id] = state.allocation_hashes[proposal_id]
+
+    state.allocation_hashes = new_hashes
+    state.last_successful_run = start_time
+    state.last_updated = datetime.datetime.now()
+    await state.save()
 
     time_taken = datetime.datetime.now() - start_time
     logger.info(
-        f"Proposals for the {cycle} cycle synchronized in {time_taken.total_seconds():,.0f} seconds"
+        f"Incremental proposal synchronization (for {facility_name}) completed in "
+        f"{time_taken.total_seconds():,.2f} seconds ({sync_result.counts}, {len(sync_result.failed):,} failed)"
     )
 
+    if sync_result.failed:
+        raise Exception(
+            f"Failed to synchronize {len(sync_result.failed)} proposals: {sync_result.failed}"
+        )
+
 
 async def worker_update_proposal_to_cycle_mapping(
     facility: FacilityName = FacilityName.nsls2,
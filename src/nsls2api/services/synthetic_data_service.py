@@ -0,0 +1,369 @@
+import datetime
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from faker import Faker
+
+from nsls2api.api.models.facility_model import FacilityName
+from nsls2api.api.models.proposal_model import SyntheticDatasetSummary
+from nsls2api.devtools.synthetic_ids import (
+    FIRST_SYNTHETIC_PROPOSAL_ID,
+    synthetic_beamline_name,
+    synthetic_beamline_pass_id,
+)
+from nsls2api.infrastructure.config import get_settings
+from nsls2api.infrastructure.logging import logger
+from nsls2api.models.beamlines import Beamline, ServiceAccounts
+from nsls2api.models.cycles import Cycle
+from nsls2api.models.jobs import JobSyncParameters
+from nsls2api.models.proposals import Proposal, SafetyForm, User
+from nsls2api.services.proposal_service import generate_data_session_for_proposal
+
+# (PASS type ID, description, share of the non-commissioning proposals)
+PROPOSAL_TYPES = [
+    ("300001", "General User", 0.6),
+    ("300003", "Partner User", 0.15),
+    ("300004", "Rapid Access", 0.2),
+    ("300006", "Block Allocation Group", 0.05),
+]
+COMMISSIONING_PROPOSAL_TYPE = ("300005", "Beamline Commissioning (beamline staff only)")
+
+SAF_STATUSES = ["APPROVED", "APPROVED", "APPROVED", "PENDING", "EXPIRED"]
+
+# Titles and people are generated up front and reused, as Faker is comparatively slow
+_TITLE_POOL_SIZE = 2000
+
+# The most proposals that can be generated through the API (the CLI has no limit)
+MAX_API_PROPOSALS = 100_000
+
+settings = get_settings()
+
+
+class SyntheticDatasetError(Exception):
+    pass
+
+
+@dataclass
+class SyntheticDatasetSpec:
+    """
+    What to generate.  The defaults give a rough approximation of the real data:
+    most proposals have a handful of users (with a long tail of large teams), use one
+    beamline, run for one cycle and have a SAF or two.
+
+    :param proposals: The number of proposals to create.
+    :param first_proposal_id: The first proposal ID; IDs are consecutive from here.
+    :param facility: The facility the proposals and cycles belong to.
+    :param first_year: The first year of cycles the proposals are spread over.
+    :param years: The number of years of cycles (three cycles per year).
+    :param beamlines: The number of (synthetic) beamlines the proposals are spread over.
+    :param people: The number of distinct people the users are drawn from.
+    :param mean_users: The average number of users on a proposal.
+    :param max_users: The most users on a proposal.
+    :param max_safs: The most SAFs on a proposal.
+    :param commissioning_share: The fraction of proposals that are commissioning proposals.
+    :param batch_size: The number of proposals inserted at a time.
+    :param seed: Seed for the random data, for repeatable datasets.
+    """
+
+    proposals: int
+    first_proposal_id: int = FIRST_SYNTHETIC_PROPOSAL_ID
+    facility: FacilityName = FacilityName.nsls2
+    first_year: int = 2020
+    years: int = 5
+    beamlines: int = 30
+    people: int = 20000
+    mean_users: float = 5.0
+    max_users: int = 40
+    max_safs: int = 3
+    commissioning_share: float = 0.1
+    batch_size: int = 1000
+    seed: Optional[int] = None
+
+
+def _skewed_index(rng: random.Random, size: int) -> int:
+    # Small indexes are picked much more often, as some people/beamlines are far
+    # busier than others
+    return min(size - 1, int(size * rng.random() ** 2))
+
+
+class _DatasetGenerator:
+    def __init__(self, spec: SyntheticDatasetSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        fake = Faker()
+        fake.seed_instance(spec.seed)
+
+        self.people = [
+            User(
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                email=f"synthetic.user{index}@example.com",
+                bnl_id=f"S{index:07d}",
+                # Not everybody has a BNL account
+                username=f"synuser{index:06d}" if self.rng.random() < 0.85 else None,
+            )
+            for index in range(spec.people)
+        ]
+        self.titles = [fake.sentence(nb_words=8) for _ in range(_TITLE_POOL_SIZE)]
+        self.beamline_names = [
+            synthetic_beamline_name(index) for index in range(spec.beamlines)
+        ]
+        self.cycle_names = [
+            f"{year}-{run}"
+            for year in range(spec.first_year, spec.first_year + spec.years)
+            for run in (1, 2, 3)
+        ]
+        self.proposals_by_cycle: dict[str, list[str]] = {
+            name: [] for name in self.cycle_names
+        }
+
+    def _users(self) -> list[User]:
+        rng = self.rng
+        count = 1 + int(rng.expovariate(1 / max(0.1, self.spec.mean_users - 1)))
+        count = min(count, self.spec.max_users, self.spec.people)
+        indexes = set()
+        while len(indexes) < count:
+            indexes.add(_skewed_index(rng, self.spec.people))
+        users = [self.people[index].model_copy() for index in indexes]
+        pi = rng.choice([user for user in users if user.username] or users)
+        pi.is_pi = True
+        return users
+
+    def _instruments(self) -> list[str]:
+        draw = self.rng.random()
+        count = 1 if draw < 0.8 else 2 if draw < 0.95 else 3
+        count = min(count, len(self.beamline_names))
+        instruments = set()
+        while len(instruments) < count:
+            instruments.add(
+                self.beamline_names[_skewed_index(self.rng, len(self.beamline_names))]
+            )
+        return sorted(instruments)
+
+    def _cycles(self) -> list[str]:
+        index = self.rng.randrange(len(self.cycle_names))
+        # Some proposals carry on into the next cycle
+        if self.rng.random() < 0.2 and index + 1 < len(self.cycle_names):
+            return self.cycle_names[index : index + 2]
+        return [self.cycle_names[index]]
+
+    def proposal(self, proposal_id: int, now: datetime.datetime) -> Proposal:
+        rng = self.rng
+        proposal_id = str(proposal_id)
+        instruments = self._instruments()
+
+        if rng.random() < self.spec.commissioning_share:
+            pass_type_id, proposal_type = COMMISSIONING_PROPOSAL_TYPE
+            cycles = []
+        else:
+            pass_type_id, proposal_type, _ = rng.choices(
+                PROPOSAL_TYPES, weights=[share for *_, share in PROPOSAL_TYPES]
+            )[0]
+            cycles = self._cycles()
+            for cycle in cycles:
+                self.proposals_by_cycle[cycle].append(proposal_id)
+
+        safs = [
+            SafetyForm(
+                saf_id=f"{proposal_id}{index}",
+                status=rng.choice(SAF_STATUSES),
+                instruments=instruments,
+            )
+            for index in range(rng.randint(0, self.spec.max_safs))
+        ]
+
+        return Proposal(
+            proposal_id=proposal_id,
+            title=rng.choice(self.titles),
+            type=proposal_type,
+            pass_type_id=pass_type_id,
+            data_session=generate_data_session_for_proposal(proposal_id),
+            instruments=instruments,
+            cycles=cycles,
+            users=self._users(),
+            safs=safs,
+            created_on=now,
+            last_updated=now,
+        )
+
+
+async def _create_missing_beamlines(names: list[str]) -> int:
+    existing = {
+        beamline.name
+        for beamline in await Beamline.find({"name": {"$in": names}}).to_list()
+    }
+    missing = [
+        Beamline(
+            name=name,
+            long_name=f"Synthetic Beamline {name}",
+            alternative_name=name,
+            port=name,
+            pass_name=f"Synthetic Beamline {name}",
+            pass_id=str(synthetic_beamline_pass_id(index)),
+            service_accounts=ServiceAccounts(
+                ioc=f"softioc-{name.lower()}",
+                workflow=f"workflow-{name.lower()}",
+                bluesky=f"bluesky-{name.lower()}",
+                epics_services=f"epics-services-{name.lower()}",
+                operator=f"xf{name.lower()}",
+            ),
+        )
+        for index, name in enumerate(names)
+        if name not in existing
+    ]
+    if missing:
+        await Beamline.insert_many(missing)
+    return len(missing)
+
+
+async def _add_proposals_to_cycles(
+    facility: FacilityName, proposals_by_cycle: dict[str, list[str]]
+) -> int:
+    existing = {
+        cycle.name
+        for cycle in await Cycle.find(
+            Cycle.facility == facility,
+            {"name": {"$in": list(proposals_by_cycle)}},
+        ).to_list()
+    }
+    missing = []
+    for name in proposals_by_cycle:
+        if name in existing:
+            continue
+        year, run = (int(part) for part in name.split("-"))
+        start_month = 1 + (run - 1) * 4
+        missing.append(
+            Cycle(
+                name=name,
+                facility=facility,
+                year=str(year),
+                start_date=datetime.datetime(year, start_month, 1),
+                end_date=datetime.datetime(year, start_month + 3, 28),
+                pass_description=f"{year} Cycle {run}",
+                pass_id=None,
+            )
+        )
+    if missing:
+        await Cycle.insert_many(missing)
+
+    for name, proposal_ids in proposals_by_cycle.items():
+        if proposal_ids:
+            await Cycle.find(Cycle.name == name, Cycle.facility == facility).update(
+                {"$addToSet": {"proposals": {"$each": proposal_ids}}}
+            )
+    return len(missing)
+
+
+def check_synthetic_data_allowed() -> None:
+    """
+    :raises SyntheticDatasetError: If the allow_synthetic_data setting is off, as it
+        should be for any database that isn't only for development or testing.
+    """
+    if not settings.allow_synthetic_data:
+        raise SyntheticDatasetError(
+            "Synthetic data can't be generated here (allow_synthetic_data is off)."
+        )
+
+
+async def check_synthetic_dataset(spec: SyntheticDatasetSpec) -> None:
+    """
+    Check that the proposal IDs for a dataset are valid and unused, with a single
+    query.
+
+    :raises SyntheticDatasetError: If the dataset can't be generated.
+    """
+    last_proposal_id = spec.first_proposal_id + spec.proposals - 1
+    if len(str(spec.first_proposal_id)) != len(str(last_proposal_id)):
+        raise SyntheticDatasetError(
+            "The synthetic proposal IDs must all have the same number of digits."
+        )
+
+    # Same-length numeric strings compare in numeric order
+    clashes = await Proposal.find(
+        Proposal.proposal_id >= str(spec.first_proposal_id),
+        Proposal.proposal_id <= str(last_proposal_id),
+    ).count()
+    if clashes:
+        raise SyntheticDatasetError(
+            f"{clashes} proposal(s) already exist with IDs between "
+            f"{spec.first_proposal_id} and {last_proposal_id}."
+        )
+
+
+async def generate_synthetic_dataset(
+    spec: SyntheticDatasetSpec,
+) -> SyntheticDatasetSummary:
+    """
+    Bulk-create synthetic proposals, along with the cycles and beamlines they refer
+    to, for load testing and benchmarking.
+
+    The proposal IDs are consecutive, starting at `spec.first_proposal_id`, and are
+    checked to be unused (see `check_synthetic_dataset`) before anything is written.
+    """
+    start_time = time.perf_counter()
+    await check_synthetic_dataset(spec)
+    last_proposal_id = spec.first_proposal_id + spec.proposals - 1
+
+    generator = _DatasetGenerator(spec)
+    beamlines_created = await _create_missing_beamlines(generator.beamline_names)
+
+    now = datetime.datetime.now()
+    batch = []
+    for proposal_id in range(spec.first_proposal_id, last_proposal_id + 1):
+        batch.append(generator.proposal(proposal_id, now))
+        if len(batch) >= spec.batch_size:
+            await Proposal.insert_many(batch)
+            batch = []
+    if batch:
+        await Proposal.insert_many(batch)
+
+    cycles_created = await _add_proposals_to_cycles(
+        spec.facility, generator.proposals_by_cycle
+    )
+
+    elapsed = time.perf_counter() - start_time
+    logger.info(
+        f"Generated {spec.proposals:,} synthetic proposals in {elapsed:,.2f} seconds "
+        f"({spec.proposals / elapsed if elapsed else 0:,.0f} proposals/s)."
+    )
+    return SyntheticDatasetSummary(
+        proposals_created=spec.proposals,
+        first_proposal_id=str(spec.first_proposal_id),
+        last_proposal_id=str(last_proposal_id),
+        cycles_created=cycles_created,
+        beamlines_created=beamlines_created,
+        elapsed_seconds=elapsed,
+    )
+
+
+def synthetic_dataset_spec(parameters: JobSyncParameters) -> SyntheticDatasetSpec:
+    """
+    The dataset requested by a generate_synthetic_dataset job.
+
+    :raises SyntheticDatasetError: If it asks for more than MAX_API_PROPOSALS.
+    """
+    if parameters.proposal_count is None or parameters.proposal_count < 1:
+        raise SyntheticDatasetError("At least one proposal must be generated.")
+    if parameters.proposal_count > MAX_API_PROPOSALS:
+        raise SyntheticDatasetError(
+            f"At most {MAX_API_PROPOSALS:,} proposals can be generated at a time."
+        )
+    spec = SyntheticDatasetSpec(
+        proposals=parameters.proposal_count, seed=parameters.seed
+    )
+    if parameters.first_proposal_id is not None:
+        spec.first_proposal_id = parameters.first_proposal_id
+    return spec
+
+
+async def worker_generate_synthetic_dataset(
+    parameters: JobSyncParameters,
+) -> SyntheticDatasetSummary:
+    """
+    Generate a synthetic dataset in a background job, refusing to if this deployment
+    doesn't allow synthetic data.
+    """
+    check_synthetic_data_allowed()
+    return await generate_synthetic_dataset(synthetic_dataset_spec(parameters))
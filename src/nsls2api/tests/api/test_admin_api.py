@@ -6,7 +6,8 @@ from nsls2api.api.models.proposal_model import (
     ProposalChangeResultsList,
 )
 from nsls2api.main import app
-from nsls2api.services import proposal_service
+from nsls2api.models.jobs import BackgroundJob, JobActions
+from nsls2api.services import proposal_service, synthetic_data_service
 
 test_proposal_id = "314159"
 
@@ -209,3 +210,37 @@ async def test_lock_and_unlock_cycles(admin_api_key):
         proposal_id=[test_proposal_id]
     )
     assert not proposal_objects[0].locked
+
+
+@pytest.mark.anyio
+async def test_generate_synthetic_dataset_queues_a_job(admin_api_key, monkeypatch):
+    headers = {"Authorization": admin_api_key["key"]}
+    params = {"proposals": 10, "first_proposal_id": 7100000, "seed": 1}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            "/v1/admin/proposal/generate-dataset", params=params, headers=headers
+        )
+        assert response.status_code == 200
+        job = BackgroundJob(**response.json())
+        assert job.action == JobActions.generate_synthetic_dataset
+        assert job.sync_parameters.proposal_count == 10
+        assert job.sync_parameters.first_proposal_id == 7100000
+
+        too_many = {"proposals": synthetic_data_service.MAX_API_PROPOSALS + 1}
+        response = await ac.post(
+            "/v1/admin/proposal/generate-dataset", params=too_many, headers=headers
+        )
+        assert response.status_code == 422
+
+        # Refused outright where synthetic data isn't allowed
+        monkeypatch.setattr(
+            synthetic_data_service.settings, "allow_synthetic_data", False
+        )
+        response = await ac.post(
+            "/v1/admin/proposal/generate-dataset", params=params, headers=headers
+        )
+        assert response.status_code == 403
+
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).delete()
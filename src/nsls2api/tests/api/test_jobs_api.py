@@ -0,0 +1,119 @@
+import pytest
+from beanie import PydanticObjectId
+from beanie.operators import In
+from httpx import ASGITransport, AsyncClient
+
+from nsls2api.api.models.job_model import JobStatusList, JobSubmissionResult
+from nsls2api.main import app
+from nsls2api.models.jobs import (
+    BackgroundJob,
+    JobActions,
+    JobStatus,
+    JobSyncParameters,
+)
+from nsls2api.services import background_service
+
+missing_job_id = "000000000000000000000000"
+
+
+@pytest.mark.anyio
+async def test_batch_submit_and_status(api_key):
+    submissions = [
+        {
+            "action": "synchronize_proposal",
+            "sync_parameters": {"proposal_id": proposal_id, "facility": "nsls2"},
+        }
+        for proposal_id in ["111111", "222222", "111111"]
+    ]
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            "/v1/sync/jobs", json=submissions, headers={"Authorization": api_key["key"]}
+        )
+        assert response.status_code == 200
+        job_ids = JobSubmissionResult(**response.json()).job_ids
+
+        # The duplicate submission is coalesced into the first job
+        assert len(job_ids) == 3
+        assert job_ids[0] == job_ids[2]
+        assert job_ids[0] != job_ids[1]
+
+        response = await ac.post("/v1/jobs/status", json=job_ids + [missing_job_id])
+        assert response.status_code == 200
+        statuses = JobStatusList(**response.json())
+
+    assert {job.job_id for job in statuses.jobs} == set(job_ids)
+    assert all(job.action == "synchronize_proposal" for job in statuses.jobs)
+    assert statuses.not_found == [missing_job_id]
+
+    await BackgroundJob.find(
+        In(BackgroundJob.id, [PydanticObjectId(job_id) for job_id in job_ids])
+    ).delete()
+
+
+@pytest.mark.anyio
+async def test_job_events_stream_until_jobs_finish():
+    job = await background_service.create_background_job(
+        JobActions.synchronize_proposal,
+        JobSyncParameters(proposal_id="333333", facility="nsls2"),
+    )
+    await background_service.start_job(job.id, "worker-1")
+    await background_service.complete_job(job.id, JobStatus.success)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get(
+            "/v1/jobs/events",
+            params={"job_id": [str(job.id), missing_job_id], "timeout": 5},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        line.removeprefix("event: ")
+        for line in response.text.splitlines()
+        if line.startswith("event: ")
+    ]
+    assert events == ["status", "not_found", "done"]
+
+    await job.delete()
+
+
+@pytest.mark.anyio
+async def test_malformed_job_id_is_rejected():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        for path in ["/v1/jobs/status/not-a-job", "/v1/jobs/check-status/not-a-job"]:
+            response = await ac.get(path)
+            assert response.status_code == 400, path
+
+        response = await ac.get(f"/v1/jobs/status/{missing_job_id}")
+        assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_batch_submit_rejects_other_actions_and_missing_parameters(api_key):
+    rejected = [
+        # Only synchronization jobs can be queued in a batch
+        {
+            "action": "generate_synthetic_dataset",
+            "sync_parameters": {"proposal_count": 10},
+        },
+        {"action": "create_slack_channel", "sync_parameters": {"proposal_id": "1"}},
+        # A proposal can't be synchronized without knowing which one
+        {"action": "synchronize_proposal", "sync_parameters": {"facility": "nsls2"}},
+        {"action": "synchronize_proposals_for_cycle"},
+    ]
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        for submission in rejected:
+            response = await ac.post(
+                "/v1/sync/jobs",
+                json=[submission],
+                headers={"Authorization": api_key["key"]},
+            )
+            assert response.status_code == 400, submission
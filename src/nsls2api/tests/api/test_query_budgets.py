@@ -0,0 +1,24 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from nsls2api.infrastructure.db_monitoring import query_budget
+from nsls2api.main import app
+
+
+@pytest.mark.anyio
+async def test_proposal_directories_query_budget():
+    # The test proposal has one beamline and one cycle, so one directory: one query
+    # for the proposal, then five for the beamline's details
+    with query_budget(6) as queries:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.get("/v1/proposal/314159/directories")
+    assert response.status_code == 200
+    assert response.json()["directory_count"] == 1
+
+    server_timing = response.headers.get_list("server-timing")
+    assert any(entry.startswith("total;") for entry in server_timing)
+    assert f'desc="{queries.count} queries"' in next(
+        entry for entry in server_timing if entry.startswith("db;")
+    )
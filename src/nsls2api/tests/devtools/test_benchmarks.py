@@ -0,0 +1,97 @@
+import dataclasses
+
+import pytest
+
+from nsls2api.devtools.benchmarks import (
+    BenchmarkRun,
+    CommandCounter,
+    Operation,
+    OperationResult,
+    compare,
+    measure,
+    percentile,
+)
+
+
+def _result(name: str, p95_ms: float, db_round_trips: float) -> OperationResult:
+    return OperationResult(
+        name=name,
+        iterations=10,
+        errors=0,
+        mean_ms=p95_ms,
+        min_ms=p95_ms,
+        p50_ms=p95_ms,
+        p90_ms=p95_ms,
+        p95_ms=p95_ms,
+        p99_ms=p95_ms,
+        max_ms=p95_ms,
+        db_round_trips=db_round_trips,
+    )
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.5) == 50.5
+    assert percentile(values, 0.0) == 1.0
+    assert percentile(values, 1.0) == 100.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_compare_flags_slowdowns_and_extra_round_trips(tmp_path):
+    baseline = BenchmarkRun(
+        started="2024-01-01T00:00:00",
+        commit="abc1234",
+        python="3.12.0",
+        iterations=10,
+        operations=[_result("fast", 10, 1), _result("chatty", 10, 2)],
+    )
+    path = tmp_path / "baseline.json"
+    baseline.save(path)
+
+    current = BenchmarkRun(
+        started="2024-01-02T00:00:00",
+        commit="def5678",
+        python="3.12.0",
+        iterations=10,
+        operations=[_result("fast", 10.5, 1), _result("chatty", 10, 12)],
+    )
+    comparisons = {c.name: c for c in compare(BenchmarkRun.load(path), current)}
+
+    assert not comparisons["fast"].is_regression(threshold_percent=10)
+    assert comparisons["chatty"].is_regression(threshold_percent=10)
+
+
+@pytest.mark.anyio
+async def test_failed_runs_are_counted_but_not_timed():
+    async def flaky(iteration: int):
+        if iteration % 2:
+            raise ConnectionError("database went away")
+
+    result = await measure(
+        Operation("flaky", flaky), CommandCounter(), iterations=10, warmup=0
+    )
+    assert result.errors == 5
+    assert result.failed and "database went away" in result.error
+    assert result.p50_ms is not None
+
+    async def broken(iteration: int):
+        raise ConnectionError("database went away")
+
+    result = await measure(Operation("broken", broken), CommandCounter(), iterations=3)
+    assert result.errors == 3
+    assert result.p50_ms is None and result.max_ms is None
+
+    # An operation that has started failing is a regression, however quick it is
+    baseline = BenchmarkRun(
+        "2024-01-01T00:00:00", None, "3.12.0", 3, [_result("broken", 10, 0)]
+    )
+    current = BenchmarkRun(
+        "2024-01-02T00:00:00",
+        None,
+        "3.12.0",
+        3,
+        [dataclasses.replace(result, db_round_trips=0)],
+    )
+    [comparison] = compare(baseline, current)
+    assert comparison.p95_change is None
+    assert comparison.is_regression(threshold_percent=10)
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import httpx
+import pytest
+
+from nsls2api.devtools.loadtest import (
+    HttpRequest,
+    LatencyHistogram,
+    builtin_scenarios,
+    load_http_environment,
+    parse_http_file,
+    replay_scenario,
+    run_load_test,
+)
+
+INTEGRATION_TESTS = Path(__file__).parents[4] / "integration-tests"
+
+SCENARIO = """
+@otherHost = https://api-dev.nsls2.bnl.gov
+
+### Check AMX Details
+# @name amx-details
+GET http://{{host}}/v1/beamline/amx
+Accept: application/json
+
+> {%
+    client.test("Request executed successfully", function () {
+        client.assert(response.status === 200, "Response status is not 200");
+    });
+%}
+
+### Check Non-existent Beamline Details
+# @name = zzz-details
+GET {{otherHost}}/v1/beamline/zzz?facility={{facility}}
+Accept: application/json
+
+> {%
+    client.assert(response.status === 404, "ZZZ should not exist!");
+%}
+
+### Create something
+POST http://{{host}}/v1/things
+Content-Type: application/json
+
+{"name": "{{facility}}"}
+"""
+
+
+def test_parse_http_file():
+    requests = parse_http_file(SCENARIO, "scenario", {"facility": "nsls2"})
+
+    assert [r.name for r in requests] == ["amx-details", "zzz-details", "scenario-3"]
+    assert [r.method for r in requests] == ["GET", "GET", "POST"]
+    # Whatever host they name, the requests go to the instance under test
+    assert [r.path for r in requests] == [
+        "/v1/beamline/amx",
+        "/v1/beamline/zzz?facility=nsls2",
+        "/v1/things",
+    ]
+    assert requests[0].headers == {"Accept": "application/json"}
+    assert requests[0].expected_status == 200
+    assert requests[1].expected_status == 404
+    assert requests[2].expected_status is None
+    assert requests[2].body == '{"name": "nsls2"}'
+
+    assert requests[1].succeeded(404) and not requests[1].succeeded(200)
+    assert requests[2].succeeded(201) and not requests[2].succeeded(500)
+
+
+def test_parse_integration_test_scenarios():
+    variables = load_http_environment(
+        INTEGRATION_TESTS / "http-client.env.json", "local"
+    )
+    for path in INTEGRATION_TESTS.glob("*.http"):
+        requests = parse_http_file(path.read_text(), path.stem, variables)
+        assert requests, path.name
+        assert all(r.path.startswith("/v1/") for r in requests), path.name
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for value in [1, 7, 7, 30, 20000]:
+        histogram.record(value)
+
+    buckets = histogram.buckets()
+    assert buckets["<=5ms"] == 1
+    assert buckets["<=10ms"] == 2
+    assert buckets["<=50ms"] == 1
+    assert buckets[">10000ms"] == 1
+    assert sum(buckets.values()) == 5
+    assert histogram.percentile(0.5) == 7
+
+
+@pytest.mark.anyio
+async def test_run_load_test_reports_each_scenario():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/directories"):
+            return httpx.Response(500)
+        return httpx.Response(200, json={})
+
+    scenarios = [
+        replay_scenario(
+            "health", [HttpRequest("about", "GET", "/v1/about", expected_status=200)]
+        ),
+        *builtin_scenarios(
+            ["314980"],
+            ["jbloggs"],
+            {"data-session": 1, "proposal": 1, "directories": 1},
+        ),
+    ]
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://test"
+    ) as client:
+        report = await run_load_test(
+            client, scenarios, rps=200, duration_seconds=0.5, seed=0
+        )
+
+    assert report.dropped == 0
+    assert report.total.requests == 100
+    assert sum(report.total.histogram.values()) == 100
+    results = {result.name: result for result in report.scenarios}
+    assert results["directories"].error_rate == 1.0
+    assert results["directories"].outcomes == {"500": results["directories"].requests}
+    for name in ["health", "data-session", "proposal"]:
+        assert results[name].errors == 0
+    assert report.total.errors == results["directories"].requests
@@ -0,0 +1,100 @@
+from pathlib import Path
+
+import pytest
+from fastapi import Request
+from httpx import ASGITransport, AsyncClient
+
+from nsls2api.devtools.upstream_simulator import (
+    SimulatorConfig,
+    create_app,
+    fixture_path,
+)
+from nsls2api.models.pass_models import PassAllocation, PassCycle, PassProposal
+
+
+@pytest.mark.anyio
+async def test_simulator_serves_consistent_pass_and_bnlpeople_data():
+    app = create_app(SimulatorConfig(years=1, proposals_per_cycle=10))
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/passapi/Proposal/GetCycles/KEY/NSLS-II")
+        cycles = [PassCycle(**cycle) for cycle in response.json()]
+        assert len(cycles) == 3
+
+        response = await ac.get(
+            f"/passapi/Proposal/GetProposalsAllocatedByCycle/KEY/NSLS-II/{cycles[0].ID}/null"
+        )
+        allocations = [PassAllocation(**a) for a in response.json()]
+        assert allocations
+
+        proposal_id = allocations[0].Proposal_ID
+        response = await ac.get(
+            f"/passapi/Proposal/GetProposal/KEY/NSLS-II/{proposal_id}"
+        )
+        proposal = PassProposal(**response.json())
+        # The same request always gets the same response
+        again = await ac.get(f"/passapi/Proposal/GetProposal/KEY/NSLS-II/{proposal_id}")
+        assert again.json() == response.json()
+
+        response = await ac.get(
+            f"/BNLPeople/api/BNLPeople?employeeNumber={proposal.PI.BNL_ID}"
+        )
+        assert response.json()[0]["ActiveDirectoryName"] == proposal.PI.Account
+
+
+@pytest.mark.anyio
+async def test_simulator_injects_errors():
+    app = create_app(SimulatorConfig(error_rate=1.0, error_status=503))
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/passapi/Proposal/GetCycles/KEY/NSLS-II")
+    assert response.status_code == 503
+
+
+@pytest.mark.anyio
+async def test_simulator_filters_bnlpeople_queries():
+    app = create_app(SimulatorConfig(people=50))
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        everyone = (await ac.get("/BNLPeople/api/BNLPeople")).json()
+        assert len(everyone) == 50
+
+        response = await ac.get(
+            "/BNLPeople/api/BNLPeople", params={"email": "SIMUSER00007@bnl.gov"}
+        )
+        assert [p["ActiveDirectoryName"] for p in response.json()] == ["simuser00007"]
+        response = await ac.get(
+            "/BNLPeople/api/BNLPeople", params={"email": "simuser00007@example.com"}
+        )
+        assert response.json() == []
+
+        department = everyone[0]["DepartmentCode"]
+        response = await ac.get(
+            "/BNLPeople/api/BNLPeople", params={"departmentCode": department}
+        )
+        assert response.json() == [
+            p for p in everyone if p["DepartmentCode"] == department
+        ]
+
+        response = await ac.get("/BNLPeople/api/BNLPeople", params={"status": "active"})
+        active = response.json()
+        assert active == [p for p in everyone if p["EmployeeStatus"] == "Active"]
+        assert 0 < len(active) < 50
+
+
+def test_fixture_path_keeps_dots_in_names():
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/BNLPeople/api/BNLPeople",
+            "query_string": b"accountName=j.bloggs",
+            "headers": [],
+        }
+    )
+    assert fixture_path(Path("fixtures"), request) == Path(
+        "fixtures/BNLPeople/api/BNLPeople/accountName=j.bloggs.json"
+    )
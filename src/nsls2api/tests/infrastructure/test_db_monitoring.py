@@ -0,0 +1,126 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from nsls2api.infrastructure import db_monitoring
+from nsls2api.infrastructure.db_monitoring import (
+    QueryBudgetExceeded,
+    count_queries,
+    filter_shape,
+    query_budget,
+)
+from nsls2api.models.beamlines import Beamline
+from nsls2api.models.proposals import Proposal
+
+
+@pytest.mark.anyio
+async def test_count_queries_includes_nested_scopes():
+    with count_queries() as outer:
+        await Beamline.find_one(Beamline.name == "ZZZ")
+        with count_queries() as inner:
+            await Proposal.find_one(Proposal.proposal_id == "314159")
+            await Proposal.find(Proposal.instruments == "ZZZ").to_list()
+
+    assert inner.count == 2
+    assert outer.count == 3
+    assert outer.duration_ms >= inner.duration_ms > 0
+
+    # Queries outside the block aren't counted
+    await Beamline.find_one(Beamline.name == "ZZZ")
+    assert outer.count == 3
+
+
+@pytest.mark.anyio
+async def test_query_budget():
+    with query_budget(1) as queries:
+        await Beamline.find_one(Beamline.name == "ZZZ")
+    assert queries.count == 1
+
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget(1):
+            await Beamline.find_one(Beamline.name == "ZZZ")
+            await Beamline.find_one(Beamline.name == "ZZZ")
+
+
+def test_filter_shape():
+    assert filter_shape({"proposal_id": "314159"}) == '{"proposal_id":"?"}'
+    # Values (including lists of them) are left out, and fields are sorted
+    assert (
+        filter_shape({"name": "ZZZ", "instruments": {"$in": ["ZZZ", "AMX"]}})
+        == '{"instruments":{"$in":"?"},"name":"?"}'
+    )
+    assert (
+        filter_shape({"$or": [{"name": "ZZZ"}, {"port": {"$exists": True}}]})
+        == '{"$or":[{"name":"?"},{"port":{"$exists":"?"}}]}'
+    )
+    assert filter_shape(None) == ""
+    assert filter_shape({}) == ""
+    assert filter_shape({f"field{i}": i for i in range(100)}).endswith("...")
+
+
+@pytest.mark.anyio
+async def test_command_durations_are_recorded(monkeypatch, caplog):
+    labels = {
+        "collection": "beamlines",
+        "command": "find",
+        "filter_shape": '{"name":"?"}',
+    }
+    metric = "nsls2api_mongodb_command_duration_seconds_count"
+    before = REGISTRY.get_sample_value(metric, labels) or 0
+
+    # Treat every query as slow, to check they are logged
+    monkeypatch.setattr(db_monitoring.settings, "mongodb_slow_query_ms", -1)
+    with caplog.at_level(logging.WARNING):
+        await Beamline.find_one(Beamline.name == "ZZZ")
+
+    assert REGISTRY.get_sample_value(metric, labels) == before + 1
+    assert any(
+        "Slow MongoDB query: find on" in record.getMessage()
+        and '{"name":"?"}' in record.getMessage()
+        for record in caplog.records
+    )
+
+
+def test_change_stream_waits_are_not_recorded(monkeypatch, caplog):
+    listener = db_monitoring.CommandMetricsListener()
+    monkeypatch.setattr(db_monitoring.settings, "mongodb_slow_query_ms", 500)
+    metric = "nsls2api_mongodb_command_duration_seconds_count"
+    labels = {"collection": "jobs", "command": "getMore", "filter_shape": ""}
+    before = REGISTRY.get_sample_value(metric, labels) or 0
+
+    def run(request_id: int, command: dict, reply: dict | None = None):
+        started = SimpleNamespace(
+            command_name=next(iter(command)),
+            command=command,
+            connection_id=("localhost", 27017),
+            request_id=request_id,
+        )
+        finished = SimpleNamespace(
+            connection_id=started.connection_id,
+            request_id=request_id,
+            duration_micros=1_000_000,
+            database_name="nsls2core",
+            reply=reply or {},
+        )
+        listener.started(started)
+        listener.succeeded(finished)
+
+    with caplog.at_level(logging.WARNING):
+        # Waiting for new changes on a change stream is normal...
+        run(
+            1,
+            {"aggregate": "jobs", "pipeline": [{"$changeStream": {}}]},
+            reply={"cursor": {"id": 42}},
+        )
+        caplog.clear()
+        run(2, {"getMore": 42, "collection": "jobs"})
+        # ...as on any other tailable cursor
+        run(3, {"getMore": 7, "collection": "jobs", "maxTimeMS": 1000})
+        assert REGISTRY.get_sample_value(metric, labels) == before
+        assert not caplog.records
+
+        # ...but a getMore on an ordinary cursor taking as long is slow
+        run(4, {"getMore": 8, "collection": "jobs"})
+    assert any("Slow MongoDB query: getMore" in r.getMessage() for r in caplog.records)
@@ -0,0 +1,399 @@
+import asyncio
+import datetime
+
+import httpx
+import pytest
+from beanie import PydanticObjectId
+from beanie.operators import In
+from prometheus_client import REGISTRY
+
+from nsls2api.models.jobs import (
+    BackgroundJob,
+    JobActions,
+    JobCheckpoint,
+    JobStatus,
+    JobSyncParameters,
+)
+from nsls2api.services import background_service, sync_service
+
+
+@pytest.mark.anyio
+async def test_job_is_claimed_by_exactly_one_worker():
+    job = await background_service.create_background_job(JobActions.synchronize_admins)
+
+    claimed = await asyncio.gather(
+        *[background_service.start_job(job.id, f"worker-{n}") for n in range(5)],
+        return_exceptions=True,
+    )
+    winners = [c for c in claimed if isinstance(c, BackgroundJob)]
+    assert len(winners) == 1
+    assert winners[0].processing_status == JobStatus.processing
+    assert winners[0].lease_owner is not None
+
+    await background_service.complete_job(job.id, JobStatus.success)
+
+
+@pytest.mark.anyio
+async def test_complete_job_is_rejected_after_lease_is_lost():
+    job = await background_service.create_background_job(JobActions.synchronize_admins)
+    first_claim = await background_service.start_job(job.id, "worker-1")
+
+    # The lease expires and the job is claimed again by another worker
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).update(
+        {"$set": {"processing_status": JobStatus.awaiting}}
+    )
+    second_claim = await background_service.start_job(job.id, "worker-2")
+
+    conflicts = REGISTRY.get_sample_value("nsls2api_job_claim_conflicts_total")
+    with pytest.raises(background_service.LeaseLostError):
+        await background_service.complete_job(
+            job.id, JobStatus.success, lease_token=first_claim.lease_token
+        )
+    with pytest.raises(background_service.LeaseLostError):
+        await background_service.save_checkpoint(
+            job.id, JobCheckpoint(), lease_token=first_claim.lease_token
+        )
+    # The first worker also loses if it tries to claim the job again
+    with pytest.raises(Exception, match="Cannot start job"):
+        await background_service.start_job(job.id, "worker-1")
+    assert (
+        REGISTRY.get_sample_value("nsls2api_job_claim_conflicts_total") == conflicts + 3
+    )
+    assert not await background_service.renew_lease(job.id, first_claim.lease_token)
+
+    await background_service.complete_job(
+        job.id, JobStatus.success, lease_token=second_claim.lease_token
+    )
+    assert await background_service.is_job_finished(job.id)
+
+
+@pytest.mark.anyio
+async def test_job_wakeup_is_not_missed_between_snapshot_and_wait():
+    wakeup = background_service.JobWakeup()
+
+    snapshot = wakeup.snapshot()
+    wakeup.notify()
+    assert await wakeup.wait(snapshot, timeout=0.1)
+
+    # A fresh snapshot is not woken by the earlier notification
+    assert not await wakeup.wait(wakeup.snapshot(), timeout=0.01)
+
+
+@pytest.mark.anyio
+async def test_job_wakeup_can_wait_for_particular_jobs():
+    wakeup = background_service.JobWakeup()
+    followed, other = PydanticObjectId(), PydanticObjectId()
+
+    snapshot = wakeup.snapshot()
+    wakeup.notify(other)
+    assert not await wakeup.wait(snapshot, timeout=0.01, job_ids={followed})
+
+    # A notification about a followed job after others still wakes the waiter...
+    wakeup.notify(followed)
+    assert await wakeup.wait(snapshot, timeout=0.1, job_ids={followed})
+
+    # ...as does one that could be about any job
+    snapshot = wakeup.snapshot()
+    wakeup.notify()
+    assert await wakeup.wait(snapshot, timeout=0.1, job_ids={followed})
+
+
+@pytest.mark.anyio
+async def test_duplicate_unfinished_jobs_are_coalesced():
+    sync_parameters = JobSyncParameters(proposal_id="314159", facility="nsls2")
+    jobs = await asyncio.gather(
+        *[
+            background_service.create_background_job(
+                JobActions.synchronize_proposal, sync_parameters
+            )
+            for _ in range(5)
+        ]
+    )
+    assert len({job.id for job in jobs}) == 1
+
+    await background_service.start_job(jobs[0].id, "worker-1")
+    await background_service.complete_job(jobs[0].id, JobStatus.success)
+
+    # Once the job has finished, the same request queues a new job
+    new_job = await background_service.create_background_job(
+        JobActions.synchronize_proposal, sync_parameters
+    )
+    assert new_job.id != jobs[0].id
+    await BackgroundJob.find_one(BackgroundJob.id == new_job.id).delete()
+
+
+@pytest.mark.anyio
+async def test_interactive_jobs_are_claimed_before_bulk_jobs():
+    bulk_job = await background_service.create_background_job(
+        JobActions.synchronize_proposals_for_cycle,
+        JobSyncParameters(cycle="1999-1", facility="nsls2"),
+    )
+    interactive_job = await background_service.create_background_job(
+        JobActions.synchronize_proposal,
+        JobSyncParameters(proposal_id="271828", facility="nsls2"),
+    )
+
+    claimed = await background_service.claim_next_job("worker-1")
+    assert claimed.id == interactive_job.id
+
+    await BackgroundJob.find(
+        In(BackgroundJob.id, [bulk_job.id, interactive_job.id])
+    ).delete()
+
+
+def test_retry_policy_only_retries_transient_errors():
+    policy = background_service.RetryPolicy(
+        max_attempts=3, base_delay_seconds=10, max_delay_seconds=60
+    )
+
+    request = httpx.Request("GET", "https://example.com")
+    try:
+        try:
+            raise httpx.ReadTimeout("timed out", request=request)
+        except httpx.ReadTimeout as error:
+            raise Exception("Error retrieving proposal from PASS") from error
+    except Exception as wrapped:
+        assert policy.is_retryable(wrapped)
+
+    not_found = httpx.HTTPStatusError(
+        "not found", request=request, response=httpx.Response(404, request=request)
+    )
+    unavailable = httpx.HTTPStatusError(
+        "unavailable", request=request, response=httpx.Response(503, request=request)
+    )
+    assert not policy.is_retryable(not_found)
+    assert policy.is_retryable(unavailable)
+    assert not policy.is_retryable(ValueError("bad data"))
+
+    for attempt in range(1, 10):
+        delay = policy.backoff_seconds(attempt)
+        assert 0 <= delay <= min(60, 10 * 2 ** (attempt - 1))
+
+
+@pytest.mark.anyio
+async def test_transient_failures_are_retried_then_dead_lettered():
+    job = await background_service.create_background_job(
+        JobActions.synchronize_proposal,
+        JobSyncParameters(proposal_id="161803", facility="nsls2"),
+    )
+    policy = background_service.retry_policy(job.action)
+    error = httpx.ConnectError("connection refused")
+
+    for attempt in range(1, policy.max_attempts + 1):
+        # Make the job due again straight away
+        await BackgroundJob.find_one(BackgroundJob.id == job.id).update(
+            {"$set": {"next_attempt_at": None}}
+        )
+        claimed = await background_service.start_job(job.id, "worker-1")
+        assert claimed.attempts == attempt
+        await background_service.record_job_failure(claimed, error)
+
+        job = await background_service.job_by_id(job.id)
+        if attempt < policy.max_attempts:
+            assert job.processing_status == JobStatus.awaiting
+            assert job.next_attempt_at is not None
+
+    assert job.processing_status == JobStatus.dead_letter
+    assert job.is_finished
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).delete()
+
+
+@pytest.mark.anyio
+async def test_stale_jobs_are_reclaimed():
+    job = await background_service.create_background_job(JobActions.synchronize_admins)
+    claimed = await background_service.start_job(job.id, "worker-1")
+
+    # A job whose lease is still held is left alone
+    await background_service.reclaim_stale_jobs()
+    job = await background_service.job_by_id(job.id)
+    assert job.processing_status == JobStatus.processing
+
+    # The worker goes away and its lease runs out
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).update(
+        {
+            "$set": {
+                "lease_expires_at": datetime.datetime.now()
+                - datetime.timedelta(seconds=1)
+            }
+        }
+    )
+    assert await background_service.reclaim_stale_jobs() >= 1
+
+    job = await background_service.job_by_id(job.id)
+    assert job.processing_status == JobStatus.awaiting
+    assert job.lease_owner is None and job.lease_token is None
+    assert job.resume_count == 1
+
+    # The old claim can no longer record anything against the job
+    with pytest.raises(background_service.LeaseLostError):
+        await background_service.save_checkpoint(
+            job.id, JobCheckpoint(), lease_token=claimed.lease_token
+        )
+
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).delete()
+
+
+@pytest.mark.anyio
+async def test_stale_job_is_dead_lettered_once_its_attempts_are_used_up():
+    job = await background_service.create_background_job(JobActions.synchronize_admins)
+    policy = background_service.retry_policy(job.action)
+    labels = {"action": job.action}
+    dead_lettered = (
+        REGISTRY.get_sample_value("nsls2api_jobs_dead_lettered_total", labels) or 0
+    )
+
+    # Each time the job runs, its worker goes away before the lease is renewed
+    for attempt in range(1, policy.max_attempts + 1):
+        claimed = await background_service.start_job(job.id, f"worker-{attempt}")
+        assert claimed.attempts == attempt
+        await BackgroundJob.find_one(BackgroundJob.id == job.id).update(
+            {"$set": {"lease_expires_at": datetime.datetime.now()}}
+        )
+        assert await background_service.reclaim_stale_jobs() >= 1
+
+        job = await background_service.job_by_id(job.id)
+        if attempt < policy.max_attempts:
+            assert job.processing_status == JobStatus.awaiting
+
+    assert job.processing_status == JobStatus.dead_letter
+    assert job.is_finished
+    assert job.lease_token is None
+    assert (
+        REGISTRY.get_sample_value("nsls2api_jobs_dead_lettered_total", labels)
+        == dead_lettered + 1
+    )
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).delete()
+
+
+@pytest.mark.anyio
+async def test_reclaimed_job_resumes_from_its_checkpoint(monkeypatch):
+    job = await background_service.create_background_job(
+        JobActions.synchronize_proposals_for_cycle,
+        JobSyncParameters(cycle="1999-1", facility="nsls2"),
+    )
+    claimed = await background_service.start_job(job.id, "worker-1")
+    await background_service.save_checkpoint(
+        job.id,
+        JobCheckpoint(remaining=["314160", "314161"], failed={"314159": "timeout"}),
+        lease_token=claimed.lease_token,
+    )
+
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).update(
+        {"$set": {"lease_expires_at": datetime.datetime.now()}}
+    )
+    await background_service.reclaim_stale_jobs()
+
+    resumed_with = {}
+
+    async def synchronize(cycle, facility, **kwargs):
+        resumed_with.update(kwargs, cycle=cycle)
+
+    monkeypatch.setattr(
+        sync_service, "worker_synchronize_proposals_for_cycle_from_pass", synchronize
+    )
+
+    resumed = await background_service.start_job(job.id, "worker-2")
+    assert resumed.checkpoint.remaining == ["314160", "314161"]
+    await background_service.process_job(resumed)
+
+    assert resumed_with["cycle"] == "1999-1"
+    assert resumed_with["remaining_proposal_ids"] == ["314160", "314161"]
+    assert resumed_with["previously_failed"] == {"314159": "timeout"}
+
+    job = await background_service.job_by_id(job.id)
+    assert job.processing_status == JobStatus.success
+    assert job.resume_count == 1
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).delete()
+
+
+@pytest.mark.anyio
+async def test_worker_carries_on_after_a_job_fails_unexpectedly(monkeypatch):
+    jobs = [
+        BackgroundJob(id=PydanticObjectId(), action=JobActions.synchronize_admins)
+        for _ in range(2)
+    ]
+    queue = list(jobs)
+    processed = []
+    done = asyncio.Event()
+
+    async def claim_next_job(worker_id):
+        return queue.pop(0) if queue else None
+
+    async def process_job(job):
+        processed.append(job.id)
+        if len(processed) == 1:
+            raise ConnectionError("database went away")
+        done.set()
+
+    monkeypatch.setattr(background_service, "claim_next_job", claim_next_job)
+    monkeypatch.setattr(background_service, "process_job", process_job)
+
+    idle_workers = asyncio.Queue()
+    tasks = [
+        asyncio.create_task(background_service.claim_jobs(idle_workers)),
+        asyncio.create_task(background_service.worker_loop("worker-1", idle_workers)),
+    ]
+    try:
+        await asyncio.wait_for(done.wait(), timeout=5)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    assert processed == [job.id for job in jobs]
+
+
+@pytest.mark.anyio
+async def test_idle_workers_share_one_claimer(monkeypatch):
+    claims = []
+
+    async def claim_next_job(worker_id):
+        claims.append(worker_id)
+        return None
+
+    monkeypatch.setattr(background_service, "claim_next_job", claim_next_job)
+    monkeypatch.setattr(background_service.job_wakeup, "listening", True)
+
+    idle_workers = asyncio.Queue()
+    tasks = [asyncio.create_task(background_service.claim_jobs(idle_workers))] + [
+        asyncio.create_task(background_service.worker_loop(f"worker-{n}", idle_workers))
+        for n in range(4)
+    ]
+    try:
+        await asyncio.sleep(0.1)
+        # However many workers are idle, the process looks for a job once...
+        assert claims == ["worker-0"]
+
+        # ...and once more per notification, rather than once per worker
+        background_service.job_wakeup.notify()
+        await asyncio.sleep(0.1)
+        assert claims == ["worker-0", "worker-0"]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@pytest.mark.anyio
+async def test_requesting_a_job_again_cuts_its_backoff_short():
+    job = await background_service.create_background_job(
+        JobActions.synchronize_proposal,
+        JobSyncParameters(proposal_id="271828", facility="nsls2"),
+    )
+    claimed = await background_service.start_job(job.id, "worker-1")
+    await background_service.record_job_failure(
+        claimed, httpx.ConnectError("connection refused")
+    )
+    job = await background_service.job_by_id(job.id)
+    assert job.next_attempt_at is not None
+
+    again = await background_service.create_background_job(
+        JobActions.synchronize_proposal,
+        JobSyncParameters(proposal_id="271828", facility="nsls2"),
+    )
+    assert again.id == job.id
+    assert again.next_attempt_at is None
+
+    # The job can be run straight away, rather than after the backoff
+    retried = await background_service.start_job(job.id, "worker-1")
+    assert retried.attempts == 2
+
+    await BackgroundJob.find_one(BackgroundJob.id == job.id).delete()
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+
+import pytest
+from ldap3.core.exceptions import LDAPException
+
+from nsls2api.services import n2sn_service
+from nsls2api.services.n2sn_service import (
+    GroupMembershipCache,
+    LdapConnectionPool,
+    LdapTimeoutError,
+)
+
+
+class _FakeConnection:
+    """Stands in for a pooled Active Directory connection."""
+
+    opened: list["_FakeConnection"] = []
+
+    def __init__(self):
+        self.ad = self
+        self.closed = False
+        _FakeConnection.opened.append(self)
+
+    def is_healthy(self) -> bool:
+        return not self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def fake_connections(monkeypatch):
+    _FakeConnection.opened = []
+    monkeypatch.setattr(n2sn_service, "_PooledConnection", _FakeConnection)
+    return _FakeConnection.opened
+
+
+@pytest.mark.anyio
+async def test_group_membership_is_fetched_once_for_concurrent_callers():
+    fetched = []
+
+    async def fetch(group: str) -> frozenset[str]:
+        fetched.append(group)
+        await asyncio.sleep(0.01)
+        return frozenset({"alice", "bob"})
+
+    cache = GroupMembershipCache(fetch, ttl_seconds=60)
+    members = await asyncio.gather(
+        *[cache.members("n2sn-right-dataadmin-zzz") for _ in range(10)]
+    )
+
+    assert fetched == ["n2sn-right-dataadmin-zzz"]
+    assert all(m == frozenset({"alice", "bob"}) for m in members)
+    assert "alice" in await cache.members("n2sn-right-dataadmin-zzz")
+    assert len(fetched) == 1
+
+
+@pytest.mark.anyio
+async def test_stale_group_membership_is_refreshed_in_the_background():
+    fetched = []
+
+    async def fetch(group: str) -> frozenset[str]:
+        fetched.append(group)
+        return frozenset({"alice"}) if len(fetched) == 1 else frozenset({"carol"})
+
+    cache = GroupMembershipCache(fetch, ttl_seconds=0, stale_seconds=60)
+    assert await cache.members("group") == frozenset({"alice"})
+
+    # The stale members are returned straight away while they are refreshed
+    assert await cache.members("group") == frozenset({"alice"})
+    await asyncio.sleep(0)
+    assert await cache.members("group") == frozenset({"carol"})
+
+
+@pytest.mark.anyio
+async def test_failed_group_membership_fetch_is_not_cached():
+    fetched = []
+
+    async def fetch(group: str) -> frozenset[str]:
+        fetched.append(group)
+        if len(fetched) == 1:
+            return frozenset({"alice"})
+        raise LdapTimeoutError("Active Directory is too slow")
+
+    # Expired straight away, so every call fetches the members again
+    cache = GroupMembershipCache(fetch, ttl_seconds=0)
+    assert await cache.members("group") == frozenset({"alice"})
+
+    # The last members that were fetched are kept, rather than nobody
+    assert await cache.members("group") == frozenset({"alice"})
+    assert await cache.members("group") == frozenset({"alice"})
+    assert len(fetched) == 3
+
+    # With no previous members to fall back on, the caller gets the error
+    with pytest.raises(LdapTimeoutError):
+        await cache.members("another-group")
+
+
+@pytest.mark.anyio
+async def test_slow_active_directory_call_times_out(fake_connections, monkeypatch):
+    pool = LdapConnectionPool(1)
+    release = threading.Event()
+    monkeypatch.setattr(n2sn_service, "ldap_pool", lambda: pool)
+    monkeypatch.setattr(n2sn_service.settings, "ldap_call_timeout_seconds", 0.05)
+    try:
+        with pytest.raises(LdapTimeoutError):
+            await pool.run(lambda ad: release.wait(5), timeout=0.05)
+
+        # A group lookup that times out isn't mistaken for an empty group
+        with pytest.raises(LdapTimeoutError):
+            await n2sn_service.get_users_in_group("n2sn-right-dataadmin-zzz")
+    finally:
+        release.set()
+        pool.close()
+
+
+@pytest.mark.anyio
+async def test_connection_is_returned_to_the_pool_when_the_retry_fails(
+    fake_connections,
+):
+    pool = LdapConnectionPool(1)
+    calls = []
+
+    def operation(ad):
+        calls.append(ad)
+        if len(calls) == 1:
+            raise LDAPException("connection reset")
+        raise ValueError("no such group")
+
+    try:
+        with pytest.raises(ValueError):
+            await pool.run(operation)
+
+        # The broken connection is closed, and the one it was replaced by is reused
+        first, second = fake_connections
+        assert first.closed and not second.closed
+        assert await pool.run(lambda ad: ad) is second
+        assert len(fake_connections) == 2
+    finally:
+        pool.close()
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from nsls2api.services.pipeline import Stage, StagedPipeline
+
+
+@pytest.mark.anyio
+async def test_pipeline_runs_items_through_all_stages():
+    written = []
+
+    async def double(item):
+        await asyncio.sleep(0)
+        return item * 2
+
+    async def increment(item):
+        return item + 1
+
+    async def write(item):
+        written.append(item)
+        return item
+
+    pipeline = StagedPipeline(
+        [
+            Stage("double", double, concurrency=3),
+            Stage("increment", increment, concurrency=2),
+            Stage("write", write),
+        ],
+        queue_size=2,
+    )
+    result = await pipeline.run(range(10))
+
+    assert sorted(written) == [n * 2 + 1 for n in range(10)]
+    assert result.failures == {}
+    assert [stage.name for stage in result.stages] == ["double", "increment", "write"]
+    assert all(stage.processed == 10 for stage in result.stages)
+
+
+@pytest.mark.anyio
+async def test_pipeline_isolates_failing_items():
+    async def reject_odd(item):
+        if item % 2:
+            raise ValueError(f"{item} is odd")
+        return item
+
+    async def passthrough(item):
+        return item
+
+    pipeline = StagedPipeline(
+        [Stage("filter", reject_odd, concurrency=2), Stage("sink", passthrough)],
+        key=lambda item: f"item-{item}",
+    )
+    result = await pipeline.run(range(6))
+
+    assert set(result.failures) == {"item-1", "item-3", "item-5"}
+    assert result.stages[0].failed == 3
+    assert result.stages[1].processed == 3
+
+
+@pytest.mark.anyio
+async def test_pipeline_metrics_are_available_while_running():
+    seen = []
+
+    async def passthrough(item):
+        return item
+
+    async def observe(item):
+        # The first stage has processed at least this item by now
+        seen.append(pipeline.metrics[0].processed)
+        return item
+
+    pipeline = StagedPipeline([Stage("first", passthrough), Stage("observe", observe)])
+    await pipeline.run(range(5))
+
+    assert len(seen) == 5
+    assert all(processed >= n + 1 for n, processed in enumerate(seen))
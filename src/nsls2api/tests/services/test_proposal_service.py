@@ -1,9 +1,11 @@
+import datetime
+
 import pytest
 from httpx import ASGITransport, AsyncClient
 
 from nsls2api.main import app
 
-from nsls2api.models.proposals import Proposal
+from nsls2api.models.proposals import Proposal, SafetyForm, User
 from nsls2api.services import proposal_service
 
 test_proposal_id = "314159"
@@ -183,4 +185,48 @@ async def test_data_sessions_invalid_beamline(admin_api_key):
     assert resp.status_code == 200
     body = resp.json()
     assert body["count"] == 0
-    assert body["proposals"] == []
\ No newline at end of file
+    assert body["proposals"] == []
+
+@pytest.mark.anyio
+async def test_proposal_content_hash_ignores_ordering():
+    users = [
+        User(email="a@example.com", bnl_id="A1", username="alice", is_pi=True),
+        User(email="b@example.com", bnl_id="B2", username="bob"),
+    ]
+    proposal = Proposal(
+        proposal_id=test_proposal_id,
+        data_session=f"pass-{test_proposal_id}",
+        title="Test Proposal",
+        instruments=["ZZZ", "AAA"],
+        users=users,
+        safs=[SafetyForm(saf_id="1", status="APPROVED", instruments=["ZZZ", "AAA"])],
+    )
+    reordered = proposal.model_copy(
+        update={
+            "instruments": ["AAA", "ZZZ"],
+            "users": list(reversed(users)),
+            "safs": [
+                SafetyForm(saf_id="1", status="APPROVED", instruments=["AAA", "ZZZ"])
+            ],
+            "last_updated": datetime.datetime.now(),
+            "cycles": ["1999-1"],
+        }
+    )
+
+    assert proposal_service.proposal_content_hash(
+        proposal
+    ) == proposal_service.proposal_content_hash(reordered)
+
+
+@pytest.mark.anyio
+async def test_proposal_content_hash_detects_changes():
+    proposal = Proposal(
+        proposal_id=test_proposal_id,
+        data_session=f"pass-{test_proposal_id}",
+        title="Test Proposal",
+    )
+    retitled = proposal.model_copy(update={"title": "A Different Title"})
+
+    assert proposal_service.proposal_content_hash(
+        proposal
+    ) != proposal_service.proposal_content_hash(retitled)
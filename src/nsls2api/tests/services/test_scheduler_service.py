@@ -0,0 +1,169 @@
+import datetime
+
+import pytest
+
+from nsls2api.models.jobs import BackgroundJob, JobActions, JobStatus, JobSyncParameters
+from nsls2api.models.schedules import JobSchedule, SchedulerLease
+from nsls2api.services import background_service, scheduler_service
+from nsls2api.services.scheduler_service import CronSchedule
+
+
+def test_cron_next_run_for_hourly_schedule():
+    schedule = CronSchedule.parse("5 * * * *")
+    after = datetime.datetime(2024, 3, 1, 10, 5, 30)
+    assert schedule.next_after(after) == datetime.datetime(2024, 3, 1, 11, 5)
+
+
+def test_cron_next_run_with_steps_ranges_and_weekdays():
+    # Every 15 minutes during working hours on weekdays
+    schedule = CronSchedule.parse("*/15 9-17 * * 1-5")
+    friday_evening = datetime.datetime(2024, 3, 1, 17, 50)
+    assert schedule.next_after(friday_evening) == datetime.datetime(2024, 3, 4, 9, 0)
+
+
+def test_cron_next_run_crosses_year_and_leap_day():
+    schedule = CronSchedule.parse("0 0 29 2 *")
+    assert schedule.next_after(datetime.datetime(2024, 3, 1)) == datetime.datetime(
+        2028, 2, 29, 0, 0
+    )
+
+
+def test_cron_rejects_invalid_expressions():
+    with pytest.raises(ValueError):
+        CronSchedule.parse("* * * *")
+    with pytest.raises(ValueError):
+        CronSchedule.parse("60 * * * *")
+
+
+@pytest.mark.anyio
+async def test_scheduler_lease_is_handed_over_once_it_expires():
+    await SchedulerLease.find(SchedulerLease.id == "scheduler").delete()
+
+    assert await scheduler_service.acquire_scheduler_lease("process-1")
+    assert not await scheduler_service.acquire_scheduler_lease("process-2")
+    # The holder renews its lease
+    assert await scheduler_service.acquire_scheduler_lease("process-1")
+
+    # process-1 goes away, so its lease runs out
+    await SchedulerLease.find(SchedulerLease.id == "scheduler").update(
+        {
+            "$set": {
+                "expires_at": datetime.datetime.now() - datetime.timedelta(seconds=1)
+            }
+        }
+    )
+    assert await scheduler_service.acquire_scheduler_lease("process-2")
+    assert not await scheduler_service.acquire_scheduler_lease("process-1")
+
+    await SchedulerLease.find(SchedulerLease.id == "scheduler").delete()
+
+
+async def _make_due(schedule: JobSchedule) -> datetime.datetime:
+    now = datetime.datetime.now()
+    await JobSchedule.find(JobSchedule.id == schedule.id).update(
+        {"$set": {"next_run_at": now - datetime.timedelta(minutes=1)}}
+    )
+    return now
+
+
+@pytest.mark.anyio
+async def test_scheduled_run_is_skipped_while_previous_job_is_unfinished():
+    schedule = JobSchedule(
+        name="test-skip-while-unfinished",
+        action=JobActions.synchronize_proposal,
+        sync_parameters=JobSyncParameters(proposal_id="577215", facility="nsls2"),
+        cron="* * * * *",
+    )
+    await schedule.insert()
+
+    now = await _make_due(schedule)
+    await scheduler_service.run_due_schedules(now)
+    schedule = await JobSchedule.get(schedule.id)
+    first_job_id = schedule.last_job_id
+    assert first_job_id is not None
+    assert schedule.next_run_at > now
+
+    # The first job hasn't run yet, so the next run is skipped
+    now = await _make_due(schedule)
+    await scheduler_service.run_due_schedules(now)
+    schedule = await JobSchedule.get(schedule.id)
+    assert schedule.last_job_id == first_job_id
+    assert schedule.skipped_runs == 1
+    assert schedule.next_run_at > now
+
+    # Once it has finished, the schedule queues a new job
+    await background_service.start_job(first_job_id, "worker-1")
+    await background_service.complete_job(first_job_id, JobStatus.success)
+    now = await _make_due(schedule)
+    await scheduler_service.run_due_schedules(now)
+    schedule = await JobSchedule.get(schedule.id)
+    assert schedule.last_job_id not in (None, first_job_id)
+
+    await BackgroundJob.find(BackgroundJob.id == schedule.last_job_id).delete()
+    await BackgroundJob.find(BackgroundJob.id == first_job_id).delete()
+    await schedule.delete()
+
+
+@pytest.mark.anyio
+async def test_schedule_is_not_moved_on_when_its_job_cannot_be_queued(monkeypatch):
+    schedule = JobSchedule(
+        name="test-queue-failure",
+        action=JobActions.synchronize_proposal,
+        sync_parameters=JobSyncParameters(proposal_id="662607", facility="nsls2"),
+        cron="* * * * *",
+    )
+    await schedule.insert()
+    now = await _make_due(schedule)
+    due_at = (await JobSchedule.get(schedule.id)).next_run_at
+
+    async def create_background_job(action, sync_parameters=None, priority=None):
+        raise Exception("database unavailable")
+
+    monkeypatch.setattr(
+        background_service, "create_background_job", create_background_job
+    )
+    await scheduler_service.run_due_schedules(now)
+
+    # The run is still due, so it is tried again on the next tick
+    schedule = await JobSchedule.get(schedule.id)
+    assert schedule.next_run_at == due_at
+    assert schedule.last_job_id is None
+
+    await schedule.delete()
+
+
+@pytest.mark.anyio
+async def test_schedule_with_invalid_cron_is_disabled_without_stopping_others():
+    bad = JobSchedule(
+        name="test-invalid-cron",
+        action=JobActions.synchronize_admins,
+        cron="61 * * * *",
+        next_run_at=datetime.datetime.now() - datetime.timedelta(minutes=1),
+    )
+    # Added straight to the database, so without a next run time
+    unscheduled = JobSchedule(
+        name="test-invalid-cron-unscheduled",
+        action=JobActions.synchronize_admins,
+        cron="every hour",
+    )
+    good = JobSchedule(
+        name="test-valid-cron",
+        action=JobActions.synchronize_proposal,
+        sync_parameters=JobSyncParameters(proposal_id="299792", facility="nsls2"),
+        cron="* * * * *",
+    )
+    for schedule in (bad, unscheduled, good):
+        await schedule.insert()
+    now = await _make_due(good)
+
+    await scheduler_service.run_due_schedules(now)
+
+    good = await JobSchedule.get(good.id)
+    assert good.last_job_id is not None
+    assert good.next_run_at > now
+    for schedule in (bad, unscheduled):
+        assert not (await JobSchedule.get(schedule.id)).enabled
+
+    await BackgroundJob.find(BackgroundJob.id == good.last_job_id).delete()
+    for schedule in (bad, unscheduled, good):
+        await schedule.delete()
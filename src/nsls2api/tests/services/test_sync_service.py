@@ -0,0 +1,273 @@
+import pytest
+from beanie.operators import In
+from pymongo.errors import AutoReconnect
+
+from nsls2api.api.models.facility_model import FacilityName
+from nsls2api.models.beamlines import Beamline
+from nsls2api.models.facilities import Facility
+from nsls2api.models.jobs import JobSyncSource
+from nsls2api.models.pass_models import PassAllocation
+from nsls2api.models.proposals import Proposal
+from nsls2api.models.sync_state import ProposalSyncState
+from nsls2api.services import (
+    facility_service,
+    n2sn_service,
+    pass_service,
+    proposal_service,
+    sync_service,
+)
+from nsls2api.services.sync_service import (
+    ProposalBulkWriter,
+    ProposalSyncCounts,
+    ProposalSyncItem,
+    ProposalSyncProgress,
+    ProposalSyncResult,
+    allocation_hashes,
+)
+
+
+def _proposal(proposal_id: str, title: str = "Synchronized Proposal") -> Proposal:
+    proposal = Proposal(
+        proposal_id=proposal_id,
+        data_session=f"pass-{proposal_id}",
+        title=title,
+        instruments=["ZZZ"],
+    )
+    proposal.content_hash = proposal_service.proposal_content_hash(proposal)
+    return proposal
+
+
+class _LostConnection:
+    """A proposals collection whose bulk writes fail as if the server went away."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def bulk_write(self, *args, **kwargs):
+        raise AutoReconnect("connection lost")
+
+
+@pytest.mark.anyio
+async def test_bulk_writer_only_writes_changed_proposals():
+    proposal_ids = ["7000001", "7000002", "7000003"]
+    flushed = []
+
+    async def on_flush(ids: list[str]):
+        flushed.append(sorted(ids))
+
+    async with ProposalBulkWriter(batch_size=2, on_flush=on_flush) as writer:
+        for proposal_id in proposal_ids:
+            await writer.add(_proposal(proposal_id))
+
+    assert flushed == [["7000001", "7000002"], ["7000003"]]
+    assert (writer.counts.changed, writer.counts.unchanged) == (3, 0)
+    assert not writer.failed
+
+    # Only the proposal that has changed since is written the second time
+    async with ProposalBulkWriter(batch_size=10) as writer:
+        await writer.add(_proposal("7000001"))
+        await writer.add(_proposal("7000002", title="A Different Title"))
+
+    assert (writer.counts.changed, writer.counts.unchanged) == (1, 1)
+    retitled = await Proposal.find_one(Proposal.proposal_id == "7000002")
+    assert retitled.title == "A Different Title"
+
+    await Proposal.find(In(Proposal.proposal_id, proposal_ids)).delete()
+
+
+@pytest.mark.anyio
+async def test_bulk_writer_records_whole_batch_as_failed_when_connection_is_lost(
+    monkeypatch,
+):
+    proposal_ids = ["7000011", "7000012"]
+    flushed = []
+
+    async def on_flush(ids: list[str]):
+        flushed.extend(ids)
+
+    collection = _LostConnection(Proposal.get_motor_collection())
+    monkeypatch.setattr(
+        Proposal, "get_motor_collection", staticmethod(lambda: collection)
+    )
+
+    async with ProposalBulkWriter(batch_size=10, on_flush=on_flush) as writer:
+        for proposal_id in proposal_ids:
+            await writer.add(_proposal(proposal_id))
+
+    # Every proposal in the batch is accounted for, rather than silently dropped
+    assert sorted(writer.failed) == proposal_ids
+    assert "connection lost" in writer.failed["7000011"]
+    assert sorted(flushed) == proposal_ids
+    assert writer.counts.changed == 0
+
+    monkeypatch.undo()
+    assert await Proposal.find(In(Proposal.proposal_id, proposal_ids)).count() == 0
+
+
+@pytest.mark.anyio
+async def test_failed_flush_during_sync_fails_every_buffered_proposal(monkeypatch):
+    proposal_ids = [str(proposal_id) for proposal_id in range(7000021, 7000026)]
+
+    async def fetch(item: ProposalSyncItem) -> ProposalSyncItem:
+        return item
+
+    async def transform(item: ProposalSyncItem) -> ProposalSyncItem:
+        item.proposal = _proposal(item.proposal_id)
+        return item
+
+    async def write(self, batch):
+        raise ValueError("cannot encode proposal")
+
+    monkeypatch.setattr(sync_service, "fetch_proposal_from_pass", fetch)
+    monkeypatch.setattr(sync_service, "enrich_proposal", fetch)
+    monkeypatch.setattr(sync_service, "transform_proposal", transform)
+    monkeypatch.setattr(ProposalBulkWriter, "_write", write)
+
+    reports = []
+
+    async def on_progress(progress: ProposalSyncProgress):
+        reports.append((set(progress.remaining), dict(progress.failed)))
+
+    result = await sync_service.synchronize_proposals_from_pass(
+        [ProposalSyncItem(proposal_id=proposal_id) for proposal_id in proposal_ids],
+        write_batch_size=2,
+        on_progress=on_progress,
+    )
+
+    # Every proposal is reported as failed, not only those that triggered a flush
+    assert sorted(result.failed) == proposal_ids
+    assert all("cannot encode" in error for error in result.failed.values())
+    remaining, failed = reports[-1]
+    assert remaining == set()
+    assert sorted(failed) == proposal_ids
+
+
+def test_allocation_hashes_combine_each_proposals_allocations():
+    first = PassAllocation(
+        Proposal_ID=7000031, Cycle_Request_ID=1, Total_Hours_Awarded=8
+    )
+    second = PassAllocation(
+        Proposal_ID=7000031, Cycle_Request_ID=2, Total_Hours_Awarded=4
+    )
+    other = PassAllocation(Proposal_ID=7000032, Cycle_Request_ID=1)
+
+    hashes = allocation_hashes([first, second, other, PassAllocation()])
+
+    # Allocations without a proposal are ignored
+    assert sorted(hashes) == ["7000031", "7000032"]
+    # The order PASS returns the allocations in doesn't matter
+    assert allocation_hashes([other, second, first]) == hashes
+
+    # A change to any of a proposal's allocations changes only its fingerprint
+    changed = allocation_hashes(
+        [first, second.model_copy(update={"Total_Hours_Awarded": 6}), other]
+    )
+    assert changed["7000031"] != hashes["7000031"]
+    assert changed["7000032"] == hashes["7000032"]
+
+
+@pytest.mark.anyio
+async def test_incremental_sync_only_synchronizes_new_and_changed_proposals(
+    monkeypatch,
+):
+    allocations = [
+        PassAllocation(Proposal_ID=7000041, Total_Hours_Awarded=8),
+        PassAllocation(Proposal_ID=7000042, Total_Hours_Awarded=8),
+    ]
+    failing = set()
+    synchronized = []
+
+    async def get_proposals_allocated(facility_name):
+        return list(allocations)
+
+    async def current_operating_cycle(facility_name):
+        return None
+
+    async def synchronize(items, on_progress=None):
+        proposal_ids = sorted(item.proposal_id for item in items)
+        synchronized.append(proposal_ids)
+        return ProposalSyncResult(
+            counts=ProposalSyncCounts(changed=len(proposal_ids)),
+            failed={
+                proposal_id: "PASS is unavailable"
+                for proposal_id in proposal_ids
+                if proposal_id in failing
+            },
+            stages=[],
+            elapsed_seconds=0.0,
+        )
+
+    monkeypatch.setattr(
+        pass_service, "get_proposals_allocated", get_proposals_allocated
+    )
+    monkeypatch.setattr(
+        facility_service, "current_operating_cycle", current_operating_cycle
+    )
+    monkeypatch.setattr(sync_service, "synchronize_proposals_from_pass", synchronize)
+
+    async def sync_state() -> ProposalSyncState:
+        return await ProposalSyncState.find_one(
+            ProposalSyncState.facility == FacilityName.nsls2,
+            ProposalSyncState.sync_source == JobSyncSource.PASS,
+        )
+
+    state = await sync_state()
+    if state is not None:
+        await state.delete()
+
+    # Everything is new the first time
+    await sync_service.worker_synchronize_proposals_incremental_from_pass()
+    assert synchronized[-1] == ["7000041", "7000042"]
+    state = await sync_state()
+    assert sorted(state.allocation_hashes) == ["7000041", "7000042"]
+    assert state.last_successful_run is not None
+    first_hashes = dict(state.allocation_hashes)
+
+    # Only the changed and the new proposal are synchronized; the new one fails
+    allocations[1] = PassAllocation(Proposal_ID=7000042, Total_Hours_Awarded=4)
+    allocations.append(PassAllocation(Proposal_ID=7000043))
+    failing.add("7000043")
+    with pytest.raises(Exception, match="Failed to synchronize 1 proposals"):
+        await sync_service.worker_synchronize_proposals_incremental_from_pass()
+    assert synchronized[-1] == ["7000042", "7000043"]
+
+    state = await sync_state()
+    assert state.allocation_hashes["7000041"] == first_hashes["7000041"]
+    assert state.allocation_hashes["7000042"] != first_hashes["7000042"]
+    # A failed proposal isn't recorded, so it is tried again next time
+    assert "7000043" not in state.allocation_hashes
+
+    failing.clear()
+    await sync_service.worker_synchronize_proposals_incremental_from_pass()
+    assert synchronized[-1] == ["7000043"]
+    assert "7000043" in (await sync_state()).allocation_hashes
+
+    await state.delete()
+
+
+@pytest.mark.anyio
+async def test_data_admins_are_left_alone_when_their_group_lookup_fails(monkeypatch):
+    beamline = await Beamline.find_one(Beamline.name == "ZZZ")
+    facility = await Facility.find_one(Facility.facility_id == "nsls2")
+
+    async def get_users_in_group(group: str):
+        if group == facility.data_admin_group:
+            return [{"sAMAccountName": "testy-mcdata"}, {"sAMAccountName": "newadmin"}]
+        raise n2sn_service.LdapTimeoutError("Active Directory is too slow")
+
+    monkeypatch.setattr(n2sn_service, "get_users_in_group", get_users_in_group)
+
+    with pytest.raises(Exception, match="Could not synchronize the data admins"):
+        await sync_service.worker_synchronize_dataadmins()
+
+    # The facility's group was looked up, so its admins are updated...
+    updated = await Facility.find_one(Facility.facility_id == "nsls2")
+    assert updated.data_admins == ["newadmin", "testy-mcdata"]
+    # ...but the beamline's admins aren't emptied because its lookup failed
+    unchanged = await Beamline.find_one(Beamline.name == "ZZZ")
+    assert unchanged.data_admins == beamline.data_admins
+
+    await facility_service.update_data_admins("nsls2", facility.data_admins)
@@ -0,0 +1,93 @@
+import pytest
+from beanie.operators import In
+
+from nsls2api.devtools.upstream_simulator import SimulatedUpstream, SimulatorConfig
+from nsls2api.models.beamlines import Beamline
+from nsls2api.models.cycles import Cycle
+from nsls2api.models.jobs import JobSyncParameters
+from nsls2api.models.proposals import Proposal
+from nsls2api.services import synthetic_data_service
+from nsls2api.services.synthetic_data_service import SyntheticDatasetSpec
+
+
+@pytest.mark.anyio
+async def test_generate_synthetic_dataset():
+    spec = SyntheticDatasetSpec(
+        proposals=250,
+        first_proposal_id=7000000,
+        years=1,
+        beamlines=3,
+        people=100,
+        batch_size=100,
+        seed=42,
+    )
+    summary = await synthetic_data_service.generate_synthetic_dataset(spec)
+    assert summary.proposals_created == 250
+
+    proposals = await Proposal.find(
+        Proposal.proposal_id >= "7000000", Proposal.proposal_id <= "7000249"
+    ).to_list()
+    assert len(proposals) == 250
+    for proposal in proposals:
+        assert sum(user.is_pi for user in proposal.users) == 1
+        assert proposal.instruments
+
+    # Every proposal with a cycle is listed in that cycle
+    cycles = await Cycle.find(In(Cycle.name, ["2020-1", "2020-2", "2020-3"])).to_list()
+    cycle_proposals = {p for cycle in cycles for p in cycle.proposals}
+    assert {p.proposal_id for p in proposals if p.cycles} <= cycle_proposals
+
+    # The same IDs can't be used twice
+    with pytest.raises(synthetic_data_service.SyntheticDatasetError):
+        await synthetic_data_service.generate_synthetic_dataset(spec)
+
+    await Proposal.find(
+        Proposal.proposal_id >= "7000000", Proposal.proposal_id <= "7000249"
+    ).delete()
+    await Beamline.find(In(Beamline.name, ["SYN01", "SYN02", "SYN03"])).delete()
+
+
+@pytest.mark.anyio
+async def test_upstream_simulator_serves_the_synthetic_beamlines():
+    spec = SyntheticDatasetSpec(
+        proposals=5, first_proposal_id=6000000, years=1, beamlines=3, people=10
+    )
+    await synthetic_data_service.generate_synthetic_dataset(spec)
+    upstream = SimulatedUpstream(SimulatorConfig(years=1, beamlines=3))
+
+    # Proposals synchronized from the simulator are on the generated beamlines
+    beamlines = await Beamline.find(
+        In(Beamline.pass_id, [str(r.ID) for r in upstream.resources()])
+    ).to_list()
+    assert sorted(b.name for b in beamlines) == ["SYN01", "SYN02", "SYN03"]
+    assert (
+        min(upstream.cycle_proposal_ids(0)) == SyntheticDatasetSpec(1).first_proposal_id
+    )
+
+    await Proposal.find(
+        Proposal.proposal_id >= "6000000", Proposal.proposal_id <= "6000004"
+    ).delete()
+    await Beamline.find(In(Beamline.name, ["SYN01", "SYN02", "SYN03"])).delete()
+
+
+@pytest.mark.anyio
+async def test_synthetic_dataset_jobs_are_limited(monkeypatch):
+    with pytest.raises(synthetic_data_service.SyntheticDatasetError):
+        synthetic_data_service.synthetic_dataset_spec(
+            JobSyncParameters(
+                proposal_count=synthetic_data_service.MAX_API_PROPOSALS + 1
+            )
+        )
+    spec = synthetic_data_service.synthetic_dataset_spec(
+        JobSyncParameters(proposal_count=10, seed=3)
+    )
+    assert (spec.proposals, spec.first_proposal_id, spec.seed) == (10, 8000000, 3)
+
+    # A job (e.g. submitted through /v1/sync/jobs) is refused where synthetic data
+    # isn't allowed, before anything is written
+    monkeypatch.setattr(synthetic_data_service.settings, "allow_synthetic_data", False)
+    with pytest.raises(synthetic_data_service.SyntheticDatasetError):
+        await synthetic_data_service.worker_generate_synthetic_dataset(
+            JobSyncParameters(proposal_count=10, first_proposal_id=7200000)
+        )
+    assert await Proposal.find(Proposal.proposal_id == "7200000").count() == 0